@@ -0,0 +1,74 @@
+"""Compare the parsing speed of the engines, in notes per second.
+
+Usage:
+  python benchmarks/engine_speed.py [SCORE ...]
+
+Every score is parsed with each available engine (etree, lxml if it is
+installed, and expat), a few times in a row, and the best time of each
+engine is kept. Without scores, a synthetic score of 1000 measures of 16
+notes is used. Only the parsing done by the MusicXMLDocument constructor
+is timed, as the playable notes are derived alike for all engines.
+Scores the parser rejects are left out.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from musicxml_parser import MusicXMLDocument
+from musicxml_parser.exception import MusicXMLParseException
+from musicxml_parser import xml_backend
+from stream_memory import write_score
+
+REPEATS = 3
+
+
+def parse_time(paths, engine):
+  """Return (number of notes, best total parse time) of paths."""
+  best = None
+  for _ in range(REPEATS):
+    num_notes = 0
+    start = time.perf_counter()
+    for path in paths:
+      document = MusicXMLDocument(path, engine=engine)
+      num_notes += sum(len(measure.notes) for part in document.parts
+                       for measure in part.measures)
+    elapsed = time.perf_counter() - start
+    if best is None or elapsed < best:
+      best = elapsed
+  return num_notes, best
+
+
+def parseable(paths):
+  """Return the paths of the scores the parser accepts."""
+  accepted = []
+  for path in paths:
+    try:
+      MusicXMLDocument(path, engine='etree')
+    except MusicXMLParseException as e:
+      print('skipping %s: %s' % (path, e))
+    else:
+      accepted.append(path)
+  return accepted
+
+
+def main(paths):
+  paths = parseable(paths)
+  engines = ['etree', 'expat']
+  if xml_backend.lxml_etree is not None:
+    engines.insert(1, 'lxml')
+  print('scores: %d' % len(paths))
+  for engine in engines:
+    num_notes, elapsed = parse_time(paths, engine)
+    print('%-6s %8d notes %8.2f s %10.0f notes/s' % (
+        engine, num_notes, elapsed, num_notes / elapsed))
+
+
+if __name__ == '__main__':
+  if sys.argv[1:]:
+    main(sys.argv[1:])
+  else:
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, 'score.xml')
+      write_score(path, 1000)
+      main([path])
@@ -0,0 +1,86 @@
+"""Report the memory retained per parsed note, before and after a change.
+
+Usage:
+  python benchmarks/note_memory.py [--before REVISION] SCORE [SCORE ...]
+
+Every score is parsed with lean=True, so the XML tree is released and the
+retained memory is that of the parsed parts, measures and notes.
+
+The scores are parsed once with the package of this checkout and once with
+the package of REVISION, taken from git, each in a new process. REVISION
+defaults to the last one before the slotted note model.
+"""
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import tracemalloc
+
+# The last revision with dict-backed notes, before __slots__ were added.
+DEFAULT_BEFORE = '3cad5c2^'
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(paths):
+  """Return (number of notes, retained bytes) for the given scores."""
+  from musicxml_parser import MusicXMLDocument
+  documents = []
+  num_notes = 0
+  gc.collect()
+  tracemalloc.start()
+  for path in paths:
+    document = MusicXMLDocument(path, lean=True)
+    documents.append(document)
+    num_notes += sum(len(measure.notes) for part in document.parts
+                     for measure in part.measures)
+  gc.collect()
+  retained, _ = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return num_notes, retained
+
+
+def measure_in_process(src, paths):
+  """Run measure() with the package found in src, in a new process."""
+  env = dict(os.environ, PYTHONPATH=src)
+  output = subprocess.check_output(
+      [sys.executable, os.path.abspath(__file__), '--run'] + paths, env=env)
+  num_notes, retained = output.split()
+  return int(num_notes), int(retained)
+
+
+def export_src(revision, directory):
+  """Extract the src directory of a git revision into directory."""
+  archive = os.path.join(directory, 'src.tar')
+  subprocess.check_call(['git', '-C', REPOSITORY, 'archive', '-o', archive,
+                         revision, 'src'])
+  with tarfile.open(archive) as tar:
+    tar.extractall(directory)
+  return os.path.join(directory, 'src')
+
+
+def main(argv):
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--before', default=DEFAULT_BEFORE)
+  parser.add_argument('scores', nargs='+')
+  args = parser.parse_args(argv)
+  paths = [os.path.abspath(path) for path in args.scores]
+  with tempfile.TemporaryDirectory() as directory:
+    results = [
+        ('before', measure_in_process(export_src(args.before, directory),
+                                      paths)),
+        ('after', measure_in_process(os.path.join(REPOSITORY, 'src'), paths)),
+    ]
+  print('scores: %d' % len(paths))
+  for name, (num_notes, retained) in results:
+    print('%-6s %8d notes %8.1f MB %6.0f bytes per note' % (
+        name, num_notes, retained / 1e6, retained / max(num_notes, 1)))
+
+
+if __name__ == '__main__':
+  if sys.argv[1:2] == ['--run']:
+    print('%d %d' % measure(sys.argv[2:]))
+  else:
+    main(sys.argv[1:])
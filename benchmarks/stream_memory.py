@@ -0,0 +1,102 @@
+"""Compare the peak memory of streaming and whole-tree parsing.
+
+Usage:
+  python benchmarks/stream_memory.py [NUM_MEASURES ...]
+
+Synthetic single-part scores are parsed in a fresh process per run, once
+with the whole element tree and once with streaming=True. Each score has
+NUM_MEASURES measures of 16 notes (default 250, 1000 and 4000), and a
+second series adds one measure of 4000 notes to them.
+
+For every run the peak RSS of the process is reported, together with the
+transient Python memory: the tracemalloc peak less the memory the parsed
+document keeps. Both modes parse with lean=True, so the document keeps the
+same objects, and with the etree engine, so that the element tree is
+allocated through Python and traced. With streaming the transient memory
+is the largest measure plus the measure templates of the part being
+parsed, instead of the whole tree.
+"""
+import gc
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+NOTE = ('<note><pitch><step>C</step><octave>4</octave></pitch>'
+        '<duration>1</duration><voice>1</voice><type>16th</type>'
+        '<notations><articulations><staccato/></articulations></notations>'
+        '</note>')
+
+
+def write_score(path, num_measures, large_measure_notes=0):
+  """Write a score of num_measures 4/4 measures of 16 sixteenths.
+
+  If large_measure_notes is set, a measure of that many sixteenths (in a
+  matching time signature) is added in the middle.
+  """
+  with open(path, 'w') as score:
+    score.write('<?xml version="1.0" encoding="UTF-8"?>\n<score-partwise>'
+                '<part-list><score-part id="P1"><part-name>P</part-name>'
+                '</score-part></part-list><part id="P1">')
+    for i in range(num_measures):
+      if large_measure_notes and i == num_measures // 2:
+        score.write('<measure number="%dx"><attributes><time><beats>%d'
+                    '</beats><beat-type>16</beat-type></time></attributes>'
+                    % (i, large_measure_notes))
+        score.write(NOTE * large_measure_notes)
+        score.write('</measure>')
+      score.write('<measure number="%d">' % (i + 1))
+      if i == 0 or (large_measure_notes and i == num_measures // 2):
+        score.write('<attributes><divisions>4</divisions><time><beats>4'
+                    '</beats><beat-type>4</beat-type></time></attributes>')
+      score.write(NOTE * 16)
+      score.write('</measure>')
+    score.write('</part></score-partwise>\n')
+
+
+def run(path, streaming):
+  """Parse path and print peak RSS and transient memory, in MB."""
+  from musicxml_parser import MusicXMLDocument
+  gc.collect()
+  tracemalloc.start()
+  document = MusicXMLDocument(path, streaming=streaming, engine='etree',
+                              lean=True)
+  gc.collect()
+  retained, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+  print('%.1f %.1f' % (rss, (peak - retained) / 1e6))
+  return document
+
+
+def measure(path, streaming):
+  """Return (peak RSS, transient memory) of parsing path in a new process."""
+  output = subprocess.check_output(
+      [sys.executable, __file__, '--run', path, '1' if streaming else ''])
+  rss, transient = output.split()
+  return float(rss), float(transient)
+
+
+def main(sizes):
+  print('%-28s %18s %18s' % ('score', 'tree: rss / tmp', 'stream: rss / tmp'))
+  with tempfile.TemporaryDirectory() as directory:
+    for large_measure_notes in (0, 4000):
+      for num_measures in sizes:
+        path = os.path.join(directory, 'score.xml')
+        write_score(path, num_measures, large_measure_notes)
+        name = '%d measures' % num_measures
+        if large_measure_notes:
+          name += ' + 1 of %d notes' % large_measure_notes
+        tree = measure(path, False)
+        stream = measure(path, True)
+        print('%-28s %8.1f / %7.1f %8.1f / %7.1f MB' % (
+            (name,) + tree + stream))
+
+
+if __name__ == '__main__':
+  if sys.argv[1:2] == ['--run']:
+    run(sys.argv[2], bool(sys.argv[3]))
+  else:
+    main([int(x) for x in sys.argv[1:]] or [250, 1000, 4000])
@@ -17,3 +17,4 @@
 """Imports objects from music modules into the top-level music namespace."""
 
 from .main import MusicXMLDocument
+from .corpus import CorpusResult, parse_corpus
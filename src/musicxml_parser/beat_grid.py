@@ -0,0 +1,174 @@
+"""Beat and interval grids over the measures of a part."""
+import numpy as np
+
+# Beats per measure of compound meters, by numerator. Other numerators
+# count one beat per numerator unit.
+COMPOUND_BEATS = {6: 2, 9: 3, 12: 4, 18: 3, 24: 4}
+
+
+class BeatGrid(object):
+  """Beat positions of a part, derived from its measures and time signatures.
+
+  The measure starts and the time signature of every measure are gathered
+  once into arrays. Beats, and intervals of any number of sixteenths, are
+  then generated for all measures at once and kept, so repeated calls do
+  not recompute them.
+
+  A measure is implicit when its length differs from the one of its time
+  signature. The beats of an implicit first measure, a pickup, are counted
+  back from the start of the next measure; those of later implicit
+  measures are counted from their start and dropped if they do not follow
+  the beats before them.
+  """
+
+  def __init__(self, measures, initial_time_signature=None):
+    """Build the grid.
+
+    Args:
+      measures: Measures of a part, in order.
+      initial_time_signature: TimeSignature of the measures before the
+        first one of the part that has a time signature.
+
+    Raises:
+      ValueError: if some measure has no time signature.
+    """
+    # The distinct time signatures in use, in order of first use.
+    self.time_signatures = []
+    # Index in time_signatures of the time signature of every measure.
+    indices = []
+    starts = []
+    indices_by_id = {}
+    time_signature = initial_time_signature
+    for measure in measures:
+      if measure.time_signature is not None:
+        time_signature = measure.time_signature
+      if time_signature is None:
+        raise ValueError('No time signature at measure %d'
+                         % len(starts))
+      if id(time_signature) not in indices_by_id:
+        indices_by_id[id(time_signature)] = len(self.time_signatures)
+        self.time_signatures.append(time_signature)
+      indices.append(indices_by_id[id(time_signature)])
+      starts.append(measure.start_xml_position)
+    self.measure_starts = np.array(starts, dtype=np.int64)
+    indices = np.array(indices, dtype=np.int64)
+    self.time_signature_indices = indices
+    self.numerators = np.array(
+        [ts.numerator for ts in self.time_signatures], dtype=np.int64)[indices]
+    self.denominators = np.array(
+        [ts.denominator for ts in self.time_signatures], dtype=np.int64)[indices]
+    self.divisions = np.array(
+        [ts.state.divisions for ts in self.time_signatures],
+        dtype=np.int64)[indices]
+    # Length in divisions of a full measure of the time signature.
+    self.full_lengths = (self.divisions * self.numerators / self.denominators
+                         * 4)
+    # Length in divisions up to the next measure. The last measure is
+    # taken to be full.
+    self.lengths = self.full_lengths.copy()
+    self.lengths[:-1] = np.diff(self.measure_starts)
+    self.implicit = self.lengths != self.full_lengths
+    self._beats = {}
+    self._intervals = {}
+
+  def __len__(self):
+    return len(self.measure_starts)
+
+  @property
+  def pickup(self):
+    """Whether the first measure is a pickup measure."""
+    return bool(len(self) > 1 and self.implicit[0])
+
+  def beats(self, in_measure_level=False):
+    """Return the beat positions of the part.
+
+    Args:
+      in_measure_level: Count one beat per measure instead of one per beat
+        of the time signature.
+
+    Returns:
+      A float array of xml_positions.
+    """
+    if in_measure_level not in self._beats:
+      if in_measure_level:
+        counts = np.ones(len(self), dtype=np.int64)
+      else:
+        counts = self.numerators.copy()
+        for numerator, beats in COMPOUND_BEATS.items():
+          counts[self.numerators == numerator] = beats
+      self._beats[in_measure_level] = self._grid(
+          counts, self.full_lengths / counts)
+    return self._beats[in_measure_level]
+
+  def intervals(self, interval_in_16th):
+    """Return positions every interval_in_16th sixteenths in each measure.
+
+    Raises:
+      ValueError: if a measure is shorter than the interval.
+    """
+    if interval_in_16th not in self._intervals:
+      counts = (self.numerators * 16
+                / (self.denominators * interval_in_16th)).astype(np.int64)
+      if np.any(counts == 0):
+        ts = self.time_signatures[
+            self.time_signature_indices[np.flatnonzero(counts == 0)[0]]]
+        raise ValueError('measure is longer than a interval: {} / {}'.format(
+            ts.numerator, ts.denominator))
+      self._intervals[interval_in_16th] = self._grid(
+          counts, self.divisions * interval_in_16th / 4)
+    return self._intervals[interval_in_16th]
+
+  def beat_index_of(self, xml_positions, in_measure_level=False):
+    """Return the index of the beat at or before each xml_position.
+
+    Positions before the first beat get -1.
+
+    Args:
+      xml_positions: An xml_position or an array of them.
+      in_measure_level: Look up the beats of beats(in_measure_level).
+
+    Returns:
+      An int or an int array, the shape of xml_positions.
+    """
+    return np.searchsorted(self.beats(in_measure_level), xml_positions,
+                           side='right') - 1
+
+  def _grid(self, counts, steps):
+    """Return the grid of counts points per measure, steps apart.
+
+    Args:
+      counts: Points per measure, in a full measure.
+      steps: Distance in divisions between the points of every measure.
+    """
+    counts = counts.copy()
+    implicit = self.implicit
+    # Implicit measures only hold as many points as start in them.
+    counts[implicit] = np.ceil(
+        (self.lengths[implicit] / self.full_lengths[implicit])
+        / (1 / counts[implicit])).astype(np.int64)
+    measure_of_point = np.repeat(np.arange(len(self)), counts)
+    ends = np.cumsum(counts)
+    firsts = ends - counts
+    offsets = np.arange(ends[-1] if len(ends) else 0) - firsts[measure_of_point]
+    origins = self.measure_starts.copy()
+    if self.pickup:
+      # A pickup counts back from the next measure.
+      offsets[:counts[0]] -= counts[0]
+      origins[0] = self.measure_starts[1]
+    points = (origins[measure_of_point]
+              + offsets * steps[measure_of_point])
+
+    keep = np.ones(len(points), dtype=bool)
+    last = None
+    for i in np.flatnonzero(implicit):
+      if i > 0 and not implicit[i - 1] and counts[i - 1]:
+        last = points[ends[i - 1] - 1]
+      measure_points = points[firsts[i]:ends[i]]
+      if not len(measure_points):
+        continue
+      if last is not None:
+        keep[firsts[i]:ends[i]] = measure_points > last
+        if measure_points[-1] <= last:
+          continue
+      last = measure_points[-1]
+    return points[keep]
@@ -0,0 +1,213 @@
+"""Content-addressed on-disk cache of parsed MusicXML documents.
+
+Entries are keyed by a hash of the raw file bytes and the parser version,
+so an unchanged file is never parsed twice and a parser upgrade never
+reads entries written by an older version. Each entry is a zlib
+compressed pickle of the parsed document. The source elements the parsed
+objects keep (Note.xml_note, Measure.xml_measure and the like) are left
+out and come back as lean.RELEASED, while the few elements that are
+parsed values themselves, such as the <per-minute> of a metronome
+Direction, are stored as small copies.
+"""
+import hashlib
+import io
+import os
+import pickle
+import tempfile
+import xml.etree.ElementTree as ET
+import zlib
+
+from . import constants
+from . import xml_backend
+from .lean import RELEASED
+
+# Default upper bound of the total size of a cache directory.
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+ENTRY_SUFFIX = '.pickle.z'
+
+# Tags of the source elements kept by Note, Measure, Direction, Notations,
+# Tempo, KeySignature, TimeSignature, ChordSymbol and the document.
+SOURCE_TAGS = frozenset(['score-partwise', 'part-list', 'part', 'measure',
+                         'note', 'notations', 'direction', 'sound', 'key',
+                         'time', 'harmony'])
+
+# Persistent id written in place of a left out source element.
+_SOURCE_ID = 'source'
+# Persistent id tag of a copied element.
+_ELEMENT_ID = 'element'
+
+
+class ScoreCache(object):
+  """Directory of parsed documents with least recently used eviction.
+
+  Reading an entry updates its modification time, which is used as the
+  last access time when the directory grows past max_bytes.
+  """
+
+  def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+    """Create the cache, making the directory if needed.
+
+    Args:
+      directory: Path of the cache directory.
+      max_bytes: Upper bound of the total size of the entries.
+    """
+    self.directory = directory
+    self.max_bytes = max_bytes
+    os.makedirs(directory, exist_ok=True)
+
+  def key(self, data, variant=''):
+    """Return the cache key of the raw bytes of a file.
+
+    Args:
+      data: The raw bytes of the .xml or .mxl file.
+      variant: Parser options that change the parsed document.
+
+    Returns:
+      A hex digest.
+    """
+    digest = hashlib.sha256()
+    digest.update(('%s|%s|' % (constants.PARSER_VERSION, variant)).encode())
+    digest.update(data)
+    return digest.hexdigest()
+
+  def load(self, key):
+    """Return the cached attributes stored under key, or None on a miss.
+
+    Unreadable entries are deleted and reported as misses.
+    """
+    path = self._path(key)
+    try:
+      with open(path, 'rb') as entry:
+        data = entry.read()
+    except OSError:
+      return None
+    try:
+      attributes = loads(zlib.decompress(data))
+    except Exception:
+      self._remove(path)
+      return None
+    try:
+      os.utime(path)
+    except OSError:
+      pass
+    return attributes
+
+  def store(self, key, attributes):
+    """Store the attributes of a parsed document under key.
+
+    The entry is written to a temporary file first and renamed, so other
+    processes sharing the directory never read a partial entry.
+
+    Args:
+      key: The key returned by key().
+      attributes: Dict of document attributes. Source elements anywhere
+        inside it are replaced by lean.RELEASED.
+    """
+    data = zlib.compress(dumps(attributes))
+    handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+    try:
+      with os.fdopen(handle, 'wb') as entry:
+        entry.write(data)
+      os.replace(temp_path, self._path(key))
+    except BaseException:
+      self._remove(temp_path)
+      raise
+    self.evict(keep=key)
+
+  def evict(self, keep=None):
+    """Delete least recently used entries until max_bytes is respected.
+
+    Args:
+      keep: Key of an entry that is never deleted, even if it is larger
+        than max_bytes on its own.
+    """
+    keep_path = None if keep is None else self._path(keep)
+    entries = []
+    total = 0
+    for name in os.listdir(self.directory):
+      if not name.endswith(ENTRY_SUFFIX):
+        continue
+      path = os.path.join(self.directory, name)
+      try:
+        stat = os.stat(path)
+      except OSError:
+        continue
+      entries.append((stat.st_mtime, stat.st_size, path))
+      total += stat.st_size
+    entries.sort()
+    for _, size, path in entries:
+      if total <= self.max_bytes:
+        break
+      if path == keep_path:
+        continue
+      self._remove(path)
+      total -= size
+
+  def _path(self, key):
+    return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+  @staticmethod
+  def _remove(path):
+    try:
+      os.remove(path)
+    except OSError:
+      pass
+
+
+def dumps(obj):
+  """Pickle obj, leaving out the source elements inside it."""
+  buffer = io.BytesIO()
+  _Pickler(buffer, pickle.HIGHEST_PROTOCOL).dump(obj)
+  return buffer.getvalue()
+
+
+def loads(data):
+  """Unpickle data written by dumps()."""
+  return _Unpickler(io.BytesIO(data)).load()
+
+
+class LeanPickle(object):
+  """Holder of a value that is pickled the way the cache stores it.
+
+  The value itself is used as long as the holder is not pickled, so a
+  thread pool gets it unchanged while a process pool gets a copy without
+  source elements, which lxml elements could not be pickled as.
+  """
+
+  __slots__ = ('value',)
+
+  def __init__(self, value):
+    self.value = value
+
+  def __reduce__(self):
+    return (_load_lean_pickle, (dumps(self.value),))
+
+
+def _load_lean_pickle(data):
+  return LeanPickle(loads(data))
+
+
+class _Pickler(pickle.Pickler):
+  """Pickler that leaves out source elements and copies the others."""
+
+  def persistent_id(self, obj):
+    if not xml_backend.is_element(obj):
+      return None
+    if obj.tag in SOURCE_TAGS:
+      return _SOURCE_ID
+    return (_ELEMENT_ID, xml_backend.element_tostring(obj))
+
+
+class _Unpickler(pickle.Unpickler):
+  """Unpickler that restores source elements as lean.RELEASED.
+
+  Copied elements are read back with xml.etree.ElementTree.
+  """
+
+  def persistent_load(self, pid):
+    if pid == _SOURCE_ID:
+      return RELEASED
+    if isinstance(pid, tuple) and pid[0] == _ELEMENT_ID:
+      return ET.fromstring(pid[1])
+    raise pickle.UnpicklingError('unknown persistent id: %r' % (pid,))
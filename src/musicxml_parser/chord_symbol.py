@@ -1,3 +1,5 @@
+from fractions import Fraction
+
 from . import constants
 from .exception import ChordSymbolParseException
 
@@ -102,6 +104,8 @@ class ChordSymbol(object):
     self.degrees = []
     self.bass = None
     self.state = state
+    # Divisions the xml_position is counted in.
+    self.divisions = state.divisions
     self._parse()
 
   def _alter_to_string(self, alter_text):
@@ -251,6 +255,15 @@ class ChordSymbol(object):
     # symbol figure string.
     return type_string + alter_string + str(value)
 
+  def canonical_key(self):
+    """Return a hashable key, equal for the same chord at the same time.
+
+    The position is the exact number of quarter notes from the start, so
+    parts with different divisions give the same key.
+    """
+    return (Fraction(self.xml_position, self.divisions), self.root,
+            self.kind, tuple(self.degrees), self.bass)
+
   def __str__(self):
     if self.kind == 'N.C.':
       note_string = '{kind: ' + self.kind + '} '
@@ -1,5 +1,10 @@
 """Constants for music processing"""
 
+# Version of the parsed document layout. Bump it whenever the parsed
+# objects change, so that documents cached by cache.ScoreCache are parsed
+# again.
+PARSER_VERSION = 9
+
 # Meter-related constants.
 DEFAULT_QUARTERS_PER_MINUTE = 120.0
 DEFAULT_STEPS_PER_BAR = 16  # 4/4 music sampled at 4 steps per quarter note.
@@ -0,0 +1,112 @@
+"""Parse many MusicXML files in parallel worker processes."""
+import collections
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import itertools
+import os
+
+from .main import MusicXMLDocument
+
+# Number of chunks queued per worker. Keeps every worker busy without
+# submitting the whole corpus to the pool at once.
+CHUNKS_PER_WORKER = 2
+
+
+CorpusResult = collections.namedtuple('CorpusResult',
+                                      ['path', 'result', 'error'])
+CorpusResult.__doc__ = """Outcome of parsing one file of a corpus.
+
+path is the path given to parse_corpus. result is the value returned by
+the reducer, or None if the file failed. error is the exception raised
+while parsing or reducing the file, or None on success.
+"""
+
+
+def parse_corpus(paths, reducer, workers=None, chunksize=1,
+                 **document_kwargs):
+  """Parse MusicXML files in worker processes and reduce each of them.
+
+  Every file is parsed into a MusicXMLDocument and passed to reducer
+  inside the worker, so only the reducer's return value is sent back to
+  this process. A file that raises an exception while parsing or reducing
+  is reported in its CorpusResult and does not stop the others.
+
+  Args:
+    paths: Iterable of .xml or .mxl file paths.
+    reducer: Function called with each MusicXMLDocument. It and its return
+      value must be picklable, so it has to be defined at module level.
+    workers: Number of worker processes. Defaults to the number of CPUs.
+    chunksize: Number of files sent to a worker at a time.
+    **document_kwargs: Keyword arguments for MusicXMLDocument.
+
+  Yields:
+    A CorpusResult for every path, in the order the files finish.
+
+  Raises:
+    ValueError: if workers or chunksize is smaller than 1.
+  """
+  if workers is None:
+    workers = os.cpu_count() or 1
+  if workers < 1:
+    raise ValueError('workers must be at least 1')
+  if chunksize < 1:
+    raise ValueError('chunksize must be at least 1')
+
+  chunks = _iter_chunks(paths, chunksize)
+  pending = {}
+  with ProcessPoolExecutor(max_workers=workers) as executor:
+
+    def submit(chunk):
+      future = executor.submit(_parse_chunk, chunk, reducer, document_kwargs)
+      pending[future] = chunk
+
+    try:
+      for chunk in itertools.islice(chunks, workers * CHUNKS_PER_WORKER):
+        submit(chunk)
+      while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+          chunk = pending.pop(future)
+          for result in _chunk_results(future, chunk):
+            yield result
+          next_chunk = next(chunks, None)
+          if next_chunk is not None:
+            submit(next_chunk)
+    finally:
+      # Stopped early: do not parse the chunks that have not started.
+      for future in pending:
+        future.cancel()
+
+
+def _iter_chunks(paths, chunksize):
+  """Yield lists of at most chunksize paths."""
+  paths = iter(paths)
+  while True:
+    chunk = list(itertools.islice(paths, chunksize))
+    if not chunk:
+      return
+    yield chunk
+
+
+def _parse_chunk(paths, reducer, document_kwargs):
+  """Parse and reduce a chunk of files in a worker process."""
+  results = []
+  for path in paths:
+    try:
+      result = reducer(MusicXMLDocument(path, **document_kwargs))
+    except Exception as exception:
+      results.append(CorpusResult(path, None, exception))
+    else:
+      results.append(CorpusResult(path, result, None))
+  return results
+
+
+def _chunk_results(future, chunk):
+  """Return the CorpusResults of a finished chunk.
+
+  If the chunk itself failed, for example because the worker died or a
+  result could not be pickled, every file of the chunk gets that error.
+  """
+  try:
+    return future.result()
+  except Exception as exception:
+    return [CorpusResult(path, None, exception) for path in chunk]
@@ -1,5 +1,18 @@
 from calendar import c
-import copy
+import collections
+
+# A crescendo or diminuendo wedge of one part, from its start Direction to
+# its stop Direction. stop is None if the wedge is never stopped.
+Wedge = collections.namedtuple('Wedge', ['start', 'stop'])
+
+# A direction reported by resolve_wedges. kind is 'untyped' for a direction
+# of no known type, 'unmatched_wedge_stop' for a wedge stop without an open
+# wedge, or 'unterminated_wedge' for a wedge start that is never stopped.
+DirectionDiagnostic = collections.namedtuple('DirectionDiagnostic',
+                                             ['kind', 'direction'])
+
+WEDGE_TYPES = ('crescendo', 'diminuendo')
+
 
 class Direction(object):
   """Internal representation of a MusicXML Measure's Direction properties.
@@ -19,7 +32,7 @@ class Direction(object):
   def __init__(self, xml_direction, state):
     self.xml_direction = xml_direction
     self.type = {'type': None, 'content': None}
-    self.state = copy.copy(state)
+    self.state = state.snapshot()
     self.placement = None
     self.staff = None
     self.time_position = state.time_position
@@ -167,3 +180,62 @@ class Direction(object):
     return direction_string
 
 
+
+
+def resolve_wedges(directions, diagnostics=None):
+  """Give every wedge stop the type of its wedge and pair it with its start.
+
+  A wedge stop or continue is parsed with type 'none'. In one pass over the
+  directions it takes the type of the last crescendo or diminuendo with its
+  number and staff, and a stop closes the open wedge of its number and
+  staff.
+
+  Args:
+    directions: Directions of one part, sorted by xml_position. The types of
+      their wedge stops are updated in place.
+    diagnostics: Optional list receiving a DirectionDiagnostic for every
+      untyped direction, wedge stop without an open wedge and wedge start
+      that is never stopped.
+
+  Returns:
+    A list of Wedges, sorted by the xml_position of their start.
+  """
+  wedges = []
+  # wedge type and open wedge start by (number, staff)
+  last_types = {}
+  open_wedges = {}
+  for direction in directions:
+    direction_type = direction.type
+    if direction_type['type'] is None:
+      if diagnostics is not None:
+        diagnostics.append(DirectionDiagnostic('untyped', direction))
+      continue
+    if 'number' not in direction_type:
+      continue
+    key = (direction_type['number'], direction.staff)
+    if direction_type['content'] == 'start':
+      if key in open_wedges:
+        wedges.append(Wedge(open_wedges[key], None))
+      open_wedges[key] = direction
+    else:
+      if direction_type['type'] not in WEDGE_TYPES and key in last_types:
+        direction_type['type'] = last_types[key]
+      if direction_type['content'] == 'stop':
+        start = open_wedges.pop(key, None)
+        if start is not None:
+          wedges.append(Wedge(start, direction))
+        elif diagnostics is not None:
+          diagnostics.append(
+              DirectionDiagnostic('unmatched_wedge_stop', direction))
+    if direction_type['type'] in WEDGE_TYPES:
+      last_types[key] = direction_type['type']
+
+  for start in open_wedges.values():
+    wedges.append(Wedge(start, None))
+  if diagnostics is not None:
+    for wedge in wedges:
+      if wedge.stop is None:
+        diagnostics.append(DirectionDiagnostic('unterminated_wedge',
+                                               wedge.start))
+  wedges.sort(key=lambda x: x.start.xml_position)
+  return wedges
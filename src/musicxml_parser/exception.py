@@ -57,3 +57,14 @@ class KeyParseException(MusicXMLParseException):
 class InvalidNoteDurationTypeException(MusicXMLParseException):
   """Exception thrown when a note's duration type is invalid."""
   pass
+
+
+class XMLReleasedException(MusicXMLParseException):
+  """Exception thrown when raw XML is accessed after it has been released.
+
+  Documents parsed with lean=True or streaming=True, or loaded from a
+  ScoreCache, do not keep the XML elements they were parsed from. This is
+  not an AttributeError, so hasattr() and getattr() with a default do not
+  hide the access.
+  """
+  pass
@@ -0,0 +1,398 @@
+"""Single-pass MusicXML parsing engine built on xml.parsers.expat.
+
+The expat callbacks digest every <note> into a flat NoteRecord as the file
+is read, so no element tree is ever built for the notes that make up the
+bulk of a score. The few other children of <measure> that Measure needs
+(<attributes>, <barline>, <direction> and <harmony>) are handed over as
+small detached elements.
+
+A MeasureRecord keeps the digested children of one <measure>, which lets
+Part build the same measure again when it unfolds repeats.
+"""
+import collections
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+
+from .exception import UnpitchedNoteException
+from .measure import Measure
+from .note import Note
+from .part import Part
+
+# Number of bytes fed to expat at a time.
+CHUNK_SIZE = 64 * 1024
+
+# Children of <measure> handed to Measure._parse_child as detached elements.
+ELEMENT_TAGS = ('attributes', 'barline', 'direction', 'harmony')
+
+# Depth of each element in a partwise score (the root is at depth 1).
+PART_DEPTH = 2
+MEASURE_DEPTH = 3
+MEASURE_CHILD_DEPTH = 4
+
+
+class NoteRecord(object):
+  """Digested <note> element: its attributes and (tag, value) children."""
+
+  __slots__ = ('attrib', 'children')
+
+  def __init__(self, attrib):
+    self.attrib = attrib
+    self.children = []
+
+
+class MeasureRecord(object):
+  """Digested <measure> element: its attributes and (kind, value) children.
+
+  kind is 'note' (a NoteRecord), 'backup' or 'forward' (an int duration),
+  or 'element' (a detached element for Measure._parse_child).
+  """
+
+  __slots__ = ('attrib', 'children')
+
+  def __init__(self, attrib):
+    self.attrib = attrib
+    self.children = []
+
+
+class PartRecord(object):
+  """The <part> element and the MeasureRecords read so far."""
+
+  def __init__(self, xml_part):
+    self.xml_part = xml_part
+    self.measures = []
+    self.finished = False
+
+
+class ExpatScoreReader(object):
+  """Reads a partwise MusicXML score with expat callbacks.
+
+  The file is fed to expat in chunks only when a part or measure that has
+  not been read yet is requested, so measures are digested as they are
+  needed and parts can be parsed while the rest of the file is unread.
+  """
+
+  def __init__(self, source):
+    """Create the reader.
+
+    Args:
+      source: A binary file object of the score.
+    """
+    self._source = source
+    self._parser = expat.ParserCreate()
+    self._parser.buffer_text = True
+    self._parser.StartElementHandler = self._start
+    self._parser.EndElementHandler = self._end
+    self._parser.CharacterDataHandler = self._data
+    self._eof = False
+
+    self.xml_part_list = None
+    self._parts = collections.deque()
+
+    self._depth = 0
+    self._tags = []
+    self._text = ''
+    self._part = None
+    self._measure = None
+    self._measure_child = None
+    self._duration = None
+    self._builder = None
+    self._builder_depth = 0
+    self._note = None
+    self._pitch = None
+    self._tuplet = None
+    self._notations = None
+    self._ornaments = None
+    self._articulation = None
+    self._child_attrib = None
+
+  def iter_parts(self):
+    """Yield (xml_part, xml_measures) for every <part> of the score.
+
+    xml_part is a detached <part> element without children. xml_measures
+    is a sequence of MeasureRecords that reads the file further when it is
+    indexed, and raises IndexError past the last measure of the part.
+
+    Raises:
+      xml.parsers.expat.ExpatError: if the file cannot be parsed.
+    """
+    while True:
+      while not self._parts and not self._eof:
+        self._feed()
+      if not self._parts:
+        return
+      part = self._parts.popleft()
+      yield part.xml_part, ExpatMeasures(self, part)
+
+  def _feed(self):
+    """Feed the next chunk of the file to expat."""
+    data = self._source.read(CHUNK_SIZE)
+    if data:
+      self._parser.Parse(data, False)
+    else:
+      self._parser.Parse(b'', True)
+      self._eof = True
+
+  def _data(self, data):
+    if self._builder is not None:
+      self._builder.data(data)
+    else:
+      self._text += data
+
+  def _start(self, tag, attrib):
+    self._depth += 1
+    self._text = ''
+    if self._builder is not None:
+      self._builder.start(tag, attrib)
+    elif self._note is not None:
+      self._tags.append(tag)
+      self._start_in_note(tag, attrib)
+    elif self._depth == MEASURE_CHILD_DEPTH and self._measure is not None:
+      self._measure_child = tag
+      if tag == 'note':
+        self._note = NoteRecord(attrib)
+        self._tags = []
+      elif tag in ELEMENT_TAGS:
+        self._builder = ET.TreeBuilder()
+        self._builder_depth = self._depth
+        self._builder.start(tag, attrib)
+    elif self._depth == MEASURE_DEPTH and self._part is not None:
+      if tag == 'measure':
+        self._measure = MeasureRecord(attrib)
+    elif self._depth == PART_DEPTH:
+      if tag == 'part':
+        self._part = PartRecord(ET.Element(tag, attrib))
+        self._parts.append(self._part)
+      elif tag == 'part-list':
+        self._builder = ET.TreeBuilder()
+        self._builder_depth = self._depth
+        self._builder.start(tag, attrib)
+
+  def _end(self, tag):
+    depth = self._depth
+    self._depth -= 1
+    if self._builder is not None:
+      self._builder.end(tag)
+      if depth == self._builder_depth:
+        element = self._builder.close()
+        self._builder = None
+        if tag == 'part-list':
+          self.xml_part_list = element
+        else:
+          self._measure.children.append(('element', element))
+    elif self._note is not None:
+      if depth == MEASURE_CHILD_DEPTH:
+        self._measure.children.append(('note', self._note))
+        self._note = None
+      else:
+        self._end_in_note(tag, depth - MEASURE_CHILD_DEPTH)
+        self._tags.pop()
+    elif self._measure is not None:
+      if depth == MEASURE_CHILD_DEPTH:
+        if tag == 'backup':
+          self._measure.children.append(('backup', int(self._duration)))
+        elif tag == 'forward':
+          self._measure.children.append(('forward', int(self._duration)))
+        self._measure_child = None
+        self._duration = None
+      elif depth == MEASURE_DEPTH:
+        self._part.measures.append(self._measure)
+        self._measure = None
+      elif (tag == 'duration' and depth == MEASURE_CHILD_DEPTH + 1 and
+            self._measure_child in ('backup', 'forward')):
+        self._duration = self._text
+    elif depth == PART_DEPTH and tag == 'part':
+      self._part.finished = True
+      self._part = None
+
+  def _start_in_note(self, tag, attrib):
+    """Handle the start of an element inside <note>."""
+    level = len(self._tags)
+    if level == 1:
+      self._child_attrib = attrib
+      if tag == 'pitch':
+        self._pitch = [None, '', None]
+      elif tag == 'time-modification':
+        self._tuplet = [None, None]
+      elif tag == 'notations':
+        self._notations = []
+    elif level == 2 and self._tags[0] == 'notations':
+      if tag == 'articulations':
+        self._articulation = None
+      elif tag == 'ornaments':
+        self._ornaments = []
+      else:
+        self._notations.append(('notation', tag, attrib))
+    elif level == 3 and self._tags[0] == 'notations':
+      parent = self._tags[1]
+      if parent == 'ornaments':
+        self._ornaments.append((tag, attrib))
+      elif parent == 'articulations' and self._articulation is None:
+        self._articulation = tag
+
+  def _end_in_note(self, tag, level):
+    """Handle the end of an element inside <note> at the given level."""
+    children = self._note.children
+    text = self._text or None
+    if level == 1:
+      if tag in ('duration', 'voice', 'type', 'staff', 'beam', 'accidental'):
+        children.append((tag, text))
+      elif tag in ('chord', 'rest', 'dot', 'cue', 'unpitched'):
+        children.append((tag, None))
+      elif tag == 'pitch':
+        children.append((tag, tuple(self._pitch)))
+      elif tag == 'time-modification':
+        children.append((tag, tuple(self._tuplet)))
+      elif tag == 'notations':
+        children.append((tag, self._notations))
+      elif tag == 'grace':
+        children.append((tag, self._child_attrib))
+    elif level == 2:
+      parent = self._tags[0]
+      if parent == 'pitch':
+        if tag == 'step':
+          self._pitch[0] = text
+        elif tag == 'alter':
+          self._pitch[1] = text
+        elif tag == 'octave':
+          self._pitch[2] = text
+      elif parent == 'time-modification':
+        if tag == 'actual-notes':
+          self._tuplet[0] = text
+        elif tag == 'normal-notes':
+          self._tuplet[1] = text
+      elif parent == 'notations':
+        if tag == 'articulations':
+          self._notations.append(('articulations', self._articulation, None))
+        elif tag == 'ornaments':
+          self._notations.append(('ornaments', self._ornaments, None))
+
+
+class ExpatMeasures(object):
+  """Sequence of the MeasureRecords of one part, read on demand."""
+
+  def __init__(self, reader, part):
+    self._reader = reader
+    self._part = part
+
+  def __getitem__(self, index):
+    part = self._part
+    while (index >= len(part.measures) and not part.finished and
+           not self._reader._eof):
+      self._reader._feed()
+    return part.measures[index]
+
+
+class ExpatPart(Part):
+  """Part built from the MeasureRecords of an ExpatScoreReader."""
+
+  def _parse_measure(self, xml_measure):
+    """Build one source measure from its MeasureRecord."""
+    self._repair_empty_measure(xml_measure)
+    return build_measure(xml_measure, self._state)
+
+  def _repair_empty_measure(self, measure):
+    """Replace the only <forward> of a measure without notes by a rest.
+
+    Mirrors Part._repair_empty_measure for a MeasureRecord.
+    """
+    forwards = [child for child in measure.children if child[0] == 'forward']
+    if len(forwards) != 1:
+      return
+    if any(child[0] == 'note' for child in measure.children):
+      return
+    measure.children.remove(forwards[0])
+    rest = NoteRecord({})
+    rest.children = [('rest', None), ('duration', str(forwards[0][1])),
+                     ('voice', '1'), ('type', 'whole'), ('staff', '1')]
+    measure.children.append(('note', rest))
+
+
+def build_measure(record, state):
+  """Build a Measure from a MeasureRecord.
+
+  Args:
+    record: The MeasureRecord to build.
+    state: The MusicXMLParserState, updated as in Measure._parse.
+
+  Returns:
+    The parsed Measure.
+  """
+  measure = Measure(None, state)
+  if 'implicit' in record.attrib:
+    measure.implicit = record.attrib['implicit']
+  if 'number' in record.attrib:
+    measure.number = record.attrib['number']
+  for kind, value in record.children:
+    if kind == 'note':
+      measure._add_note(build_note(value, state))
+    elif kind == 'backup':
+      measure._move_position(-value)
+    elif kind == 'forward':
+      measure._move_position(value)
+    else:
+      measure._parse_child(value)
+  return measure
+
+
+def build_note(record, state):
+  """Build a Note from a NoteRecord.
+
+  Args:
+    record: The NoteRecord to build.
+    state: The MusicXMLParserState, updated as in Note._parse.
+
+  Returns:
+    The parsed Note.
+
+  Raises:
+    UnpitchedNoteException: if the note is unpitched.
+  """
+  note = Note(None, state)
+  note._start_parse(record.attrib)
+  for tag, value in record.children:
+    if tag == 'chord':
+      note._parse_chord()
+    elif tag == 'duration':
+      note.note_duration.parse_duration(note.is_in_chord, note.is_grace_note,
+                                        value)
+    elif tag == 'pitch':
+      note._set_pitch(*value)
+    elif tag == 'rest':
+      note.is_rest = True
+    elif tag == 'voice':
+      note.voice = int(value)
+    elif tag == 'dot':
+      note.note_duration.dots += 1
+    elif tag == 'type':
+      note.note_duration.type = value
+    elif tag == 'time-modification':
+      note._set_tuplet(*value)
+    elif tag == 'notations':
+      _apply_notations(note.note_notations, value)
+    elif tag == 'unpitched':
+      raise UnpitchedNoteException('Unpitched notes are not supported')
+    elif tag == 'grace':
+      note._parse_grace(value)
+    elif tag == 'staff':
+      note.staff = int(value)
+    elif tag == 'cue':
+      note.note_notations.is_cue = True
+    elif tag == 'beam':
+      note._parse_beam(value)
+    elif tag == 'accidental':
+      note.accidental = value
+  note._finish_parse()
+  return note
+
+
+def _apply_notations(notations, items):
+  """Apply the digested children of a <notations> element."""
+  for kind, tag, attrib in items:
+    if kind == 'notation':
+      notations.parse_notation(tag, attrib)
+    elif kind == 'articulations':
+      if tag is not None:
+        notations.parse_articulation(tag)
+    elif kind == 'ornaments':
+      for ornament_tag, ornament_attrib in tag:
+        notations.parse_ornament(ornament_tag, ornament_attrib)
@@ -1,5 +1,6 @@
+from fractions import Fraction
+
 from .exception import KeyParseException
-import copy
 
 
 class KeySignature(object):
@@ -14,16 +15,18 @@ class KeySignature(object):
     self.mode = 'major'
     self.time_position = -1
     self.xml_position = -1
-    self.state = copy.copy(state)
+    self.state = state.snapshot()
     if xml_key is not None:
-      self._parse()
+      self._parse(state)
 
-  def _parse(self):
+  def _parse(self, state):
     """Parse the MusicXML <key> element into a MIDI compatible key.
 
     If the mode is not minor (e.g. dorian), default to "major"
     because MIDI only supports major and minor modes.
 
+    Args:
+      state: The MusicXMLParserState giving the position of the key.
 
     Raises:
       KeyParseException: If the fifths element is missing.
@@ -38,8 +41,17 @@ class KeySignature(object):
     if mode != 'minor':
       mode = 'major'
     self.mode = mode
-    self.time_position = self.state.time_position
-    self.xml_position = self.state.xml_position
+    self.time_position = state.time_position
+    self.xml_position = state.xml_position
+
+  def canonical_key(self):
+    """Return a hashable key, equal for the same key at the same time.
+
+    The position is the exact number of quarter notes from the start, so
+    parts with different divisions give the same key.
+    """
+    return (Fraction(self.xml_position, self.state.divisions), self.key,
+            self.mode)
 
   def __str__(self):
     keys = (['Cb', 'Gb', 'Db', 'Ab', 'Eb', 'Bb', 'F', 'C', 'G', 'D',
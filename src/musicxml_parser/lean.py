@@ -0,0 +1,101 @@
+"""Release the XML elements a parsed document keeps.
+
+Every parsed object keeps the element it was parsed from (Note.xml_note,
+Measure.xml_measure and so on), and the document keeps the whole tree in
+_score. Once parsing and retiming are done these are only needed for
+debugging, so documents parsed with lean=True replace them with RELEASED.
+Streamed documents release every measure as soon as it is parsed.
+"""
+from .exception import XMLReleasedException
+from . import xml_backend
+
+
+class ReleasedXML(object):
+  """Placeholder for a released XML element.
+
+  Any use of it as an element raises XMLReleasedException.
+  """
+
+  __slots__ = ()
+
+  def __getattr__(self, name):
+    if name.startswith('__'):
+      raise AttributeError(name)
+    raise _released_error('.' + name)
+
+  def __iter__(self):
+    raise _released_error('iteration')
+
+  def __getitem__(self, index):
+    raise _released_error('indexing')
+
+  def __repr__(self):
+    return 'RELEASED'
+
+  def __reduce__(self):
+    return 'RELEASED'
+
+
+RELEASED = ReleasedXML()
+
+
+def _released_error(access):
+  return XMLReleasedException(
+      'The XML element was released after parsing (%s); parse the document '
+      'without lean=True, streaming or a cache to keep it.' % access)
+
+
+def release_document(document):
+  """Release the XML elements kept by a parsed MusicXMLDocument.
+
+  Element values that are parsed data themselves, such as the metronome
+  <per-minute> in Direction.type, are kept as standalone copies.
+
+  Args:
+    document: The MusicXMLDocument.
+  """
+  document._score = RELEASED
+  _release_state(document._state)
+  for part in document.parts:
+    for measure in part.measures:
+      release_measure(measure)
+
+
+def release_measure(measure):
+  """Release the XML elements kept by a Measure and its contents."""
+  measure.xml_measure = RELEASED
+  for note in measure.notes:
+    note.xml_note = RELEASED
+    note.note_notations.xml_notations = RELEASED
+    _release_state(note.state_fixed)
+  for direction in measure.directions:
+    direction.xml_direction = RELEASED
+    for key, value in direction.type.items():
+      if xml_backend.is_element(value):
+        direction.type[key] = xml_backend.detach(value)
+    _release_state(direction.state)
+  for tempo in measure.tempos:
+    tempo.xml_sound = RELEASED
+    _release_state(tempo.state)
+  for chord_symbol in measure.chord_symbols:
+    chord_symbol.xml_harmony = RELEASED
+  if measure.key_signature is not None:
+    measure.key_signature.xml_key = RELEASED
+    _release_state(measure.key_signature.state)
+  if measure.time_signature is not None:
+    _release_time_signatures(measure.time_signature)
+  _release_state(measure.state)
+
+
+def _release_state(state):
+  """Release the time signatures a parser state refers to."""
+  if state.time_signature is not None:
+    _release_time_signatures(state.time_signature)
+
+
+def _release_time_signatures(time_signature):
+  """Release a TimeSignature and the earlier ones its state refers to."""
+  while (time_signature is not None and
+         time_signature.xml_time is not RELEASED):
+    time_signature.xml_time = RELEASED
+    time_signature = time_signature.state.time_signature
@@ -1,24 +1,65 @@
 """MusicXML parser.
 """
+import collections
+import functools
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from fractions import Fraction
+import heapq
+import os
 import xml.etree.ElementTree as ET
+from xml.parsers.expat import ExpatError
 import zipfile
 import math
 from .exception import MusicXMLParseException, MultipleTimeSignatureException
 
 import six
 from . import constants
+from . import xml_backend
+from .cache import LeanPickle, ScoreCache
+from .lean import RELEASED, release_document
 
 from .measure import Measure
 from .tempo import Tempo
 from .key_signature import KeySignature
 from .score_part import ScorePart
 from .part import Part
-from .playable_notes import get_playable_notes
+from .stream import MeasureStream, StreamPart, replay_part
+from .expat_engine import ExpatPart, ExpatScoreReader
+from .playable_notes import (attach_part_notes, detach_part_notes,
+                             extract_part_notes, playing_order)
+from .note_array import build_note_array, note_ids
+from .note_index import NoteIndex
+from .tempo_map import TempoMap
+from .beat_grid import BeatGrid
+from .measure_index import MeasureIndex
+from .direction import resolve_wedges
 
 DEFAULT_MIDI_PROGRAM = 0  # Default MIDI Program (0 = grand piano)
 DEFAULT_MIDI_CHANNEL = 0  # Default MIDI Channel (0 = first channel)
 MUSICXML_MIME_TYPE = 'application/vnd.recordare.musicxml+xml'
+# Results of the playable-notes pipeline over all the parts of a document.
+_PlayableNotes = collections.namedtuple(
+    '_PlayableNotes', ['notes', 'rests', 'diagnostics', 'slur_indexes'])
+# Time signatures, key signatures and chord symbols of all parts, each
+# deduplicated by canonical_key() and sorted by position.
+_Timelines = collections.namedtuple(
+    '_Timelines', ['time_signatures', 'key_signatures', 'chord_symbols'])
+# Directions of all parts with their wedges resolved.
+_ResolvedDirections = collections.namedtuple(
+    '_ResolvedDirections', ['directions', 'wedges', 'diagnostics'])
+
+# Executors of MusicXMLDocument.get_notes by name.
+_EXECUTORS = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+# Parsing engines accepted by MusicXMLDocument. 'lxml' and 'etree' build
+# element trees with the matching xml_backend, 'expat' does not.
+ENGINES = ('lxml', 'etree', 'expat')
+
+
+# Parser state fields kept by parsed objects. Positions are left out as they
+# change with every note; the objects store their own positions.
+StateSnapshot = collections.namedtuple('StateSnapshot', [
+    'divisions', 'qpm', 'seconds_per_quarter', 'velocity', 'transpose',
+    'midi_channel', 'midi_program', 'measure_number', 'time_signature'])
 
 
 class MusicXMLParserState(object):
@@ -89,6 +130,45 @@ class MusicXMLParserState(object):
     self.is_beam_continue = False
     self.is_beam_stop = False
 
+    # Leave the time positions of the notes unset while parsing, as the
+    # retiming sets them once the whole score has been parsed. Everything
+    # else, the running clock included, is parsed as usual.
+    self.deferred_timing = False
+
+    # List receiving a clock step (see measure.py) for every move of the
+    # running clock while a measure is parsed into a MeasureTemplate, or None.
+    self.clock_steps = None
+
+    # Last StateSnapshot returned by snapshot()
+    self._snapshot = None
+
+  def snapshot(self):
+    """Return an immutable StateSnapshot of the current state.
+
+    The same instance is returned as long as the snapshot fields do not
+    change, so consecutive notes share one snapshot.
+
+    Returns:
+      A StateSnapshot.
+    """
+    snapshot = self._snapshot
+    if (snapshot is not None and
+        snapshot.divisions == self.divisions and
+        snapshot.qpm == self.qpm and
+        snapshot.seconds_per_quarter == self.seconds_per_quarter and
+        snapshot.velocity == self.velocity and
+        snapshot.transpose == self.transpose and
+        snapshot.midi_channel == self.midi_channel and
+        snapshot.midi_program == self.midi_program and
+        snapshot.measure_number == self.measure_number and
+        snapshot.time_signature is self.time_signature):
+      return snapshot
+    snapshot = StateSnapshot(
+        self.divisions, self.qpm, self.seconds_per_quarter, self.velocity,
+        self.transpose, self.midi_channel, self.midi_program,
+        self.measure_number, self.time_signature)
+    self._snapshot = snapshot
+    return snapshot
 
 
 class MusicXMLDocument(object):
@@ -102,118 +182,214 @@ class MusicXMLDocument(object):
   using the parse method.
   """
 
-  def __init__(self, filename):
-    self._score = self._get_score(filename)
+  # Attributes of a parsed document stored by a ScoreCache.
+  _CACHED_ATTRIBUTES = ('parts', '_score_parts', 'midi_resolution', '_state',
+                        'total_time_secs', 'total_time_duration')
+
+  def __init__(self, filename, streaming=False, engine=None, cache=None,
+               lean=False, deferred_timing=False):
+    if engine is None:
+      engine = xml_backend.DEFAULT_BACKEND
+    if engine not in ENGINES:
+      raise ValueError('Unknown parsing engine: %s' % engine)
+    self._backend = None
+    if engine != 'expat':
+      self._backend = xml_backend.get_backend(engine)
+    self._score = None
     self.parts = []
     # ScoreParts indexed by id.
     self._score_parts = {}
     self.midi_resolution = constants.STANDARD_PPQ
     self._state = MusicXMLParserState()
+    self._state.deferred_timing = deferred_timing
     # Total time in seconds
     self.total_time_secs = 0
     self.total_time_duration = 0
-    self._parse()
+    # _PlayableNotes of the default pipeline, cleared by invalidate()
+    self._playable_notes = None
+    # _ResolvedDirections, cleared by invalidate()
+    self._resolved_directions = None
+    # _Timelines, built after parsing and cleared by invalidate()
+    self._timelines = None
+    # BeatGrid of the first part, cleared by invalidate()
+    self._beat_grid = None
+    # NoteIndex of the playable notes, cleared by invalidate()
+    self._note_index = None
+    # MeasureIndexes by part index, cleared by invalidate()
+    self._measure_indexes = {}
+
+    if cache is not None:
+      if not isinstance(cache, ScoreCache):
+        cache = ScoreCache(cache)
+      with open(str(filename), 'rb') as score_file:
+        cache_key = cache.key(score_file.read(),
+                              'deferred_timing' if deferred_timing else '')
+      cached = cache.load(cache_key)
+      if cached is not None:
+        self.__dict__.update(cached)
+        self._score = RELEASED
+        self._get_timelines()
+        return
+
+    if engine == 'expat':
+      # The expat engine always reads the file one measure at a time.
+      with self._open_score(filename) as source:
+        self._parse_expat(source)
+    elif streaming:
+      with self._open_score(filename) as source:
+        self._parse_stream(source, filename)
+    else:
+      self._score = self._get_score(filename, self._backend)
+      self._parse()
     self._recalculate_time_position()
+    self._number_notes()
+    self._get_timelines()
+    if lean:
+      # Drop the element tree and the elements kept by parsed objects.
+      release_document(self)
+
+    if cache is not None:
+      cache.store(cache_key, {name: getattr(self, name)
+                              for name in self._CACHED_ATTRIBUTES})
+
+  @classmethod
+  def stream(cls, filename):
+    """Load a MusicXML file one measure at a time.
+
+    The score is read with iterparse instead of being loaded as a whole
+    element tree, and every <measure> element is cleared once it has been
+    turned into a Measure, which releases its elements as with lean=True.
+    Peak tree memory therefore depends on the largest measure instead of
+    the whole score. Repeats that have to parse a released measure again
+    read the part from the file once more; see stream.MeasureStream.
+
+    Args:
+      filename: The path of a .xml or .mxl MusicXML file.
+
+    Returns:
+      A fully parsed MusicXMLDocument.
+    """
+    return cls(filename, streaming=True)
 
   @staticmethod
-  def _get_score(filename):
-    """Given a MusicXML file, return the score as an xml.etree.ElementTree.
+  def _open_score(filename):
+    """Open a MusicXML file and return a binary file object of its score.
 
-    Given a MusicXML file, return the score as an xml.etree.ElementTree
-    If the file is compress (ends in .mxl), uncompress it first
+    If the file is compressed (ends in .mxl), the MusicXML file inside the
+    archive is opened without extracting it to memory first.
 
     Args:
         filename: The path of a MusicXML file
 
     Returns:
-      The score as an xml.etree.ElementTree.
+      A binary file object positioned at the start of the score.
 
     Raises:
       MusicXMLParseException: if the file cannot be parsed.
     """
-    score = None
     if not isinstance(filename, str):
       filename = str(filename)
-    if filename.endswith('.mxl'):
-      # Compressed MXL file. Uncompress in memory.
+    if not filename.endswith('.mxl'):
+      # Uncompressed XML file.
+      return open(filename, 'rb')
+
+    # Compressed MXL file.
+    try:
+      mxlzip = zipfile.ZipFile(filename)
+    except zipfile.BadZipfile as exception:
+      raise MusicXMLParseException(exception)
+
+    # A compressed MXL file may contain multiple files, but only one
+    # MusicXML file. Read the META-INF/container.xml file inside of the
+    # MXL file to locate the MusicXML file within the MXL file
+    # http://www.musicxml.com/tutorial/compressed-mxl-files/zip-archive-structure/
+
+    # Raise a MusicXMLParseException if multiple MusicXML files found
+
+    infolist = mxlzip.infolist()
+    if six.PY3:
+      # In py3, instead of returning raw bytes, ZipFile.infolist() tries to
+      # guess the filenames' encoding based on file headers, and decodes using
+      # this encoding in order to return a list of strings. If the utf-8
+      # header is missing, it decodes using the DOS code page 437 encoding
+      # which is almost definitely wrong. Here we need to explicitly check
+      # for when this has occurred and change the encoding to utf-8.
+      # https://stackoverflow.com/questions/37723505/namelist-from-zipfile-returns-strings-with-an-invalid-encoding
+      zip_filename_utf8_flag = 0x800
+      for info in infolist:
+        if info.flag_bits & zip_filename_utf8_flag == 0:
+          filename_bytes = info.filename.encode('437')
+          filename = filename_bytes.decode('utf-8', 'replace')
+          info.filename = filename
+
+    container_file = [x for x in infolist
+                      if x.filename == 'META-INF/container.xml']
+    compressed_file_name = ''
+
+    if container_file:
       try:
-        mxlzip = zipfile.ZipFile(filename)
-      except zipfile.BadZipfile as exception:
-        raise MusicXMLParseException(exception)
-
-      # A compressed MXL file may contain multiple files, but only one
-      # MusicXML file. Read the META-INF/container.xml file inside of the
-      # MXL file to locate the MusicXML file within the MXL file
-      # http://www.musicxml.com/tutorial/compressed-mxl-files/zip-archive-structure/
-
-      # Raise a MusicXMLParseException if multiple MusicXML files found
-
-      infolist = mxlzip.infolist()
-      if six.PY3:
-        # In py3, instead of returning raw bytes, ZipFile.infolist() tries to
-        # guess the filenames' encoding based on file headers, and decodes using
-        # this encoding in order to return a list of strings. If the utf-8
-        # header is missing, it decodes using the DOS code page 437 encoding
-        # which is almost definitely wrong. Here we need to explicitly check
-        # for when this has occurred and change the encoding to utf-8.
-        # https://stackoverflow.com/questions/37723505/namelist-from-zipfile-returns-strings-with-an-invalid-encoding
-        zip_filename_utf8_flag = 0x800
-        for info in infolist:
-          if info.flag_bits & zip_filename_utf8_flag == 0:
-            filename_bytes = info.filename.encode('437')
-            filename = filename_bytes.decode('utf-8', 'replace')
-            info.filename = filename
-
-      container_file = [x for x in infolist
-                        if x.filename == 'META-INF/container.xml']
-      compressed_file_name = ''
-
-      if container_file:
-        try:
-          container = ET.fromstring(mxlzip.read(container_file[0]))
-          for rootfile_tag in container.findall('./rootfiles/rootfile'):
-            if 'media-type' in rootfile_tag.attrib:
-              if rootfile_tag.attrib['media-type'] == MUSICXML_MIME_TYPE:
-                if not compressed_file_name:
-                  compressed_file_name = rootfile_tag.attrib['full-path']
-                else:
-                  raise MusicXMLParseException(
-                    'Multiple MusicXML files found in compressed archive')
-            else:
-              # No media-type attribute, so assume this is the MusicXML file
+        container = ET.fromstring(mxlzip.read(container_file[0]))
+        for rootfile_tag in container.findall('./rootfiles/rootfile'):
+          if 'media-type' in rootfile_tag.attrib:
+            if rootfile_tag.attrib['media-type'] == MUSICXML_MIME_TYPE:
               if not compressed_file_name:
                 compressed_file_name = rootfile_tag.attrib['full-path']
               else:
                 raise MusicXMLParseException(
                   'Multiple MusicXML files found in compressed archive')
-        except ET.ParseError as exception:
-          raise MusicXMLParseException(exception)
-
-      if not compressed_file_name:
-        raise MusicXMLParseException(
-          'Unable to locate main .xml file in compressed archive.')
-      if six.PY2:
-        # In py2, the filenames in infolist are utf-8 encoded, so
-        # we encode the compressed_file_name as well in order to
-        # be able to lookup compressed_file_info below.
-        compressed_file_name = compressed_file_name.encode('utf-8')
-      try:
-        compressed_file_info = [x for x in infolist
-                                if x.filename == compressed_file_name][0]
-      except IndexError:
-        raise MusicXMLParseException(
-          'Score file %s not found in zip archive' % compressed_file_name)
-      score_string = mxlzip.read(compressed_file_info)
-      try:
-        score = ET.fromstring(score_string)
+          else:
+            # No media-type attribute, so assume this is the MusicXML file
+            if not compressed_file_name:
+              compressed_file_name = rootfile_tag.attrib['full-path']
+            else:
+              raise MusicXMLParseException(
+                'Multiple MusicXML files found in compressed archive')
       except ET.ParseError as exception:
         raise MusicXMLParseException(exception)
-    else:
-      # Uncompressed XML file.
+
+    if not compressed_file_name:
+      raise MusicXMLParseException(
+        'Unable to locate main .xml file in compressed archive.')
+    if six.PY2:
+      # In py2, the filenames in infolist are utf-8 encoded, so
+      # we encode the compressed_file_name as well in order to
+      # be able to lookup compressed_file_info below.
+      compressed_file_name = compressed_file_name.encode('utf-8')
+    try:
+      compressed_file_info = [x for x in infolist
+                              if x.filename == compressed_file_name][0]
+    except IndexError:
+      raise MusicXMLParseException(
+        'Score file %s not found in zip archive' % compressed_file_name)
+    # The opened member keeps the archive readable after it is closed.
+    source = mxlzip.open(compressed_file_info)
+    mxlzip.close()
+    return source
+
+  @staticmethod
+  def _get_score(filename, backend=None):
+    """Given a MusicXML file, return the score as an xml.etree.ElementTree.
+
+    Given a MusicXML file, return the score as an xml.etree.ElementTree
+    If the file is compress (ends in .mxl), uncompress it first
+
+    Args:
+        filename: The path of a MusicXML file
+        backend: The xml_backend used to build the tree. Defaults to lxml
+          when it is installed.
+
+    Returns:
+      The score as an xml.etree.ElementTree.
+
+    Raises:
+      MusicXMLParseException: if the file cannot be parsed.
+    """
+    if backend is None:
+      backend = xml_backend.get_backend()
+    with MusicXMLDocument._open_score(filename) as source:
       try:
-        tree = ET.parse(filename)
-        score = tree.getroot()
-      except ET.ParseError as exception:
+        score = backend.parse(source)
+      except backend.ParseError as exception:
         raise MusicXMLParseException(exception)
 
     return score
@@ -223,25 +399,113 @@ class MusicXMLDocument(object):
     # Parse part-list
     xml_part_list = self._score.find('part-list')
     if xml_part_list is not None:
-      for element in xml_part_list:
-        if element.tag == 'score-part':
-          score_part = ScorePart(element)
-          self._score_parts[score_part.id] = score_part
+      self._parse_part_list(xml_part_list)
 
     # Parse parts
-    for score_part_index, child in enumerate(self._score.findall('part')):
-      part = Part(child, self._score_parts, self._state)
-      self.parts.append(part)
-      score_part_index += 1
-      if self._state.time_position > self.total_time_secs:
-        self.total_time_secs = self._state.time_position
-      if self._state.xml_position > self.total_time_duration:
-        self.total_time_duration = self._state.xml_position
+    for child in self._score.findall('part'):
+      self._add_part(Part(child, self._score_parts, self._state))
+
+  def _parse_stream(self, source, filename):
+    """Parse the MusicXML document from iterparse events.
+
+    Args:
+      source: A binary file object of the score.
+      filename: The path of the score, read again if a repeat goes back to
+        a measure that has to be parsed again.
+
+    Raises:
+      MusicXMLParseException: if the file cannot be parsed.
+    """
+    backend = self._backend
+    events = backend.iterparse(source, events=('start', 'end'))
+    root = None
+    try:
+      for event, element in events:
+        if root is None:
+          root = element
+        elif event == 'end' and element.tag == 'part-list':
+          self._parse_part_list(element)
+        elif event == 'start' and element.tag == 'part':
+          # The part pulls its measures from the same events iterator.
+          replay = functools.partial(self._replay_part, filename,
+                                     len(self.parts))
+          xml_measures = MeasureStream(events, element, replay)
+          part = StreamPart(element, self._score_parts, self._state,
+                            xml_measures)
+          xml_measures.close()
+          root.remove(element)
+          self._add_part(part)
+    except backend.ParseError as exception:
+      raise MusicXMLParseException(exception)
+
+  def _replay_part(self, filename, part_index):
+    """Open the score again for a MeasureStream, see stream.replay_part."""
+    return replay_part(self._backend, self._open_score(filename), part_index)
+
+  def _parse_expat(self, source):
+    """Parse the MusicXML document with expat callbacks.
+
+    Notes are digested straight from the expat events instead of being
+    built as elements first; see expat_engine for details.
+
+    Args:
+      source: A binary file object of the score.
+
+    Raises:
+      MusicXMLParseException: if the file cannot be parsed.
+    """
+    reader = ExpatScoreReader(source)
+    try:
+      for xml_part, xml_measures in reader.iter_parts():
+        if not self._score_parts and reader.xml_part_list is not None:
+          self._parse_part_list(reader.xml_part_list)
+        self._add_part(ExpatPart(xml_part, self._score_parts, self._state,
+                                 xml_measures))
+    except ExpatError as exception:
+      raise MusicXMLParseException(exception)
+
+  def _parse_part_list(self, xml_part_list):
+    """Parse the <part-list> element into ScoreParts indexed by id."""
+    for element in xml_part_list:
+      if element.tag == 'score-part':
+        score_part = ScorePart(element)
+        self._score_parts[score_part.id] = score_part
+
+  def _add_part(self, part):
+    """Append a parsed Part and extend the total time of the score."""
+    self.parts.append(part)
+    if self._state.time_position > self.total_time_secs:
+      self.total_time_secs = self._state.time_position
+    if self._state.xml_position > self.total_time_duration:
+      self.total_time_duration = self._state.xml_position
+
+  def _number_notes(self):
+    """Set the measure_number of the parsed notes from the MeasureIndexes.
+
+    While parsing it is the index of the <measure> element of the note.
+    It becomes the index of the unfolded measure of the onset plus one, the
+    number the playable notes of get_notes keep.
+    """
+    for i, part in enumerate(self.parts):
+      notes = [note for measure in part.measures for note in measure.notes]
+      if not notes:
+        continue
+      measure_numbers = self.get_measure_index(i).index_of(
+          [note.note_duration.xml_position for note in notes]) + 1
+      for note, measure_number in zip(notes, measure_numbers.tolist()):
+        note.measure_number = measure_number
 
   def _recalculate_time_position(self):
     """ Sometimes, the tempo marking is not located in the first voice.
     Therefore, the time position of each object should be calculate after parsing the entire tempo objects.
 
+    """
+    self._retime(self._get_tempos_from_start())
+
+  def _get_tempos_from_start(self):
+    """Return the tempos sorted by xml_position, starting at position 0.
+
+    If the first tempo starts later, a default tempo is inserted at 0.
     """
     tempos = self.get_tempos()
 
@@ -251,41 +515,49 @@ class MusicXMLDocument(object):
       default_tempo.xml_position = 0
       default_tempo.time_position = 0
       default_tempo.qpm = constants.DEFAULT_QUARTERS_PER_MINUTE
-      default_tempo.state.divisions = tempos[0].state.divisions
+      default_tempo.state = default_tempo.state._replace(
+          divisions=tempos[0].state.divisions)
       tempos.insert(0, default_tempo)
-    new_time_position = 0
-    for i in range(len(tempos)):
-      tempos[i].time_position = new_time_position
-      if i + 1 < len(tempos):
-        new_time_position += (tempos[i + 1].xml_position - tempos[i].xml_position) / tempos[i].qpm * 60 / tempos[
-          i].state.divisions
+    return tempos
+
+  def _retime(self, tempos):
+    """Set the time positions of the tempos and the timings of the notes.
+
+    Args:
+      tempos: Tempo objects sorted by xml_position.
+
+    Returns:
+      The TempoMap of the tempos.
+    """
+    self.invalidate()
+    tempo_map = TempoMap(tempos)
+    for tempo, time_position in zip(tempos, tempo_map.time_positions):
+      tempo.time_position = time_position
 
     for part in self.parts:
       for measure in part.measures:
         for note in measure.notes:
-          for i in range(len(tempos)):
-            if i + 1 == len(tempos):
-              current_tempo = tempos[i].qpm / 60 * tempos[i].state.divisions
-              break
-            else:
-              if tempos[i].xml_position <= note.note_duration.xml_position and tempos[
-                i + 1].xml_position > note.note_duration.xml_position:
-                current_tempo = tempos[i].qpm / 60 * tempos[i].state.divisions
-                break
-          note.note_duration.time_position = tempos[i].time_position + (
-                  note.note_duration.xml_position - tempos[i].xml_position) / current_tempo
-          note.note_duration.seconds = note.note_duration.duration / current_tempo
+          note_duration = note.note_duration
+          note_duration.time_position = tempo_map.seconds(
+              note_duration.xml_position)
+          note_duration.seconds = tempo_map.duration_seconds(
+              note_duration.xml_position, note_duration.duration)
+    return tempo_map
+
+  def get_tempo_map(self):
+    """Return the TempoMap used to time the notes of the score."""
+    return TempoMap(self._get_tempos_from_start())
 
   def get_chord_symbols(self):
-    """Return a list of all the chord symbols used in this score."""
-    chord_symbols = []
-    for part in self.parts:
-      for measure in part.measures:
-        for chord_symbol in measure.chord_symbols:
-          if chord_symbol not in chord_symbols:
-            # Prevent duplicate chord symbols
-            chord_symbols.append(chord_symbol)
-    return chord_symbols
+    """Return a list of all the chord symbols used in this score.
+
+    Chord symbols repeated by several parts at the same time are only
+    listed once.
+
+    Returns:
+      A list of ChordSymbol objects sorted by position.
+    """
+    return list(self._get_timelines().chord_symbols)
 
   def get_time_signatures(self):
     """Return a list of all the time signatures used in this score.
@@ -303,17 +575,10 @@ class MusicXMLDocument(object):
     to mxp.
 
     Returns:
-      A list of all TimeSignature objects used in this score.
+      A list of all TimeSignature objects used in this score, sorted by
+      position.
     """
-    time_signatures = []
-    for part in self.parts:
-      for measure in part.measures:
-        if measure.time_signature is not None:
-          if measure.time_signature not in time_signatures:
-            # Prevent duplicate time signatures
-            time_signatures.append(measure.time_signature)
-
-    return time_signatures
+    return list(self._get_timelines().time_signatures)
 
   def get_key_signatures(self):
     """Return a list of all the key signatures used in this score.
@@ -335,24 +600,46 @@ class MusicXMLDocument(object):
     C major.
 
     Returns:
-      A list of all KeySignature objects used in this score.
+      A list of all KeySignature objects used in this score, sorted by
+      position.
     """
-    key_signatures = []
-    for part in self.parts:
-      for measure in part.measures:
-        if measure.key_signature is not None:
-          if measure.key_signature not in key_signatures:
-            # Prevent duplicate key signatures
-            key_signatures.append(measure.key_signature)
+    return list(self._get_timelines().key_signatures)
 
-    if not key_signatures:
-      # If there are no key signatures, add C major at the beginning
-      key_signature = KeySignature(self._state)
-      key_signature.time_position = 0
-      key_signature.xml_position = 0
-      key_signatures.append(key_signature)
+  def _get_timelines(self):
+    """Return the _Timelines of the document, building them if needed.
 
-    return key_signatures
+    Signatures and chord symbols are deduplicated by their canonical_key(),
+    which counts positions in quarter notes, so the copies of a signature
+    in parts with different divisions are recognised. Of equal ones, the
+    first in part and measure order is kept.
+    """
+    if self._timelines is None:
+      time_signatures = {}
+      key_signatures = {}
+      chord_symbols = {}
+      for part in self.parts:
+        for measure in part.measures:
+          if measure.time_signature is not None:
+            time_signatures.setdefault(
+                measure.time_signature.canonical_key(), measure.time_signature)
+          if measure.key_signature is not None:
+            key_signatures.setdefault(
+                measure.key_signature.canonical_key(), measure.key_signature)
+          for chord_symbol in measure.chord_symbols:
+            chord_symbols.setdefault(chord_symbol.canonical_key(),
+                                     chord_symbol)
+
+      if not key_signatures:
+        # If there are no key signatures, add C major at the beginning
+        key_signature = KeySignature(self._state)
+        key_signature.time_position = 0
+        key_signature.xml_position = 0
+        key_signatures[key_signature.canonical_key()] = key_signature
+
+      self._timelines = _Timelines(
+          _sorted_timeline(time_signatures), _sorted_timeline(key_signatures),
+          _sorted_timeline(chord_symbols))
+    return self._timelines
 
   def get_tempos(self):
     """Return a list of all tempos in this score.
@@ -384,52 +671,198 @@ class MusicXMLDocument(object):
     tempos = self.get_tempos()
 
     tempos.sort(key=lambda x: x.xml_position)
-    new_time_position = 0
-    for i in range(len(tempos)):
-      tempos[i].time_position = new_time_position
-      if i + 1 < len(tempos):
-        new_time_position += (tempos[i + 1].xml_position - tempos[i].xml_position) / tempos[i].qpm * 60 / tempos[
-          i].state.divisions
+    self._retime(tempos)
 
-    for part in self.parts:
-      for measure in part.measures:
-        for note in measure.notes:
-          for i in range(len(tempos)):
-            if i + 1 == len(tempos):
-              current_tempo = tempos[i].qpm / 60 * tempos[i].state.divisions
-              break
-            else:
-              if tempos[i].xml_position <= note.note_duration.xml_position and tempos[
-                i + 1].xml_position > note.note_duration.xml_position:
-                current_tempo = tempos[i].qpm / 60 * tempos[i].state.divisions
-                break
-          note.note_duration.time_position = tempos[i].time_position + (
-                note.note_duration.xml_position - tempos[i].xml_position) / current_tempo
-          note.note_duration.seconds = note.note_duration.duration / current_tempo
   def get_measure_positions(self):
-    part = self.parts[0]
-    measure_positions = []
+    """Return the start xml_positions of the measures of the first part."""
+    return self.get_measure_index().xml_positions.tolist()
+
+  def get_measure_index(self, part_index=0):
+    """Return the MeasureIndex of the measures of a part.
+
+    The parsed notes, and the playable notes of get_notes copied from them,
+    take their measure_number from this index: it is the index of the
+    measure of their onset plus one, as measure_number counts from 1. The
+    index is built on the first call.
+
+    Args:
+      part_index: Index of the part in parts.
+    """
+    if part_index not in self._measure_indexes:
+      self._measure_indexes[part_index] = MeasureIndex(
+          self.parts[part_index].measures)
+    return self._measure_indexes[part_index]
+
 
-    for measure in part.measures:
-      measure_positions.append(measure.start_xml_position)
+  def invalidate(self):
+    """Drop the computed results of the getters.
 
-    return measure_positions
+    These are get_notes, get_slur_spans, get_note_index, get_directions,
+    get_wedges, get_beat_grid, get_measure_index and the time signature,
+    key signature and chord symbol timelines.
+
+    They are computed once and reused; call this after modifying the parts
+    of the document so that they are computed again.
+    """
+    self._playable_notes = None
+    self._resolved_directions = None
+    self._timelines = None
+    self._beat_grid = None
+    self._note_index = None
+    self._measure_indexes = {}
+
+  def get_notes(self, melody_only=False, grace_note=True, diagnostics=None,
+                pipeline=None, stats=None, executor=None, workers=None):
+    """Return the playable notes and the rests of all parts.
+
+    The parsed notes are left untouched: the playable notes are copies of
+    them, made on the first call and reused by later calls until
+    invalidate() is called. Runs with a pipeline or stats are not reused.
+
+    measure_number counts the unfolded measures from 1 and is the measure
+    the onset of the note falls in, see get_measure_index. A grace note
+    written at the end of a measure, or a note past the end of an overfull
+    measure, therefore gets the number of the next measure.
+
+    The lists are new, but the Notes in them are the reused ones, which
+    get_note_index, get_note_array and get_slur_spans also hand out.
+    Modifying a returned Note therefore changes what all of these return;
+    copy it with Note.derive() first, or call invalidate() afterwards to
+    get notes made from the parsed notes again.
+
+    Args:
+      melody_only: Unused.
+      grace_note: Unused.
+      diagnostics: Optional list that receives a playable_notes.TieDiagnostic
+        for every tie that could not be resolved.
+      pipeline: The pipeline.Pipeline run on every part. Defaults to
+        playable_notes.DEFAULT_PIPELINE.
+      stats: Optional pipeline.PipelineStats accumulating the wall time and
+        note counts of every stage over all parts.
+      executor: Runs the parts in parallel: 'thread' or 'process' for a new
+        pool of that kind, or a concurrent.futures.Executor. Defaults to
+        running them one after the other. Threads only help while the GIL
+        is released, so large ensembles should use processes. The parts
+        are then pickled without their source elements, as the cache
+        stores them, and the pipeline has to be picklable.
+      workers: Number of workers of a new pool. Defaults to the number of
+        CPUs, at most one per part.
+
+    Returns:
+      A (notes, rests) tuple of new lists of the shared Notes.
 
+    Raises:
+      ValueError: if executor is an unknown string or workers is smaller
+        than 1.
+    """
+    if pipeline is None and stats is None:
+      playable_notes = self._get_playable_notes(melody_only, grace_note,
+                                                executor, workers)
+    else:
+      playable_notes = self._run_playable_notes(pipeline, stats, executor,
+                                                workers)
+    if diagnostics is not None:
+      diagnostics.extend(playable_notes.diagnostics)
+    return list(playable_notes.notes), list(playable_notes.rests)
+
+  def _get_playable_notes(self, melody_only=False, grace_note=True,
+                          executor=None, workers=None):
+    """Return the memoized _PlayableNotes of the default pipeline.
+
+    melody_only and grace_note do not change the notes, so they are not
+    part of the memo.
+    """
+    if self._playable_notes is None:
+      self._playable_notes = self._run_playable_notes(
+          executor=executor, workers=workers)
+    return self._playable_notes
+
+  def _run_playable_notes(self, pipeline=None, stats=None, executor=None,
+                          workers=None):
+    """Run the playable-notes pipeline on every part.
+
+    Every part comes back sorted into playing order, so the parts are
+    combined by a k-way merge. heapq.merge keeps notes with equal keys in
+    part order, as the stable sort of all the notes it replaces did.
+    """
+    record_stats = stats is not None
+    if executor is None:
+      part_notes = [extract_part_notes(part, pipeline, record_stats,
+                                       self.get_measure_index(i))
+                    for i, part in enumerate(self.parts)]
+    else:
+      part_notes = self._map_parts(executor, workers, pipeline, record_stats)
 
-  def get_notes(self, melody_only=False, grace_note=True):
-    notes = []
+    notes = list(heapq.merge(*[x.notes for x in part_notes],
+                             key=playing_order))
     rests = []
-    num_parts = len(self.parts)
-    for instrument_index in range(num_parts):
-      part = self.parts[instrument_index]
+    diagnostics = []
+    slur_indexes = []
+    for part in part_notes:
+      rests.extend(part.rests)
+      diagnostics.extend(part.diagnostics)
+      slur_indexes.append(part.slur_index)
+      if record_stats:
+        stats.update(part.stats)
+    return _PlayableNotes(notes, rests, diagnostics, slur_indexes)
+
+  def _map_parts(self, executor, workers, pipeline, record_stats):
+    """Run extract_part_notes on every part with an executor.
+
+    Returns:
+      The PartNotes of the parts, in part order.
+    """
+    if isinstance(executor, six.string_types):
+      if executor not in _EXECUTORS:
+        raise ValueError('Unknown executor: %s' % executor)
+      if workers is None:
+        workers = min(os.cpu_count() or 1, max(len(self.parts), 1))
+      if workers < 1:
+        raise ValueError('workers must be at least 1')
+      with _EXECUTORS[executor](max_workers=workers) as pool:
+        return self._map_parts(pool, None, pipeline, record_stats)
+
+    futures = [executor.submit(_detach_part_notes, LeanPickle(part), pipeline,
+                               record_stats, self.get_measure_index(i))
+               for i, part in enumerate(self.parts)]
+    return [attach_part_notes(future.result(), part)
+            for future, part in zip(futures, self.parts)]
+
+  def get_note_array(self):
+    """Return the playable notes as a NumPy structured array.
+
+    The rows follow the order of get_notes. See note_array.NOTE_DTYPE for
+    the columns; the id column numbers notes in document order and does not
+    change between calls.
 
-      notes_part, rests_part = get_playable_notes(part)
-      notes.extend(notes_part)
-      rests.extend(rests_part)
-    notes.sort(key=lambda x: (x.note_duration.xml_position,
-              x.note_duration.grace_order, -x.pitch[1]))
-    return notes, rests
+    Returns:
+      A structured array of note_array.NOTE_DTYPE.
+    """
+    notes, _ = self.get_notes()
+    return build_note_array(notes, note_ids(self.parts))
+
+  def get_note_index(self):
+    """Return a NoteIndex of the playable notes of get_notes.
+
+    The index answers which notes sound at a time and which start in a time
+    range, in xml_position or seconds, and can filter them by part index,
+    staff and voice. It is built on the first call.
+    """
+    if self._note_index is None:
+      notes, _ = self.get_notes()
+      ids = note_ids(self.parts)
+      self._note_index = NoteIndex(
+          notes, [ids[id(note.parsed_note)][1] for note in notes])
+    return self._note_index
 
+  def get_slur_spans(self):
+    """Return the resolved slurs of every part.
+
+    Returns:
+      A list with a playable_notes.SlurIndex per part, in part order. Its
+      spans() method lists the slurs of a voice as phrase spans.
+    """
+    return list(self._get_playable_notes().slur_indexes)
 
   def find(self, f, seq):
     items_list = []
@@ -463,156 +896,84 @@ class MusicXMLDocument(object):
 
     return xml_notes
 
-  def get_directions(self):
-    directions = []
-    for part in self.parts:
-        for measure in part.measures:
-            for direction in measure.directions:
-                directions.append(direction)
-
-    directions.sort(key=lambda x: x.xml_position)
-    cleaned_direction = []
-    for i in range(len(directions)):
-        dir = directions[i]
-        if not dir.type == None:
-            if dir.type['type'] == "none":
-                for j in range(i):
-                    prev_dir = directions[i-j-1]
-                    if 'number' in prev_dir.type.keys():
-                        prev_key = prev_dir.type['type']
-                        prev_num = prev_dir.type['number']
-                    else:
-                        continue
-                    if prev_num == dir.type['number']:
-                        if prev_key == "crescendo":
-                            dir.type['type'] = 'crescendo'
-                            break
-                        elif prev_key == "diminuendo":
-                            dir.type['type'] = 'diminuendo'
-                            break
-            cleaned_direction.append(dir)
-        else:
-            print(vars(dir.xml_direction))
+  def get_directions(self, diagnostics=None):
+    """Return the directions of all parts, sorted by xml_position.
+
+    Wedge stops get the type of the crescendo or diminuendo they stop, see
+    direction.resolve_wedges. The result is computed once and reused until
+    invalidate() is called.
+
+    Args:
+      diagnostics: Optional list that receives a
+        direction.DirectionDiagnostic for every untyped direction and every
+        wedge that could not be paired.
+
+    Returns:
+      A new list of Directions.
+    """
+    resolved = self._get_resolved_directions()
+    if diagnostics is not None:
+      diagnostics.extend(resolved.diagnostics)
+    return list(resolved.directions)
 
-    return cleaned_direction
+  def get_wedges(self):
+    """Return the crescendo and diminuendo wedges of all parts.
+
+    Returns:
+      A list of direction.Wedge (start, stop) pairs of Directions, part by
+      part, each part sorted by the xml_position of the starts. stop is
+      None for a wedge that is never stopped.
+    """
+    return list(self._get_resolved_directions().wedges)
+
+  def _get_resolved_directions(self):
+    """Return the memoized _ResolvedDirections of the document.
+
+    Wedges are resolved part by part, as staff and wedge numbers belong to
+    a part, and the sorted directions of the parts are merged.
+    """
+    if self._resolved_directions is None:
+      part_directions = []
+      wedges = []
+      diagnostics = []
+      for part in self.parts:
+        directions = [direction for measure in part.measures
+                      for direction in measure.directions]
+        directions.sort(key=lambda x: x.xml_position)
+        wedges.extend(resolve_wedges(directions, diagnostics))
+        part_directions.append(directions)
+      directions = list(heapq.merge(*part_directions,
+                                    key=lambda x: x.xml_position))
+      self._resolved_directions = _ResolvedDirections(directions, wedges,
+                                                      diagnostics)
+    return self._resolved_directions
+
+  def get_beat_grid(self):
+    """Return the BeatGrid of the first part.
+
+    Measures follow the time signatures of the first part, and the first
+    time signature of the score before the part has one. The grid is built
+    on the first call, which also sets Measure.implicit on the measures of
+    the first part.
+    """
+    if self._beat_grid is None:
+      measures = self.parts[0].measures
+      self._beat_grid = BeatGrid(measures, self.get_time_signatures()[0])
+      for measure, implicit in zip(measures, self._beat_grid.implicit):
+        measure.implicit = bool(implicit)
+    return self._beat_grid
 
   def get_beat_positions(self, in_measure_level=False):
-    piano = self.parts[0]
-    num_measure = len(piano.measures)
-    time_signatures = self.get_time_signatures()
-    time_sig_position = [time.xml_position for time in time_signatures]
-    beat_piece = []
-    for i in range(num_measure):
-      measure = piano.measures[i]
-      measure_start = measure.start_xml_position
-      corresp_time_sig_idx = self.binary_index(time_sig_position, measure_start)
-      corresp_time_sig = time_signatures[corresp_time_sig_idx]
-      # corresp_time_sig = measure.time_signature
-      full_measure_length = corresp_time_sig.state.divisions * corresp_time_sig.numerator / corresp_time_sig.denominator * 4
-      if i < num_measure - 1:
-        actual_measure_length = piano.measures[i + 1].start_xml_position - measure_start
-      else:
-        actual_measure_length = full_measure_length
-
-      # if i +1 < num_measure:
-      #     measure_length = piano.measures[i+1].start_xml_position - measure_start
-      # else:
-      #     measure_length = measure_start - piano.measures[i-1].start_xml_position
-
-      num_beat_in_measure = corresp_time_sig.numerator
-      if in_measure_level:
-        num_beat_in_measure = 1
-      elif num_beat_in_measure == 6:
-        num_beat_in_measure = 2
-      elif num_beat_in_measure == 9:
-        num_beat_in_measure = 3
-      elif num_beat_in_measure == 12:
-        num_beat_in_measure = 4
-      elif num_beat_in_measure == 18:
-        num_beat_in_measure = 3
-      elif num_beat_in_measure == 24:
-        num_beat_in_measure = 4
-      inter_beat_interval = full_measure_length / num_beat_in_measure
-      if actual_measure_length != full_measure_length:
-        measure.implicit = True
-      else:
-        measure.implicit = False
-
-      if measure.implicit:
-        length_ratio = actual_measure_length / full_measure_length
-        minimum_beat = 1 / num_beat_in_measure
-        num_beat_in_measure = int(math.ceil(length_ratio / minimum_beat))
-        if i == 0:
-          for j in range(-num_beat_in_measure, 0):
-            beat = piano.measures[i + 1].start_xml_position + j * inter_beat_interval
-            if len(beat_piece) > 0 and beat > beat_piece[-1]:
-              beat_piece.append(beat)
-            elif len(beat_piece) == 0:
-              beat_piece.append(beat)
-        else:
-          for j in range(0, num_beat_in_measure):
-            beat = piano.measures[i].start_xml_position + j * inter_beat_interval
-            if beat > beat_piece[-1]:
-              beat_piece.append(beat)
-      else:
-        for j in range(num_beat_in_measure):
-          beat = measure_start + j * inter_beat_interval
-          beat_piece.append(beat)
-        #
-      # for note in measure.notes:
-      #     note.on_beat = check_note_on_beat(note, measure_start, measure_length)
-    return beat_piece
+    """Return the beat positions of the first part, see BeatGrid.beats."""
+    return self.get_beat_grid().beats(in_measure_level).tolist()
 
   def get_interval_positions(self, interval_in_16th):
-    piano = self.parts[0]
-    num_measure = len(piano.measures)
-    time_signatures = self.get_time_signatures()
-    time_sig_position = [time.xml_position for time in time_signatures]
-    beat_piece = []
-    for i in range(num_measure):
-      measure = piano.measures[i]
-      measure_start = measure.start_xml_position
-      corresp_time_sig_idx = self.binary_index(time_sig_position, measure_start)
-      corresp_time_sig = time_signatures[corresp_time_sig_idx]
-
-      num_beat_in_measure = int(corresp_time_sig.numerator * 16 / (corresp_time_sig.denominator * interval_in_16th))
-      if num_beat_in_measure == 0:
-        raise Exception(f'measure is longer than a interval: {corresp_time_sig.numerator} / {corresp_time_sig.denominator}')
-      inter_beat_interval = corresp_time_sig.state.divisions * interval_in_16th / 4 
-
-      full_measure_length = corresp_time_sig.state.divisions * corresp_time_sig.numerator / corresp_time_sig.denominator * 4
-      if i < num_measure - 1:
-        actual_measure_length = piano.measures[i + 1].start_xml_position - measure_start
-      else:
-        actual_measure_length = full_measure_length
-
-      if actual_measure_length != full_measure_length:
-        measure.implicit = True
-      else:
-        measure.implicit = False
-
-      if measure.implicit:
-        length_ratio = actual_measure_length / full_measure_length
-        minimum_beat = 1 / num_beat_in_measure
-        num_beat_in_measure = int(math.ceil(length_ratio / minimum_beat))
-        if i == 0:
-          for j in range(-num_beat_in_measure, 0):
-            beat = piano.measures[i + 1].start_xml_position + j * inter_beat_interval
-            if len(beat_piece) > 0 and beat > beat_piece[-1]:
-              beat_piece.append(beat)
-            elif len(beat_piece) == 0:
-              beat_piece.append(beat)
-        else:
-          for j in range(0, num_beat_in_measure):
-            beat = piano.measures[i].start_xml_position + j * inter_beat_interval
-            if beat > beat_piece[-1]:
-              beat_piece.append(beat)
-      else:
-        for j in range(num_beat_in_measure):
-          beat = measure_start + j * inter_beat_interval
-          beat_piece.append(beat)
-
-    return beat_piece
+    """Return positions every interval_in_16th sixteenths of the first part.
+
+    See BeatGrid.intervals.
+    """
+    return self.get_beat_grid().intervals(interval_in_16th).tolist()
+
   def get_accidentals(self):
     directions = []
     accs = ['#', '♭', '♮']
@@ -654,3 +1015,18 @@ class MusicXMLDocument(object):
                     return midpoint
             return midpoint
     return last
+
+
+def _detach_part_notes(lean_part, pipeline, record_stats, measure_index):
+  """Run detach_part_notes on the part held by a cache.LeanPickle."""
+  return detach_part_notes(lean_part.value, pipeline, record_stats,
+                           measure_index)
+
+
+def _sorted_timeline(objects):
+  """Return the values of a dict keyed by canonical_key(), sorted by time.
+
+  The position is the first item of the keys; objects at the same position
+  keep the order of the dict.
+  """
+  return [obj for key, obj in sorted(objects.items(), key=lambda x: x[0][0])]
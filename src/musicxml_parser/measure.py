@@ -1,3 +1,4 @@
+import copy
 from fractions import Fraction
 
 from . import constants
@@ -9,6 +10,11 @@ from .exception import MultipleTimeSignatureException
 from .note import Note
 from .direction import Direction
 
+# A move of the running clock of the parser is recorded as a clock step,
+# a (seconds, number of notes, number of directions, number of tempos,
+# number of chord symbols, key signature, time signature) tuple holding the
+# objects the measure being parsed had before the move.
+
 
 class Measure(object):
   """Internal represention of the MusicXML <measure> element."""
@@ -34,12 +40,16 @@ class Measure(object):
     # Used for time signature calculations
     self.duration = 0
     self.implicit = False
+    # Index of the <measure> element in its part, and its number attribute
+    self.source_index = state.measure_number
+    self.number = None
     self.state = state
     # Record the starting time of this measure so that time signatures
     # can be inserted at the beginning of the measure
     self.start_time_position = self.state.time_position
     self.start_xml_position = self.state.xml_position
-    self._parse()
+    if xml_measure is not None:
+      self._parse()
     # Update the time signature if a partial or pickup measure
     # self._fix_time_signature()
 
@@ -49,39 +59,56 @@ class Measure(object):
     # direction = []
     if 'implicit' in self.xml_measure.attrib.keys():
       self.implicit = self.xml_measure.attrib['implicit']
+    if 'number' in self.xml_measure.attrib.keys():
+      self.number = self.xml_measure.attrib['number']
     for child in self.xml_measure:
-
-      if child.tag == 'attributes':
-        self._parse_attributes(child)
-      elif child.tag == 'backup':
-        self._parse_backup(child)
-      elif child.tag == 'barline':
-        self._parse_barline(child)
-      elif child.tag == 'direction':
-        # Get tempo in <sound /> and update state tempo and time_position
-        self._parse_direction(child)
-        direction = Direction(child, self.state)
-        self.directions.append(direction)
-        # self.state.previous_direction = direction
-      elif child.tag == 'forward':
-        self._parse_forward(child)
-      elif child.tag == 'harmony':
-        chord_symbol = ChordSymbol(child, self.state)
-        self.chord_symbols.append(chord_symbol)
-      elif child.tag == 'note':
-        note = Note(child, self.state)
-        self.notes.append(note)
-        # Keep track of current note as previous note for chord timings
-        self.state.previous_note_duration = note.note_duration.duration
-        self.state.previous_note_time_position = note.note_duration.time_position
-        self.state.previous_note_xml_position = note.note_duration.xml_position
-
-        # Sum up the MusicXML durations in voice 1 of this measure
-        if note.voice == 1 and not note.is_in_chord:
-          self.duration += note.note_duration.duration
-      else:
-        # Ignore other tag types because they are not relevant.
-        pass
+      self._parse_child(child)
+
+  def _parse_child(self, child):
+    """Parse a child element of the <measure> element."""
+    if child.tag == 'attributes':
+      self._parse_attributes(child)
+    elif child.tag == 'backup':
+      self._parse_backup(child)
+    elif child.tag == 'barline':
+      self._parse_barline(child)
+    elif child.tag == 'direction':
+      # Get tempo in <sound /> and update state tempo and time_position
+      self._parse_direction(child)
+      direction = Direction(child, self.state)
+      self.directions.append(direction)
+      # self.state.previous_direction = direction
+    elif child.tag == 'forward':
+      self._parse_forward(child)
+    elif child.tag == 'harmony':
+      chord_symbol = ChordSymbol(child, self.state)
+      self.chord_symbols.append(chord_symbol)
+    elif child.tag == 'note':
+      self._add_note(Note(child, self.state))
+    else:
+      # Ignore other tag types because they are not relevant.
+      pass
+
+  def _add_note(self, note):
+    """Append a parsed Note and keep track of it as the previous note."""
+    self.notes.append(note)
+    # Keep track of current note as previous note for chord timings
+    self.state.previous_note_duration = note.note_duration.duration
+    self.state.previous_note_time_position = note.note_duration.time_position
+    self.state.previous_note_xml_position = note.note_duration.xml_position
+
+    # Sum up the MusicXML durations in voice 1 of this measure
+    if note.voice == 1 and not note.is_in_chord:
+      self.duration += note.note_duration.duration
+    if not note.is_in_chord:
+      self._record_clock_step(note.note_duration.seconds)
+
+  def _record_clock_step(self, seconds):
+    """Add a clock step to state.clock_steps if it records them."""
+    if self.state.clock_steps is not None:
+      self.state.clock_steps.append((
+          seconds, len(self.notes), len(self.directions), len(self.tempos),
+          len(self.chord_symbols), self.key_signature, self.time_signature))
 
   def _parse_barline(self, xml_barline):
     """Parse the MusicXML <barline> element.
@@ -161,12 +188,7 @@ class Measure(object):
 
     xml_duration = xml_backup.find('duration')
     backup_duration = int(xml_duration.text)
-    midi_ticks = backup_duration * (constants.STANDARD_PPQ
-                                    / self.state.divisions)
-    seconds = ((midi_ticks / constants.STANDARD_PPQ)
-               * self.state.seconds_per_quarter)
-    self.state.time_position -= seconds
-    self.state.xml_position -= backup_duration
+    self._move_position(-backup_duration)
 
   def _parse_direction(self, xml_direction):
     """Parse the MusicXML <direction> element."""
@@ -212,12 +234,21 @@ class Measure(object):
 
     xml_duration = xml_forward.find('duration')
     forward_duration = int(xml_duration.text)
-    midi_ticks = forward_duration * (constants.STANDARD_PPQ
-                                     / self.state.divisions)
+    self._move_position(forward_duration)
+
+  def _move_position(self, duration):
+    """Move the global time position by a MusicXML duration.
+
+    Args:
+      duration: The MusicXML duration to move by, negative to move backwards.
+    """
+    midi_ticks = duration * (constants.STANDARD_PPQ
+                             / self.state.divisions)
     seconds = ((midi_ticks / constants.STANDARD_PPQ)
                * self.state.seconds_per_quarter)
     self.state.time_position += seconds
-    self.state.xml_position += forward_duration
+    self.state.xml_position += duration
+    self._record_clock_step(seconds)
 
   def _fix_time_signature(self):
     """Correct the time signature for incomplete measures.
@@ -283,3 +314,274 @@ class Measure(object):
         new_time_signature.xml_position = self.start_xml_position
         self.time_signature = new_time_signature
         self.state.time_signature = new_time_signature
+
+
+class MeasureTemplate(object):
+  """A parsed source measure that can be instantiated at other positions.
+
+  Repeats, endings and da capo jumps pass over a source measure again. As
+  long as the parser state it starts from only differs in position, parsing
+  it again gives the same objects at other positions, so instantiate()
+  copies the parsed measure instead. Time positions are not shifted but
+  replayed from the clock steps of the parse, so that they are the same
+  floats a new parse would give.
+  """
+
+  def __init__(self, measure, context, entry_time_signature, clock_steps):
+    """Keep a measure parsed from the state described by context.
+
+    Only what the state looks like after the measure is read here; the
+    clock steps are indexed the first time the template is instantiated,
+    as most measures are never passed over again.
+
+    Args:
+      measure: The Measure, just parsed. Its state is read as the state
+        the measure leaves behind.
+      context: The value of MeasureTemplate.context() for the state before
+        the measure was parsed.
+      entry_time_signature: The time signature of that state.
+      clock_steps: The clock steps recorded while parsing the measure.
+    """
+    state = measure.state
+    self.measure = measure
+    self.context = context
+    self.entry_time_signature = entry_time_signature
+    self.exit_context = MeasureTemplate.context(state)
+    self.exit_time_position = state.time_position
+    self.exit_xml_position = state.xml_position
+    self.previous_note_duration = state.previous_note_duration
+    self.previous_note_xml_position = state.previous_note_xml_position
+    self.clock_steps = clock_steps
+    # The grace notes of the measure are among the last ones of the state.
+    grace_notes = state.previous_grace_notes
+    first = max(len(grace_notes) - len(measure.notes), 0)
+    self.grace_notes = grace_notes[first:]
+    self.reusable = None
+
+  def _index(self):
+    """Index the clock steps and decide whether the template is reusable."""
+    measure = self.measure
+    steps = list(zip(*self.clock_steps)) or [()] * 7
+    self.seconds = steps[0]
+    # index of the clock step each object was created at
+    self.note_steps = _steps_of(steps[1], len(measure.notes))
+    self.direction_steps = _steps_of(steps[2], len(measure.directions))
+    self.tempo_steps = _steps_of(steps[3], len(measure.tempos))
+    self.chord_symbol_steps = _steps_of(steps[4], len(measure.chord_symbols))
+    self.key_signature_step = _step_of(steps[5], measure.key_signature)
+    self.time_signature_step = _step_of(steps[6], measure.time_signature)
+    self.clock_steps = None
+    indices = {id(note): i for i, note in enumerate(measure.notes)}
+    self.grace_indices = []
+    for note in reversed(self.grace_notes):
+      if id(note) not in indices:
+        break
+      self.grace_indices.insert(0, indices[id(note)])
+    self.grace_notes = None
+    # A chord note starting the measure reads the previous note of the
+    # state. Other measures are reused if replaying their clock gives back
+    # the time positions of the parse, which fails for chord symbols with
+    # an offset, for example.
+    self.reusable = (not (measure.notes and measure.notes[0].is_in_chord)
+                     and self._replays())
+
+  @staticmethod
+  def context(state):
+    """Return the fields of state that parsing a measure depends on.
+
+    Positions are left out, and so is the time signature: parsing only
+    keeps a reference to it, which instantiate() replaces.
+    """
+    return (state.divisions, state.qpm, state.seconds_per_quarter,
+            state.velocity, state.transpose, state.midi_channel,
+            state.midi_program, state.measure_number, state.chord_index,
+            state.is_beam_start, state.is_beam_continue, state.is_beam_stop,
+            state.first_ending_discontinue, state.deferred_timing)
+
+  def matches(self, state):
+    """Return whether parsing the measure from state gives the template."""
+    if MeasureTemplate.context(state) != self.context:
+      return False
+    if self.reusable is None:
+      self._index()
+    return self.reusable
+
+  def _clock(self, time_position):
+    """Return the running clock before every step and after the last one."""
+    clock = [time_position]
+    for seconds in self.seconds:
+      time_position += seconds
+      clock.append(time_position)
+    return clock
+
+  def _note_times(self, clock):
+    """Return the time positions of the notes given the running clock."""
+    times = []
+    time_position = None
+    for note, step in zip(self.measure.notes, self.note_steps):
+      if not note.is_in_chord:
+        time_position = float("{0:.8f}".format(clock[step]))
+      times.append(time_position)
+    return times
+
+  def _replays(self):
+    """Return whether the clock steps give the time positions of the parse."""
+    template = self.measure
+    clock = self._clock(template.start_time_position)
+    if clock[-1] != self.exit_time_position:
+      return False
+    pairs = list(zip(template.directions, self.direction_steps))
+    pairs += zip(template.tempos, self.tempo_steps)
+    pairs += zip(template.chord_symbols, self.chord_symbol_steps)
+    if template.key_signature is not None:
+      pairs.append((template.key_signature, self.key_signature_step))
+    if template.time_signature is not None:
+      pairs.append((template.time_signature, self.time_signature_step))
+    if any(obj.time_position != clock[step] for obj, step in pairs):
+      return False
+    if template.state.deferred_timing:
+      # the notes are timed by the retiming
+      return True
+    return all(note.note_duration.time_position == time_position
+               for note, time_position in zip(template.notes,
+                                              self._note_times(clock)))
+
+  def instantiate(self, state):
+    """Return the measure as parsed at the position of state, or None.
+
+    state is updated as parsing the measure would. None is returned, and
+    state left untouched, if the template does not match state.
+    """
+    if not self.matches(state):
+      return None
+    template = self.measure
+    xml_shift = state.xml_position - template.start_xml_position
+    clock = self._clock(state.time_position)
+
+    measure = Measure.__new__(Measure)
+    measure.__dict__.update(template.__dict__)
+    measure.state = state
+    measure.start_time_position = state.time_position
+    measure.start_xml_position = state.xml_position
+
+    # the snapshots refer to the time signature of the state instead of the
+    # one the template started from, and to the copy of the time signature
+    # of the measure
+    time_signatures = {id(self.entry_time_signature): state.time_signature}
+    if template.time_signature is not None:
+      time_signatures[id(template.time_signature)] = _moved(
+          template.time_signature, xml_shift,
+          clock[self.time_signature_step])
+    snapshots = {}
+
+    def snapshot(state_snapshot):
+      return _replace_time_signature(state_snapshot, time_signatures,
+                                     snapshots)
+
+    def move(obj, step):
+      obj = _moved(obj, xml_shift, clock[step])
+      obj.state = snapshot(obj.state)
+      return obj
+
+    if template.time_signature is not None:
+      measure.time_signature = time_signatures[id(template.time_signature)]
+      measure.time_signature.state = snapshot(measure.time_signature.state)
+    if template.key_signature is not None:
+      measure.key_signature = move(template.key_signature,
+                                   self.key_signature_step)
+    measure.tempos = [move(tempo, step) for tempo, step
+                      in zip(template.tempos, self.tempo_steps)]
+    measure.directions = []
+    for direction, step in zip(template.directions, self.direction_steps):
+      direction = move(direction, step)
+      direction.type = dict(direction.type)
+      measure.directions.append(direction)
+    measure.chord_symbols = []
+    for chord_symbol, step in zip(template.chord_symbols,
+                                  self.chord_symbol_steps):
+      chord_symbol = _moved(chord_symbol, xml_shift, clock[step])
+      chord_symbol.state = state
+      chord_symbol.degrees = list(chord_symbol.degrees)
+      measure.chord_symbols.append(chord_symbol)
+    measure.notes = []
+    for template_note, time_position in zip(template.notes,
+                                            self._note_times(clock)):
+      note = template_note.derive()
+      note.parsed_note = None
+      note.state = state
+      note.state_fixed = snapshot(template_note.state_fixed)
+      note_duration = note.note_duration
+      note_duration.state = state
+      note_duration.xml_position += xml_shift
+      if not state.deferred_timing:
+        note_duration.time_position = time_position
+      measure.notes.append(note)
+    for i in self.grace_indices:
+      state.previous_grace_notes.append(measure.notes[i])
+
+    (state.divisions, state.qpm, state.seconds_per_quarter, state.velocity,
+     state.transpose, state.midi_channel, state.midi_program,
+     state.measure_number, state.chord_index, state.is_beam_start,
+     state.is_beam_continue, state.is_beam_stop,
+     state.first_ending_discontinue, _) = self.exit_context
+    if template.time_signature is not None:
+      state.time_signature = measure.time_signature
+    state.time_position = clock[-1]
+    state.xml_position = self.exit_xml_position + xml_shift
+    if measure.notes:
+      state.previous_note_duration = self.previous_note_duration
+      state.previous_note_time_position = (
+          measure.notes[-1].note_duration.time_position)
+      state.previous_note_xml_position = (self.previous_note_xml_position
+                                          + xml_shift)
+    return measure
+
+
+def _steps_of(counts, num_objects):
+  """Return the step each of num_objects objects was created at.
+
+  Args:
+    counts: The number of objects before every step, non-decreasing.
+    num_objects: The number of objects after the last step.
+  """
+  steps = []
+  step = 0
+  for i in range(num_objects):
+    while step < len(counts) and counts[step] <= i:
+      step += 1
+    steps.append(step)
+  return steps
+
+
+def _step_of(objects, obj):
+  """Return the first step whose object is obj, or the number of steps."""
+  for step, step_object in enumerate(objects):
+    if step_object is obj:
+      return step
+  return len(objects)
+
+
+def _moved(obj, xml_shift, time_position):
+  """Return a copy of a positioned object of a measure at a new position."""
+  obj = copy.copy(obj)
+  obj.xml_position += xml_shift
+  obj.time_position = time_position
+  return obj
+
+
+def _replace_time_signature(snapshot, time_signatures, snapshots):
+  """Return snapshot with its time signature replaced.
+
+  Args:
+    snapshot: A StateSnapshot taken while parsing a MeasureTemplate.
+    time_signatures: Dict of the replacing time signatures, by id of the
+      time signature they replace.
+    snapshots: Dict of the snapshots already replaced, by id.
+  """
+  time_signature = time_signatures.get(id(snapshot.time_signature),
+                                       snapshot.time_signature)
+  if time_signature is snapshot.time_signature:
+    return snapshot
+  if id(snapshot) not in snapshots:
+    snapshots[id(snapshot)] = snapshot._replace(time_signature=time_signature)
+  return snapshots[id(snapshot)]
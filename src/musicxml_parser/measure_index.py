@@ -0,0 +1,72 @@
+"""Lookup of the measures of a part by position."""
+import numpy as np
+
+
+class MeasureIndex(object):
+  """Maps xml_positions or seconds to the unfolded measures of a part.
+
+  Measures are counted from 0 in unfolded order, as in Part.measures, so a
+  source measure played again by a repeat has one index per pass. Every
+  measure also has the index of its <measure> element in the part, its
+  number attribute and its repeat pass, 0 the first time the source
+  measure is played.
+
+  Lookups bisect the measure starts, so they take O(log M), and accept a
+  position or an array of them. A position belongs to the last measure
+  starting at or before it; positions before the first measure belong to
+  the first one.
+  """
+
+  def __init__(self, measures):
+    """Build the index.
+
+    Args:
+      measures: The measures of a part, in order.
+    """
+    self.xml_positions = np.array(
+        [measure.start_xml_position for measure in measures], dtype=np.int64)
+    self.time_positions = np.array(
+        [measure.start_time_position for measure in measures],
+        dtype=np.float64)
+    # Index of the <measure> element of every measure in the part.
+    self.source_indices = np.array(
+        [measure.source_index for measure in measures], dtype=np.int64)
+    # The number attribute of every measure, None if it has none.
+    self.numbers = np.array([measure.number for measure in measures],
+                            dtype=object)
+    repeat_passes = []
+    passes = {}
+    for source_index in self.source_indices.tolist():
+      repeat_passes.append(passes.get(source_index, 0))
+      passes[source_index] = repeat_passes[-1] + 1
+    self.repeat_passes = np.array(repeat_passes, dtype=np.int64)
+
+  def __len__(self):
+    return len(self.xml_positions)
+
+  def index_of(self, positions, in_seconds=False):
+    """Return the index of the measure of each position.
+
+    Args:
+      positions: An xml_position or an array of them, or seconds if
+        in_seconds is set.
+      in_seconds: Whether positions are in seconds.
+
+    Returns:
+      An int or an int array, the shape of positions.
+    """
+    starts = self.time_positions if in_seconds else self.xml_positions
+    return np.maximum(
+        np.searchsorted(starts, positions, side='right') - 1, 0)
+
+  def source_index_of(self, positions, in_seconds=False):
+    """Return the index of the <measure> element of each position."""
+    return self.source_indices[self.index_of(positions, in_seconds)]
+
+  def number_of(self, positions, in_seconds=False):
+    """Return the number attribute of the measure of each position."""
+    return self.numbers[self.index_of(positions, in_seconds)]
+
+  def repeat_pass_of(self, positions, in_seconds=False):
+    """Return the repeat pass of the measure of each position."""
+    return self.repeat_passes[self.index_of(positions, in_seconds)]
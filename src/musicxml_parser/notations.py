@@ -21,8 +21,18 @@ class Notations(object):
   10) tuplet
   11) cue (small note)
 
+  The slurs list is only kept once a slur is added. Until then, slurs is
+  an empty list that the notations keep only if it is modified, so
+  appending to it still works.
   """
 
+  __slots__ = ('xml_notations', 'is_accent', 'is_arpeggiate', 'is_fermata',
+               'is_mordent', 'is_staccato', 'is_tenuto', 'tie', 'tied_start',
+               'tied_stop', 'is_trill', 'is_tuplet', 'is_strong_accent',
+               'is_cue', 'is_beam_start', 'is_beam_continue', 'is_beam_stop',
+               'wavy_line', '_slurs', 'is_slur_start', 'is_slur_stop',
+               'is_slur_continue', 'is_slash')
+
   def __init__(self, xml_notations=None):
     self.xml_notations = xml_notations
     self.is_accent = False
@@ -42,12 +52,65 @@ class Notations(object):
     self.is_beam_continue = False
     self.is_beam_stop = False
     self.wavy_line = None
-    self.slurs = []
+    self._slurs = None
     self.is_slur_start = False
     self.is_slur_stop = False
     self.is_slur_continue = False
     self.is_slash = False
 
+  @property
+  def slurs(self):
+    if self._slurs is None:
+      return _NewSlurs(self)
+    return self._slurs
+
+  @property
+  def has_slurs(self):
+    """Whether there are slurs, without making a slurs list."""
+    return bool(self._slurs)
+
+  @slurs.setter
+  def slurs(self, slurs):
+    self._slurs = slurs
+
+  def copy(self):
+    """Return a copy with its own slurs and wavy line."""
+    notations = Notations.__new__(Notations)
+    notations.xml_notations = self.xml_notations
+    notations.is_accent = self.is_accent
+    notations.is_arpeggiate = self.is_arpeggiate
+    notations.is_fermata = self.is_fermata
+    notations.is_mordent = self.is_mordent
+    notations.is_staccato = self.is_staccato
+    notations.is_tenuto = self.is_tenuto
+    notations.tie = self.tie
+    notations.tied_start = self.tied_start
+    notations.tied_stop = self.tied_stop
+    notations.is_trill = self.is_trill
+    notations.is_tuplet = self.is_tuplet
+    notations.is_strong_accent = self.is_strong_accent
+    notations.is_cue = self.is_cue
+    notations.is_beam_start = self.is_beam_start
+    notations.is_beam_continue = self.is_beam_continue
+    notations.is_beam_stop = self.is_beam_stop
+    notations.is_slur_start = self.is_slur_start
+    notations.is_slur_stop = self.is_slur_stop
+    notations.is_slur_continue = self.is_slur_continue
+    notations.is_slash = self.is_slash
+    notations._slurs = None
+    if self._slurs is not None:
+      notations._slurs = [slur.copy() for slur in self._slurs]
+    notations.wavy_line = None
+    if self.wavy_line is not None:
+      notations.wavy_line = self.wavy_line.copy()
+    return notations
+
+  def add_slur(self, slur):
+    """Append a Slur, allocating the slurs list if needed."""
+    if self._slurs is None:
+      self._slurs = []
+    self._slurs.append(slur)
+
   def parse_notations(self, xml_notations):
     """Parse the MusicXML <Notations> element."""
     self.xml_notations = xml_notations
@@ -56,21 +119,31 @@ class Notations(object):
       for child in notations:
         if child.tag == 'articulations':
           self._parse_articulations(child)
-        elif child.tag == 'arpeggiate':
-          self.is_arpeggiate = True
-        elif child.tag == 'fermata':
-          self.is_fermata = True
-        elif child.tag == 'tie':
-          self.tie = child.attrib['type']
-        elif child.tag == 'tied':
-          if child.attrib['type'] == 'start':
-            self.tied_start = True
-          elif child.attrib['type'] == 'stop':
-            self.tied_stop = True
         elif child.tag == 'ornaments':
           self._parse_ornaments(child)
-        elif child.tag == 'slur':
-          self._parse_slur(child)
+        else:
+          self.parse_notation(child.tag, child.attrib)
+
+  def parse_notation(self, tag, attrib):
+    """Parse a child of <notations> other than articulations and ornaments.
+
+    Args:
+      tag: The tag of the child element.
+      attrib: The attributes of the child element.
+    """
+    if tag == 'arpeggiate':
+      self.is_arpeggiate = True
+    elif tag == 'fermata':
+      self.is_fermata = True
+    elif tag == 'tie':
+      self.tie = attrib['type']
+    elif tag == 'tied':
+      if attrib['type'] == 'start':
+        self.tied_start = True
+      elif attrib['type'] == 'stop':
+        self.tied_stop = True
+    elif tag == 'slur':
+      self._parse_slur(attrib)
 
   def _parse_articulations(self, xml_articulation):
     """Parse the MusicXML <Articulations> element.
@@ -78,7 +151,10 @@ class Notations(object):
     Args:
       xml_articulation: XML element with tag type 'articulation'.
     """
-    tag = list(xml_articulation)[0].tag
+    self.parse_articulation(list(xml_articulation)[0].tag)
+
+  def parse_articulation(self, tag):
+    """Parse the first child of an <articulations> element given its tag."""
     if tag == 'arpeggiate':
       self.is_arpeggiate = True
     elif tag == 'accent':
@@ -102,29 +178,75 @@ class Notations(object):
     """
     children = list(xml_ornaments)
     for child in children:
-      tag = child.tag
-      if tag == 'trill-mark':
-        self.is_trill = True
-      if tag == 'inverted-mordent' or tag == 'mordent':
-        self.is_mordent = True
-      if tag == 'wavy-line':
-        type = child.attrib['type']
-        if 'number' in child.attrib:
-          number = child.attrib['number']
-        else:
-          number = 1
-        self.wavy_line = WavyLine(type, number)
+      self.parse_ornament(child.tag, child.attrib)
 
-  def _parse_slur(self, xml_slurs):
-    type = xml_slurs.attrib['type']
-    if 'number' in xml_slurs.attrib:
-      number = xml_slurs.attrib['number']
+  def parse_ornament(self, tag, attrib):
+    """Parse a child of an <ornaments> element given its tag and attributes."""
+    if tag == 'trill-mark':
+      self.is_trill = True
+    if tag == 'inverted-mordent' or tag == 'mordent':
+      self.is_mordent = True
+    if tag == 'wavy-line':
+      type = attrib['type']
+      if 'number' in attrib:
+        number = attrib['number']
+      else:
+        number = 1
+      self.wavy_line = WavyLine(type, number)
+
+  def _parse_slur(self, attrib):
+    type = attrib['type']
+    if 'number' in attrib:
+      number = attrib['number']
     else:
       number=1
-    self.slurs.append(Slur(type, number))
+    self.add_slur(Slur(type, number))
+
+
+class _NewSlurs(list):
+  """Empty slurs list of Notations without slurs.
+
+  The notations keep it as their slurs list when it is first modified.
+  """
+
+  __slots__ = ('_notations',)
+
+  def __init__(self, notations):
+    list.__init__(self)
+    self._notations = notations
+
+  def _keep(self):
+    if self._notations is not None:
+      self._notations._slurs = self
+      self._notations = None
+
+  def append(self, slur):
+    self._keep()
+    list.append(self, slur)
+
+  def extend(self, slurs):
+    self._keep()
+    list.extend(self, slurs)
+
+  def insert(self, index, slur):
+    self._keep()
+    list.insert(self, index, slur)
+
+  def __iadd__(self, slurs):
+    self._keep()
+    return list.__iadd__(self, slurs)
+
+  def __setitem__(self, index, slur):
+    self._keep()
+    list.__setitem__(self, index, slur)
+
+  def __reduce__(self):
+    return (list, (list(self),))
 
 
 class WavyLine:
+  __slots__ = ('type', 'number', 'xml_position', 'end_xml_position', 'pitch')
+
   def __init__(self, type, number):
     self.type = type  # start or stop
     self.number = number
@@ -132,7 +254,19 @@ class WavyLine:
     self.end_xml_position = 0
     self.pitch = 0
 
+  def copy(self):
+    wavy_line = WavyLine.__new__(WavyLine)
+    wavy_line.type = self.type
+    wavy_line.number = self.number
+    wavy_line.xml_position = self.xml_position
+    wavy_line.end_xml_position = self.end_xml_position
+    wavy_line.pitch = self.pitch
+    return wavy_line
+
 class Slur:
+  __slots__ = ('type', 'number', 'xml_position', 'end_xml_position', 'index',
+               'voice')
+
   def __init__(self, type, number):
     self.type = type  # start or stop
     self.number = number
@@ -141,3 +275,12 @@ class Slur:
     self.index = 0
     self.voice = 0
 
+  def copy(self):
+    slur = Slur.__new__(Slur)
+    slur.type = self.type
+    slur.number = self.number
+    slur.xml_position = self.xml_position
+    slur.end_xml_position = self.end_xml_position
+    slur.index = self.index
+    slur.voice = self.voice
+    return slur
@@ -2,15 +2,27 @@ from fractions import Fraction
 from .exception import UnpitchedNoteException, PitchStepParseException
 from .notations import Notations
 from .note_duration import NoteDuration
-from .note_dynamic import NoteDynamic
-from .note_dynamic import NoteTempo
-from .note_dynamic import NotePedal
-
-import copy
+from .note_dynamic import _NewNoteDynamic, _NewNotePedal, _NewNoteTempo
 
 
 class Note(object):
-  """Internal representation of a MusicXML <note> element."""
+  """Internal representation of a MusicXML <note> element.
+
+  dynamic, tempo and pedal are only allocated when they are first written.
+  Until then reading one returns a new object with the initial values,
+  which the note keeps once an attribute or list of it is modified.
+
+  The playable-notes pipeline works on copies made by derive(), whose
+  parsed_note is the Note they were copied from.
+  """
+
+  __slots__ = ('xml_note', 'voice', 'is_rest', 'is_in_chord', 'is_grace_note',
+               'is_overlapped', 'pitch', 'note_duration', 'state_fixed',
+               'state', 'note_notations', '_dynamic', '_tempo', 'staff',
+               'chord_index', '_pedal', 'following_note', 'on_beat',
+               'is_print_object', 'following_rest_duration',
+               'followed_by_fermata_rest', 'measure_number', 'accidental',
+               'midi_channel', 'midi_program', 'velocity', 'parsed_note')
 
   def __init__(self, xml_note, state):
     self.xml_note = xml_note
@@ -25,42 +37,104 @@ class Note(object):
     self.is_overlapped = False
     self.pitch = None  # Tuple (Pitch Name, MIDI number)
     self.note_duration = NoteDuration(state)
-    self.state_fixed = copy.copy(state)
+    self.state_fixed = state.snapshot()
     self.state = state
     self.note_notations = Notations()
-    self.dynamic = NoteDynamic()
-    self.tempo = NoteTempo()
+    self._dynamic = None
+    self._tempo = None
     self.staff = 1
     self.chord_index = 0
-    self.pedal = NotePedal()
+    self._pedal = None
     # self.following_note = None  # for grace note
     self.on_beat = False
     self.is_print_object = True
     self.following_rest_duration = 0
     self.followed_by_fermata_rest = False
+    # the index of the <measure> element until MusicXMLDocument numbers the
+    # unfolded measures from 1
     self.measure_number = state.measure_number
     self.accidental = None
+    self.parsed_note = None
 
-    self._parse()
+    if xml_note is not None:
+      self._parse()
 
-  def _parse(self):
-    """Parse the MusicXML <note> element."""
+  def derive(self):
+    """Return a copy of the note that can be modified freely.
 
-    self.midi_channel = self.state.midi_channel
-    self.midi_program = self.state.midi_program
-    self.velocity = self.state.velocity
+    The duration and the notations, with their slurs and wavy line, are
+    copied as well; dynamic, tempo, pedal and the parser state are shared.
+    following_note is left unset.
 
-    if 'print-object' in self.xml_note.attrib.keys() and self.xml_note.attrib['print-object'] == 'no':
-      self.is_print_object = False
+    Returns:
+      A Note whose parsed_note is this note.
+    """
+    note = Note.__new__(Note)
+    note.xml_note = self.xml_note
+    note.voice = self.voice
+    note.is_rest = self.is_rest
+    note.is_in_chord = self.is_in_chord
+    note.is_grace_note = self.is_grace_note
+    note.is_overlapped = self.is_overlapped
+    note.pitch = self.pitch
+    note.state_fixed = self.state_fixed
+    note.state = self.state
+    note._dynamic = self._dynamic
+    note._tempo = self._tempo
+    note.staff = self.staff
+    note.chord_index = self.chord_index
+    note._pedal = self._pedal
+    note.on_beat = self.on_beat
+    note.is_print_object = self.is_print_object
+    note.following_rest_duration = self.following_rest_duration
+    note.followed_by_fermata_rest = self.followed_by_fermata_rest
+    note.measure_number = self.measure_number
+    note.accidental = self.accidental
+    note.midi_channel = self.midi_channel
+    note.midi_program = self.midi_program
+    note.velocity = self.velocity
+    note.note_duration = self.note_duration.copy()
+    note.note_notations = self.note_notations.copy()
+    note.parsed_note = self
+    return note
+
+  @property
+  def dynamic(self):
+    if self._dynamic is None:
+      return _NewNoteDynamic(self)
+    return self._dynamic
+
+  @dynamic.setter
+  def dynamic(self, dynamic):
+    self._dynamic = dynamic
+
+  @property
+  def tempo(self):
+    if self._tempo is None:
+      return _NewNoteTempo(self)
+    return self._tempo
+
+  @tempo.setter
+  def tempo(self, tempo):
+    self._tempo = tempo
+
+  @property
+  def pedal(self):
+    if self._pedal is None:
+      return _NewNotePedal(self)
+    return self._pedal
+
+  @pedal.setter
+  def pedal(self, pedal):
+    self._pedal = pedal
+
+  def _parse(self):
+    """Parse the MusicXML <note> element."""
+    self._start_parse(self.xml_note.attrib)
 
     for child in self.xml_note:
       if child.tag == 'chord':
-        self.is_in_chord = True
-        self.state.chord_index += 1
-        self.chord_index = self.state.chord_index
-        self.note_notations.is_beam_start = self.state.is_beam_start
-        self.note_notations.is_beam_continue = self.state.is_beam_continue
-        self.note_notations.is_beam_stop = self.state.is_beam_stop
+        self._parse_chord()
       elif child.tag == 'duration':  # if the note is_grace_note, the note does not have 'duration' child.
         self.note_duration.parse_duration(self.is_in_chord, self.is_grace_note, child.text)
         # if len(self.state.previous_grace_notes) > 0:
@@ -83,10 +157,7 @@ class Note(object):
       elif child.tag == 'unpitched':
         raise UnpitchedNoteException('Unpitched notes are not supported')
       elif child.tag == 'grace':
-        self.note_duration.parse_duration(self.is_in_chord, True, 0)
-        self.state.previous_grace_notes.append(self)
-        if 'slash' in child.attrib.keys() and child.attrib['slash'] == 'yes':
-          self.note_notations.is_slash = True
+        self._parse_grace(child.attrib)
       elif child.tag == 'staff':
         self.staff = int(child.text)
       elif child.tag == 'cue':
@@ -99,18 +170,51 @@ class Note(object):
         # Ignore other tag types because they are not relevant to mxp.
         pass
 
+    self._finish_parse()
+
+  def _start_parse(self, attrib):
+    """Read the parser state and the attributes of the <note> element."""
+    self.midi_channel = self.state.midi_channel
+    self.midi_program = self.state.midi_program
+    self.velocity = self.state.velocity
+
+    if 'print-object' in attrib.keys() and attrib['print-object'] == 'no':
+      self.is_print_object = False
+
+  def _finish_parse(self):
+    """Update the parser state once every child has been parsed."""
     # reset state.chord_index if it is not chord note
     if self.is_in_chord == False:
       self.state.chord_index = 0
 
+  def _parse_chord(self):
+    """Parse the MusicXML <chord> element."""
+    self.is_in_chord = True
+    self.state.chord_index += 1
+    self.chord_index = self.state.chord_index
+    self.note_notations.is_beam_start = self.state.is_beam_start
+    self.note_notations.is_beam_continue = self.state.is_beam_continue
+    self.note_notations.is_beam_stop = self.state.is_beam_stop
+
+  def _parse_grace(self, attrib):
+    """Parse the MusicXML <grace> element given its attributes."""
+    self.note_duration.parse_duration(self.is_in_chord, True, 0)
+    self.state.previous_grace_notes.append(self)
+    if 'slash' in attrib.keys() and attrib['slash'] == 'yes':
+      self.note_notations.is_slash = True
+
   def _parse_pitch(self, xml_pitch):
     """Parse the MusicXML <pitch> element."""
     step = xml_pitch.find('step').text
     alter_text = ''
-    alter = 0.0
     if xml_pitch.find('alter') is not None:
       alter_text = xml_pitch.find('alter').text
     octave = xml_pitch.find('octave').text
+    self._set_pitch(step, alter_text, octave)
+
+  def _set_pitch(self, step, alter_text, octave):
+    """Set the pitch from the texts of <step>, <alter> and <octave>."""
+    alter = 0.0
 
     # Parse alter string to a float (floats represent microtonal alterations)
     if alter_text:
@@ -151,8 +255,13 @@ Represented in MusicXML by the <time-modification> element.
 Args:
   xml_time_modification: An xml time-modification element.
 """
-    numerator = int(xml_time_modification.find('actual-notes').text)
-    denominator = int(xml_time_modification.find('normal-notes').text)
+    self._set_tuplet(xml_time_modification.find('actual-notes').text,
+                     xml_time_modification.find('normal-notes').text)
+
+  def _set_tuplet(self, actual_notes, normal_notes):
+    """Set the tuplet ratio from the texts of <actual-notes>/<normal-notes>."""
+    numerator = int(actual_notes)
+    denominator = int(normal_notes)
     self.note_duration.tuplet_ratio = Fraction(numerator, denominator)
 
   @staticmethod
@@ -229,3 +338,4 @@ Args:
     self.note_duration.time_position += -total_seconds_grace
     self.state.previous_grace_notes = []
     print(self)
+
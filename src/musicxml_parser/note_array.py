@@ -0,0 +1,119 @@
+"""Columnar NumPy export of playable notes."""
+from operator import attrgetter
+
+import numpy as np
+
+# One row per playable note. Onsets and offsets are given both in MusicXML
+# divisions (xml_position) and in seconds (time_position).
+NOTE_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('part', np.int16),
+    ('onset_div', np.int64),
+    ('offset_div', np.int64),
+    ('duration_div', np.int64),
+    ('onset_sec', np.float64),
+    ('offset_sec', np.float64),
+    ('duration_sec', np.float64),
+    ('pitch', np.int16),
+    ('voice', np.int16),
+    ('staff', np.int16),
+    ('measure_number', np.int32),
+    ('chord_index', np.int16),
+    ('grace_order', np.int16),
+    ('is_grace_note', np.bool_),
+    ('tied_start', np.bool_),
+    ('tied_stop', np.bool_),
+    ('is_slur_start', np.bool_),
+    ('is_slur_stop', np.bool_),
+    ('is_slur_continue', np.bool_),
+    ('is_trill', np.bool_),
+    ('is_fermata', np.bool_),
+    ('is_accent', np.bool_),
+    ('is_strong_accent', np.bool_),
+    ('is_staccato', np.bool_),
+    ('is_tenuto', np.bool_),
+    ('is_arpeggiate', np.bool_),
+    ('is_mordent', np.bool_),
+    ('is_tuplet', np.bool_),
+    ('is_cue', np.bool_),
+    ('is_overlapped', np.bool_),
+])
+
+# Fields of NOTE_DTYPE copied from the attribute of the same name of a
+# note, of its note_duration and of its note_notations.
+NOTE_FIELDS = ('voice', 'staff', 'measure_number', 'chord_index',
+               'is_overlapped')
+DURATION_FIELDS = ('grace_order', 'is_grace_note')
+NOTATION_FIELDS = ('tied_start', 'tied_stop', 'is_slur_start', 'is_slur_stop',
+                   'is_slur_continue', 'is_trill', 'is_fermata', 'is_accent',
+                   'is_strong_accent', 'is_staccato', 'is_tenuto',
+                   'is_arpeggiate', 'is_mordent', 'is_tuplet', 'is_cue')
+
+
+def note_ids(parts):
+  """Return stable ids of the notes of the given parts.
+
+  Notes are numbered in document order (part, measure, note), so an id
+  does not depend on how get_notes sorts or filters the notes.
+
+  Args:
+    parts: The Parts of a MusicXMLDocument.
+
+  Returns:
+    A dict from id(note) of the parsed notes to (note id, part index).
+  """
+  ids = {}
+  next_id = 0
+  for part_index, part in enumerate(parts):
+    for measure in part.measures:
+      for note in measure.notes:
+        ids[id(note)] = (next_id, part_index)
+        next_id += 1
+  return ids
+
+
+def build_note_array(notes, ids):
+  """Build a structured array of NOTE_DTYPE with one row per note.
+
+  The array is allocated once and filled column by column: the fields are
+  read from the notes in a few passes, and every column is assigned whole
+  instead of row by row.
+
+  Args:
+    notes: Playable notes, as returned by MusicXMLDocument.get_notes. They
+      are looked up in ids through their parsed_note.
+    ids: The dict returned by note_ids for the parts of the notes.
+
+  Returns:
+    A NumPy structured array of NOTE_DTYPE, in the order of notes.
+  """
+  table = np.empty(len(notes), dtype=NOTE_DTYPE)
+  durations = [note.note_duration for note in notes]
+  notations = [note.note_notations for note in notes]
+  note_ids_and_parts = [ids[id(note.parsed_note)] for note in notes]
+  table['id'] = [note_id for note_id, _ in note_ids_and_parts]
+  table['part'] = [part_index for _, part_index in note_ids_and_parts]
+  table['onset_div'] = [duration.xml_position for duration in durations]
+  table['duration_div'] = [duration.duration for duration in durations]
+  table['offset_div'] = table['onset_div'] + table['duration_div']
+  table['onset_sec'] = [duration.time_position for duration in durations]
+  table['duration_sec'] = [duration.seconds for duration in durations]
+  table['offset_sec'] = table['onset_sec'] + table['duration_sec']
+  table['pitch'] = [note.pitch[1] for note in notes]
+  _assign_columns(table, NOTE_FIELDS, notes)
+  _assign_columns(table, DURATION_FIELDS, durations)
+  _assign_columns(table, NOTATION_FIELDS, notations)
+  return table
+
+
+def _assign_columns(table, names, objects):
+  """Assign the attributes names of objects to the fields of the same name.
+
+  The attributes are read in one pass over objects, then every field is
+  assigned its whole column at once.
+  """
+  if not objects:
+    return
+  values = list(map(attrgetter(*names), objects))
+  for name, column in zip(names, zip(*values)):
+    table[name] = column
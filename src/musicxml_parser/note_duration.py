@@ -15,6 +15,11 @@ class NoteDuration(object):
                     '128th': Fraction(1, 128), '256th': Fraction(1, 256),
                     '512th': Fraction(1, 512), '1024th': Fraction(1, 1024)}
 
+  __slots__ = ('duration', 'midi_ticks', 'seconds', 'time_position',
+               'xml_position', 'dots', '_type', 'tuplet_ratio', 'is_grace_note',
+               'state', 'preceded_by_grace_note', 'grace_order', 'num_grace',
+               'is_first_grace_note')
+
   def __init__(self, state):
     self.duration = 0  # MusicXML duration
     self.midi_ticks = 0  # Duration in MIDI ticks
@@ -45,6 +50,10 @@ class NoteDuration(object):
     self.seconds = (self.midi_ticks / constants.STANDARD_PPQ)
     self.seconds *= self.state.seconds_per_quarter
 
+    if self.state.deferred_timing:
+      self._parse_position(is_in_chord, is_grace_note)
+      return
+
     self.time_position = float("{0:.8f}".format(self.state.time_position))
     self.xml_position = self.state.xml_position
 
@@ -65,6 +74,35 @@ class NoteDuration(object):
       self.state.time_position += self.seconds
       self.state.xml_position += self.duration
 
+  def _parse_position(self, is_in_chord, is_grace_note):
+    """Move the positions, leaving time_position to the retiming."""
+    self.is_grace_note = is_grace_note
+    if is_in_chord:
+      self.xml_position = self.state.previous_note_xml_position
+    else:
+      self.xml_position = self.state.xml_position
+      self.state.time_position += self.seconds
+      self.state.xml_position += self.duration
+
+  def copy(self):
+    """Return a copy sharing the parser state."""
+    note_duration = NoteDuration.__new__(NoteDuration)
+    note_duration.duration = self.duration
+    note_duration.midi_ticks = self.midi_ticks
+    note_duration.seconds = self.seconds
+    note_duration.time_position = self.time_position
+    note_duration.xml_position = self.xml_position
+    note_duration.dots = self.dots
+    note_duration._type = self._type
+    note_duration.tuplet_ratio = self.tuplet_ratio
+    note_duration.is_grace_note = self.is_grace_note
+    note_duration.state = self.state
+    note_duration.preceded_by_grace_note = self.preceded_by_grace_note
+    note_duration.grace_order = self.grace_order
+    note_duration.num_grace = self.num_grace
+    note_duration.is_first_grace_note = self.is_first_grace_note
+    return note_duration
+
   def _convert_type_to_ratio(self):
     """Convert the MusicXML note-type-value to a Python Fraction.
 
@@ -1,4 +1,6 @@
 class NoteDynamic:
+  __slots__ = ('absolute', 'relative', 'absolute_position', 'cresciuto')
+
   def __init__(self):
     self.absolute = None
     self.relative = []
@@ -7,6 +9,9 @@ class NoteDynamic:
 
 
 class NoteTempo:
+  __slots__ = ('absolute', 'relative', 'time_numerator', 'time_denominator',
+               'recently_changed_position')
+
   def __init__(self):
     self.absolute = None
     self.relative = []
@@ -16,6 +21,9 @@ class NoteTempo:
 
 
 class NotePedal:
+  __slots__ = ('at_start', 'at_end', 'refresh', 'refresh_time', 'cut',
+               'cut_time', 'soft')
+
   def __init__(self):
     self.at_start = 0
     self.at_end = 0
@@ -24,3 +32,95 @@ class NotePedal:
     self.cut = False
     self.cut_time = 0
     self.soft = 0
+
+
+class _NewNotePart(object):
+  """Object read from a note that has no object of its _base class.
+
+  It holds the initial values of _base, and the note keeps it as its own
+  when it is first modified, through an attribute or its relative list.
+  """
+
+  __slots__ = ()
+
+  def __init__(self, note):
+    self._base.__init__(self)
+    for name in self._base.__slots__:
+      value = getattr(self, name)
+      if isinstance(value, list):
+        object.__setattr__(self, name, _NewList(self))
+    object.__setattr__(self, '_note', note)
+
+  def _keep(self):
+    note = getattr(self, '_note', None)
+    if note is not None:
+      setattr(note, self._attribute, self)
+      object.__setattr__(self, '_note', None)
+
+  def __setattr__(self, name, value):
+    self._keep()
+    object.__setattr__(self, name, value)
+
+  def __delattr__(self, name):
+    self._keep()
+    object.__delattr__(self, name)
+
+  def __reduce__(self):
+    values = {name: getattr(self, name) for name in self._base.__slots__}
+    return (self._base, (), (None, values))
+
+
+class _NewList(list):
+  """Empty list of a _NewNotePart, which it keeps when first modified."""
+
+  __slots__ = ('_part',)
+
+  def __init__(self, part):
+    list.__init__(self)
+    self._part = part
+
+  def _keep(self):
+    if self._part is not None:
+      self._part._keep()
+      self._part = None
+
+  def append(self, value):
+    self._keep()
+    list.append(self, value)
+
+  def extend(self, values):
+    self._keep()
+    list.extend(self, values)
+
+  def insert(self, index, value):
+    self._keep()
+    list.insert(self, index, value)
+
+  def __iadd__(self, values):
+    self._keep()
+    return list.__iadd__(self, values)
+
+  def __setitem__(self, index, value):
+    self._keep()
+    list.__setitem__(self, index, value)
+
+  def __reduce__(self):
+    return (list, (list(self),))
+
+
+class _NewNoteDynamic(_NewNotePart, NoteDynamic):
+  __slots__ = ('_note',)
+  _base = NoteDynamic
+  _attribute = 'dynamic'
+
+
+class _NewNoteTempo(_NewNotePart, NoteTempo):
+  __slots__ = ('_note',)
+  _base = NoteTempo
+  _attribute = 'tempo'
+
+
+class _NewNotePedal(_NewNotePart, NotePedal):
+  __slots__ = ('_note',)
+  _base = NotePedal
+  _attribute = 'pedal'
@@ -0,0 +1,200 @@
+"""Time-range queries over playable notes."""
+import collections
+
+import numpy as np
+
+# A node of an IntervalIndex. The intervals of the node all contain center;
+# they are listed sorted by start in by_start and by end in by_end, with
+# the matching starts and ends. left and right are the nodes of the
+# intervals entirely before and after center, or None.
+_Node = collections.namedtuple(
+    '_Node', ['center', 'by_start', 'starts', 'by_end', 'ends', 'left',
+              'right'])
+# A leaf of an IntervalIndex, holding a few intervals that are scanned.
+_Leaf = collections.namedtuple('_Leaf', ['indices', 'starts', 'ends'])
+
+# Most intervals a leaf holds. Scanning them costs less than the nodes they
+# would take.
+LEAF_SIZE = 32
+
+
+class IntervalIndex(object):
+  """Static centered interval tree over half-open [start, end) intervals.
+
+  Intervals are given by their index in the start and end arrays, and
+  queries return indices in ascending order. Empty intervals never contain
+  a point, but are found by starting_between.
+  """
+
+  def __init__(self, starts, ends):
+    """Build the index.
+
+    Args:
+      starts: Array of the interval starts.
+      ends: Array of the interval ends, as long as starts.
+    """
+    self.starts = np.asarray(starts)
+    self.ends = np.asarray(ends)
+    # Indices of all intervals sorted by start, for starting_between.
+    self._by_start = np.argsort(self.starts, kind='stable')
+    self._sorted_starts = self.starts[self._by_start]
+    self._root = self._build(np.flatnonzero(self.starts < self.ends))
+
+  def __len__(self):
+    return len(self.starts)
+
+  def _build(self, indices):
+    if not len(indices):
+      return None
+    starts = self.starts[indices]
+    ends = self.ends[indices]
+    if len(indices) <= LEAF_SIZE:
+      return _Leaf(indices, starts, ends)
+    # The interval with the median midpoint contains the center, so every
+    # node holds at least one interval and the recursion ends.
+    midpoints = (starts + ends) / 2
+    median = np.argsort(midpoints, kind='stable')[len(indices) // 2]
+    center = midpoints[median]
+    if not starts[median] <= center < ends[median]:
+      # The midpoint of a very short float interval can round to its end.
+      center = starts[median]
+    here = (starts <= center) & (center < ends)
+    here_indices = indices[here]
+    by_start = here_indices[np.argsort(self.starts[here_indices],
+                                       kind='stable')]
+    by_end = here_indices[np.argsort(self.ends[here_indices], kind='stable')]
+    return _Node(center, by_start, self.starts[by_start], by_end,
+                 self.ends[by_end], self._build(indices[ends <= center]),
+                 self._build(indices[starts > center]))
+
+  def stab(self, point):
+    """Return the indices of the intervals with start <= point < end."""
+    found = []
+    node = self._root
+    while node is not None:
+      if isinstance(node, _Leaf):
+        found.append(node.indices[(node.starts <= point) & (point < node.ends)])
+        break
+      if point < node.center:
+        found.append(
+            node.by_start[:np.searchsorted(node.starts, point, side='right')])
+        node = node.left
+      else:
+        found.append(
+            node.by_end[np.searchsorted(node.ends, point, side='right'):])
+        node = node.right
+    if not found:
+      return np.empty(0, dtype=np.int64)
+    return np.sort(np.concatenate(found))
+
+  def starting_between(self, start, end):
+    """Return the indices of the intervals starting in [start, end)."""
+    first, last = np.searchsorted(self._sorted_starts, [start, end])
+    return np.sort(self._by_start[first:last])
+
+  def overlapping(self, start, end):
+    """Return the indices of the intervals sharing a point with [start, end).
+
+    These are the intervals containing start and the ones starting in the
+    range.
+    """
+    return np.union1d(self.stab(start), self.starting_between(start, end))
+
+
+class NoteIndex(object):
+  """Finds the notes sounding at a time or starting in a time range.
+
+  A note sounds from its onset up to, but not including, its offset, so
+  grace notes, which take no divisions, never sound in xml_position. Both
+  queries take xml_positions, or seconds if in_seconds is set, and can be
+  restricted to a part, a staff and a voice. They return the notes in the
+  order they were given, in O(log^2 N + k) for k notes found.
+  """
+
+  def __init__(self, notes, part_indices=None):
+    """Build the index.
+
+    Args:
+      notes: Playable notes, as returned by MusicXMLDocument.get_notes.
+      part_indices: Index of the part of every note. Notes can only be
+        filtered by part if it is given.
+    """
+    self.notes = list(notes)
+    durations = [note.note_duration for note in self.notes]
+    onsets = np.array([x.xml_position for x in durations], dtype=np.int64)
+    offsets = onsets + np.array([x.duration for x in durations],
+                                dtype=np.int64)
+    self._xml = IntervalIndex(onsets, offsets)
+    onsets = np.array([x.time_position for x in durations], dtype=np.float64)
+    offsets = onsets + np.array([x.seconds for x in durations],
+                                dtype=np.float64)
+    self._seconds = IntervalIndex(onsets, offsets)
+    self._parts = None
+    if part_indices is not None:
+      self._parts = np.asarray(part_indices, dtype=np.int64)
+    self._staffs = np.array([note.staff for note in self.notes],
+                            dtype=np.int64)
+    self._voices = np.array([note.voice for note in self.notes],
+                            dtype=np.int64)
+
+  def __len__(self):
+    return len(self.notes)
+
+  def sounding_at(self, position, in_seconds=False, part=None, staff=None,
+                  voice=None):
+    """Return the notes sounding at position.
+
+    Args:
+      position: An xml_position, or seconds if in_seconds is set.
+      in_seconds: Whether position is in seconds.
+      part: Only return the notes of the part with this index.
+      staff: Only return the notes of this staff.
+      voice: Only return the notes of this voice.
+
+    Returns:
+      A list of Notes.
+
+    Raises:
+      ValueError: if part is given but the index has no part indices.
+    """
+    index = self._seconds if in_seconds else self._xml
+    return self._select(index.stab(position), part, staff, voice)
+
+  def notes_between(self, start, end, in_seconds=False, overlapping=False,
+                    part=None, staff=None, voice=None):
+    """Return the notes starting in [start, end).
+
+    Args:
+      start: Start of the range, an xml_position or seconds.
+      end: End of the range, excluded.
+      in_seconds: Whether start and end are in seconds.
+      overlapping: Also return the notes started before start that still
+        sound at start.
+      part: Only return the notes of the part with this index.
+      staff: Only return the notes of this staff.
+      voice: Only return the notes of this voice.
+
+    Returns:
+      A list of Notes.
+
+    Raises:
+      ValueError: if part is given but the index has no part indices.
+    """
+    index = self._seconds if in_seconds else self._xml
+    if overlapping:
+      found = index.overlapping(start, end)
+    else:
+      found = index.starting_between(start, end)
+    return self._select(found, part, staff, voice)
+
+  def _select(self, found, part, staff, voice):
+    """Return the notes at the indices found that pass the filters."""
+    if part is not None:
+      if self._parts is None:
+        raise ValueError('The index was built without part indices')
+      found = found[self._parts[found] == part]
+    if staff is not None:
+      found = found[self._staffs[found] == staff]
+    if voice is not None:
+      found = found[self._voices[found] == voice]
+    return [self.notes[i] for i in found]
@@ -1,6 +1,5 @@
-from .measure import Measure
+from .measure import Measure, MeasureTemplate
 from .score_part import ScorePart
-import xml.etree.ElementTree as ET
 import copy
 
 
@@ -8,15 +7,23 @@ import copy
 class Part(object):
   """Internal represention of a MusicXML <part> element."""
 
-  def __init__(self, xml_part, score_parts, state):
+  def __init__(self, xml_part, score_parts, state, xml_measures=None):
     self.id = ''
     self.score_part = None
     self.measures = []
     self._state = state
-    self._parse(xml_part, score_parts)
+    self._parse(xml_part, score_parts, xml_measures)
 
-  def _parse(self, xml_part, score_parts):
-    """Parse the <part> element."""
+  def _parse(self, xml_part, score_parts, xml_measures=None):
+    """Parse the <part> element.
+
+    Args:
+      xml_part: The <part> element.
+      score_parts: ScoreParts indexed by id.
+      xml_measures: Optional sequence of the <measure> elements of the part.
+        It is only indexed, so it may load measures lazily and raise
+        IndexError past the last one. Defaults to the children of xml_part.
+    """
     if 'id' in xml_part.attrib:
       self.id = xml_part.attrib['id']
     if self.id in score_parts:
@@ -33,8 +40,9 @@ class Part(object):
     self._state.midi_program = self.score_part.midi_program
     self._state.transpose = 0
 
-    xml_measures = xml_part.findall('measure')
-    measure_length = len(xml_measures)
+    score_state = self._state
+    if xml_measures is None:
+      xml_measures = xml_part.findall('measure')
     current_measure_number = 0
     segno_measure = None
     previous_forward_repeats = []
@@ -42,23 +50,31 @@ class Part(object):
     resolved_first_ending = []
     end_measure_of_first_ending = []
     fine_activated = False
+    # MeasureTemplates by source measure index
+    templates = {}
 
-    while current_measure_number < measure_length:
-      measure = xml_measures[current_measure_number]
+    while True:
+      measure = None
+      if current_measure_number not in templates:
+        try:
+          measure = xml_measures[current_measure_number]
+        except IndexError:
+          break
 
-      self._repair_empty_measure(measure)
       self._state.measure_number = current_measure_number
-      old_state = copy.copy(self._state)
-      parsed_measure = Measure(measure, self._state)
+      if current_measure_number in resolved_first_ending:
+        # The first ending was already played: skip it without parsing it.
+        # The rest of the part goes on with a copy of the state, so the
+        # state carried into the next part is the one the score had here.
+        self._state = copy.copy(self._state)
+        ending_index = resolved_first_ending.index(current_measure_number)
+        current_measure_number = end_measure_of_first_ending[ending_index] + 1
+        continue
+      parsed_measure = self._unfold_measure(
+          xml_measures, current_measure_number, templates, measure)
 
       if parsed_measure.first_ending_start:
-        if current_measure_number in resolved_first_ending:
-          ending_index = resolved_first_ending.index(current_measure_number)
-          current_measure_number = end_measure_of_first_ending[ending_index] + 1
-          self._state = old_state
-          continue
-        else:
-          resolved_first_ending.append(current_measure_number)
+        resolved_first_ending.append(current_measure_number)
 
       self.measures.append(parsed_measure)
 
@@ -85,6 +101,9 @@ class Part(object):
       else:
         current_measure_number += 1
 
+    # The score still ends where the part does.
+    score_state.time_position = self._state.time_position
+    score_state.xml_position = self._state.xml_position
 
     #
     # for (measure_number, measure) in enumerate(xml_measures):
@@ -95,6 +114,53 @@ class Part(object):
     #   parsed_measure = Measure(measure, self._state)
     #   self.measures.append(parsed_measure)
 
+  def _unfold_measure(self, xml_measures, index, templates, xml_measure=None):
+    """Return the next Measure of the unfolded part, from a source measure.
+
+    A source measure is parsed the first time it is reached and kept as a
+    MeasureTemplate. Repeats, endings and da capo jumps back to it
+    instantiate the template at the current position instead, unless the
+    parser state it starts from changed in more than position.
+
+    Args:
+      xml_measures: The measure sequence given to _parse.
+      index: The index of the source measure in xml_measures.
+      templates: Dict of the MeasureTemplates by index, updated.
+      xml_measure: xml_measures[index], if it was already read.
+
+    Returns:
+      The Measure.
+    """
+    template = templates.get(index)
+    if template is not None:
+      measure = template.instantiate(self._state)
+      if measure is not None:
+        return measure
+    if xml_measure is None:
+      xml_measure = xml_measures[index]
+    context = MeasureTemplate.context(self._state)
+    time_signature = self._state.time_signature
+    clock_steps = self._state.clock_steps = []
+    try:
+      measure = self._parse_measure(xml_measure)
+    finally:
+      self._state.clock_steps = None
+    templates[index] = MeasureTemplate(measure, context, time_signature,
+                                       clock_steps)
+    return measure
+
+  def _parse_measure(self, xml_measure):
+    """Parse one source measure with the current parser state.
+
+    Args:
+      xml_measure: An item of the measure sequence given to _parse.
+
+    Returns:
+      The parsed Measure.
+    """
+    self._repair_empty_measure(xml_measure)
+    return Measure(xml_measure, self._state)
+
   def _repair_empty_measure(self, measure):
     """Repair a measure if it is empty by inserting a whole measure rest.
 
@@ -119,12 +185,14 @@ class Part(object):
       # Delete the <forward> element
       measure.remove(xml_forward)
 
-      # Insert the new note
-      new_note = '<note>'
-      new_note += '<rest /><duration>' + str(forward_duration) + '</duration>'
-      new_note += '<voice>1</voice><type>whole</type><staff>1</staff>'
-      new_note += '</note>'
-      new_note_xml = ET.fromstring(new_note)
+      # Insert the new note. makeelement keeps the new elements of the same
+      # element tree library as the measure.
+      new_note_xml = measure.makeelement('note', {})
+      for tag, text in (('rest', None), ('duration', str(forward_duration)),
+                        ('voice', '1'), ('type', 'whole'), ('staff', '1')):
+        child = measure.makeelement(tag, {})
+        child.text = text
+        new_note_xml.append(child)
       measure.append(new_note_xml)
 
   def __str__(self):
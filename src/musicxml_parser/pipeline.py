@@ -0,0 +1,204 @@
+"""Ordered, instrumented chains of processing stages.
+
+A Pipeline runs named stages one after the other on a context object that
+carries the data between them. Stages can be enabled, disabled, reordered
+or registered by callers, unless the pipeline is frozen, and a PipelineStats collects the wall time and
+the item counts of every stage run.
+"""
+import collections
+import time
+
+# Totals of one stage over the runs recorded by a PipelineStats. items_in
+# and items_out are the item counts before and after the stage, summed over
+# the runs.
+StageStats = collections.namedtuple(
+    'StageStats', ['name', 'calls', 'seconds', 'items_in', 'items_out'])
+
+
+class PipelineStats(object):
+  """Per-stage wall time and item counts, accumulated over pipeline runs."""
+
+  def __init__(self):
+    self._stages = collections.OrderedDict()
+
+  def record(self, name, seconds, items_in, items_out):
+    """Add one run of a stage."""
+    stats = self._stages.get(name)
+    if stats is None:
+      stats = StageStats(name, 0, 0.0, 0, 0)
+    self._stages[name] = StageStats(
+        name, stats.calls + 1, stats.seconds + seconds,
+        stats.items_in + items_in, stats.items_out + items_out)
+
+  def update(self, other):
+    """Add the totals of another PipelineStats, such as a worker's."""
+    for theirs in other:
+      ours = self._stages.get(theirs.name)
+      if ours is None:
+        self._stages[theirs.name] = theirs
+      else:
+        self._stages[theirs.name] = StageStats(
+            ours.name, ours.calls + theirs.calls,
+            ours.seconds + theirs.seconds, ours.items_in + theirs.items_in,
+            ours.items_out + theirs.items_out)
+
+  def __getitem__(self, name):
+    return self._stages[name]
+
+  def __contains__(self, name):
+    return name in self._stages
+
+  def __iter__(self):
+    """Iterate over the StageStats in the order the stages first ran."""
+    return iter(self._stages.values())
+
+  def __len__(self):
+    return len(self._stages)
+
+  @property
+  def seconds(self):
+    """Total wall time of all the recorded stages."""
+    return sum(stats.seconds for stats in self._stages.values())
+
+  def __str__(self):
+    lines = ['%-12s %6s %10s %10s %10s' % (
+        'stage', 'calls', 'seconds', 'items in', 'items out')]
+    for stats in self._stages.values():
+      lines.append('%-12s %6d %10.4f %10d %10d' % stats)
+    return '\n'.join(lines)
+
+
+class Pipeline(object):
+  """An ordered list of named stages that can each be enabled or disabled.
+
+  A stage is a function taking the context and returning nothing; it reads
+  and updates the attributes of the context in place.
+
+  A frozen pipeline, such as a shared default, cannot be changed; change a
+  copy() of it instead.
+  """
+
+  def __init__(self, stages=(), count=len):
+    """Create a pipeline.
+
+    Args:
+      stages: (name, stage) pairs, in running order.
+      count: Function returning the number of items of a context, recorded
+        before and after every stage.
+    """
+    self._stages = collections.OrderedDict()
+    self._disabled = set()
+    self._count = count
+    self._frozen = False
+    for name, stage in stages:
+      self.register(name, stage)
+
+  @property
+  def frozen(self):
+    return self._frozen
+
+  def freeze(self):
+    """Make the pipeline read-only and return it."""
+    self._frozen = True
+    return self
+
+  def register(self, name, stage, before=None, after=None):
+    """Add a stage, at the end unless before or after names another stage.
+
+    Raises:
+      ValueError: if a stage with that name is already registered.
+      KeyError: if before or after is not a registered stage.
+      TypeError: if the pipeline is frozen.
+    """
+    self._check_not_frozen()
+    if name in self._stages:
+      raise ValueError('Stage already registered: %s' % name)
+    if before is not None and after is not None:
+      raise ValueError('Give at most one of before and after')
+    names = list(self._stages)
+    if before is not None:
+      names.insert(self._index(before), name)
+    elif after is not None:
+      names.insert(self._index(after) + 1, name)
+    else:
+      names.append(name)
+    self._stages[name] = stage
+    self.reorder(names)
+
+  def unregister(self, name):
+    """Remove a stage."""
+    self._check_not_frozen()
+    self._index(name)
+    del self._stages[name]
+    self._disabled.discard(name)
+
+  def enable(self, name):
+    self._check_not_frozen()
+    self._index(name)
+    self._disabled.discard(name)
+
+  def disable(self, name):
+    self._check_not_frozen()
+    self._index(name)
+    self._disabled.add(name)
+
+  def is_enabled(self, name):
+    self._index(name)
+    return name not in self._disabled
+
+  def reorder(self, names):
+    """Set the running order.
+
+    Args:
+      names: Names of registered stages. They run first, in that order,
+        followed by the stages left out, in their current order.
+    """
+    self._check_not_frozen()
+    for name in names:
+      self._index(name)
+    order = list(names) + [name for name in self._stages if name not in names]
+    self._stages = collections.OrderedDict(
+        (name, self._stages[name]) for name in order)
+
+  def names(self, enabled_only=False):
+    """Return the names of the stages in running order."""
+    return [name for name in self._stages
+            if not enabled_only or name not in self._disabled]
+
+  def copy(self):
+    """Return an independent copy of the pipeline, which is not frozen."""
+    pipeline = Pipeline(self._stages.items(), self._count)
+    pipeline._disabled = set(self._disabled)
+    return pipeline
+
+  def run(self, context, stats=None):
+    """Run the enabled stages in order on context.
+
+    Args:
+      context: The object passed to every stage.
+      stats: Optional PipelineStats recording every stage run.
+
+    Returns:
+      context.
+    """
+    for name, stage in self._stages.items():
+      if name in self._disabled:
+        continue
+      if stats is None:
+        stage(context)
+        continue
+      items_in = self._count(context)
+      start = time.perf_counter()
+      stage(context)
+      seconds = time.perf_counter() - start
+      stats.record(name, seconds, items_in, self._count(context))
+    return context
+
+  def _check_not_frozen(self):
+    if self._frozen:
+      raise TypeError('The pipeline is frozen; change a copy() of it')
+
+  def _index(self, name):
+    if name not in self._stages:
+      raise KeyError('Unknown stage: %s' % name)
+    return list(self._stages).index(name)
@@ -1,25 +1,318 @@
-def get_playable_notes(xml_part, melody_only=False):
-    notes = []
-    measure_number = 1
+import bisect
+import collections
+import heapq
+
+from .measure_index import MeasureIndex
+from .pipeline import Pipeline, PipelineStats
+
+
+# A tie that could not be resolved by apply_tied_notes. kind is
+# 'unterminated' for a tie start that is never stopped, with the first
+# note of the chain, or 'unmatched_stop' for a tie stop without a start.
+TieDiagnostic = collections.namedtuple('TieDiagnostic', ['kind', 'note'])
+
+# The playable notes of one part, as returned by extract_part_notes. notes
+# are in playing order; stats is a PipelineStats or None.
+PartNotes = collections.namedtuple(
+    'PartNotes', ['notes', 'rests', 'diagnostics', 'slur_index', 'stats'])
+
+
+def playing_order(note):
+    """Sort key of a note: xml_position, grace_order, descending pitch."""
+    return (note.note_duration.xml_position, note.note_duration.grace_order,
+            -note.pitch[1])
+
+
+class OnsetIndex(object):
+    """Groups the notes of a part by onset.
+
+    The notes are sorted once into playing order, by xml_position, then
+    grace_order, then descending pitch. Notes sharing an xml_position form a
+    slice of that order, and each (xml_position, voice) pair maps to its
+    notes in the same order.
+
+    Stages that drop notes call retain() so that the groups only hold the
+    notes still in play.
+    """
+
+    def __init__(self, notes):
+        self._ranks = {id(note): rank for rank, note in enumerate(notes)}
+        self.notes = sorted(notes, key=playing_order)
+        self._group()
+
+    def _group(self):
+        self._slices = {}
+        self._voices = {}
+        start = 0
+        for i, note in enumerate(self.notes):
+            xml_position = note.note_duration.xml_position
+            if xml_position != self.notes[start].note_duration.xml_position:
+                self._slices[self.notes[start].note_duration.xml_position] = (start, i)
+                start = i
+            self._voices.setdefault((xml_position, note.voice), []).append(note)
+        if self.notes:
+            self._slices[self.notes[start].note_duration.xml_position] = (start, len(self.notes))
+
+    def retain(self, notes):
+        """Keep only the given notes in the index, in playing order."""
+        kept = set(id(note) for note in notes)
+        self.notes = [note for note in self.notes if id(note) in kept]
+        self._group()
+
+    def onsets(self):
+        """Return the distinct xml_positions in ascending order."""
+        return sorted(self._slices)
+
+    def at(self, xml_position, voice=None):
+        """Return the notes at xml_position, in playing order.
+
+        If voice is given, only the notes of that voice are returned.
+        """
+        if voice is not None:
+            return self._voices.get((xml_position, voice), [])
+        if xml_position not in self._slices:
+            return []
+        start, stop = self._slices[xml_position]
+        return self.notes[start:stop]
+
+    def rank(self, note):
+        """Return the position of note in the list the index was built from."""
+        return self._ranks[id(note)]
+
+
+class NoteContext(object):
+    """The notes of a part, passed along the playable-notes pipeline.
+
+    Stages read and replace notes and rests. The onset index is built from
+    the notes the first time a stage asks for it; stages that drop notes
+    afterwards keep it in step with retain_notes(). So is the MeasureIndex
+    of the part, unless one is given.
+    """
+
+    def __init__(self, xml_part, melody_only=False, diagnostics=None,
+                 measure_index=None):
+        self.xml_part = xml_part
+        self.melody_only = melody_only
+        self.diagnostics = diagnostics
+        self.notes = []
+        self.rests = []
+        self.slur_index = None
+        self._onset_index = None
+        self._measure_index = measure_index
+
+    @property
+    def onset_index(self):
+        if self._onset_index is None:
+            self._onset_index = OnsetIndex(self.notes)
+        return self._onset_index
+
+    @property
+    def measure_index(self):
+        if self._measure_index is None:
+            self._measure_index = MeasureIndex(self.xml_part.measures)
+        return self._measure_index
+
+    def retain_notes(self, notes):
+        """Replace notes by a subset of them, updating the onset index."""
+        self.notes = notes
+        if self._onset_index is not None:
+            self._onset_index.retain(notes)
+
+
+def collect_stage(context):
+    # the later stages modify the notes, so they work on derived copies,
+    # which keep the measure_number MusicXMLDocument gave the parsed notes
+    context.notes = [note.derive() for measure in context.xml_part.measures
+                     for note in measure.notes]
+
+
+def classify_stage(context):
+    context.notes, context.rests = classify_notes(
+        context.notes, melody_only=context.melody_only)
+
+
+def grace_stage(context):
+    mark_preceded_by_grace_note_to_chord_notes(context.notes, context.onset_index)
+
+
+def melody_stage(context):
+    if context.melody_only:
+        context.notes = delete_chord_notes_for_melody(context.notes, context.onset_index)
+
+
+def ties_stage(context):
+    context.retain_notes(apply_tied_notes(context.notes, context.diagnostics))
+
+
+def sort_stage(context):
+    context.notes = list(context.onset_index.notes)
+
+
+def overlaps_stage(context):
+    context.notes = check_overlapped_notes(context.notes, context.onset_index)
+
+
+def rests_stage(context):
+    context.notes = apply_rest_to_note(context.notes, context.rests)
+
+
+def trills_stage(context):
+    context.notes = omit_trill_notes(context.notes, context.onset_index)
+
+
+def slurs_stage(context):
+    context.notes, context.slur_index = extract_and_apply_slurs(context.notes)
+
+
+def default_pipeline():
+    """Return a new Pipeline of the default playable-notes stages.
+
+    The stages, in order: collect, classify, grace, melody, ties, sort,
+    overlaps, rests, trills, slurs. Each takes a NoteContext; item counts
+    are the number of notes.
+    """
+    return Pipeline([
+        ('collect', collect_stage),
+        ('classify', classify_stage),
+        ('grace', grace_stage),
+        ('melody', melody_stage),
+        ('ties', ties_stage),
+        ('sort', sort_stage),
+        ('overlaps', overlaps_stage),
+        ('rests', rests_stage),
+        ('trills', trills_stage),
+        ('slurs', slurs_stage),
+    ], count=count_notes)
+
+
+def count_notes(context):
+    """Return the number of notes of a NoteContext."""
+    return len(context.notes)
+
+
+# Shared by every document, so it is frozen: use a copy() or
+# default_pipeline() to run other stages.
+DEFAULT_PIPELINE = default_pipeline().freeze()
+
+
+def get_playable_notes(xml_part, melody_only=False, diagnostics=None,
+                       slur_indexes=None, pipeline=None, stats=None,
+                       measure_index=None):
+    """Run the playable-notes pipeline on a part.
+
+    The parsed notes of the part are not modified; the returned notes and
+    rests are copies made by Note.derive().
+
+    Args:
+      xml_part: The Part.
+      melody_only: Keep only the highest note of voice 1 at every onset.
+      diagnostics: Optional list receiving TieDiagnostics.
+      slur_indexes: Optional list receiving the SlurIndex of the part, or
+        None if the slurs stage did not run.
+      pipeline: The Pipeline to run. Defaults to DEFAULT_PIPELINE.
+      stats: Optional pipeline.PipelineStats recording every stage.
+      measure_index: The MeasureIndex of the part, built if not given.
+
+    Returns:
+      A (notes, rests) tuple.
+    """
+    if pipeline is None:
+        pipeline = DEFAULT_PIPELINE
+    context = NoteContext(xml_part, melody_only, diagnostics, measure_index)
+    pipeline.run(context, stats)
+    if slur_indexes is not None:
+        slur_indexes.append(context.slur_index)
+    # notes = self.rearrange_chord_index(notes)
+    return context.notes, context.rests
+
+
+def extract_part_notes(xml_part, pipeline=None, record_stats=False,
+                       measure_index=None):
+    """Run the playable-notes pipeline on a part and sort its notes.
+
+    The notes are sorted stably into playing order, so the notes of several
+    parts can be combined with heapq.merge(..., key=playing_order).
+
+    Args:
+      xml_part: The Part.
+      pipeline: The Pipeline to run. Defaults to DEFAULT_PIPELINE.
+      record_stats: Record the stages in a new PipelineStats.
+      measure_index: The MeasureIndex of the part, built if not given.
+
+    Returns:
+      A PartNotes.
+    """
+    diagnostics = []
+    slur_indexes = []
+    stats = PipelineStats() if record_stats else None
+    notes, rests = get_playable_notes(
+        xml_part, diagnostics=diagnostics, slur_indexes=slur_indexes,
+        pipeline=pipeline, stats=stats, measure_index=measure_index)
+    notes.sort(key=playing_order)
+    return PartNotes(notes, rests, diagnostics, slur_indexes[0], stats)
+
+
+def detach_part_notes(xml_part, pipeline=None, record_stats=False,
+                      measure_index=None):
+    """Run extract_part_notes for a worker of an executor.
+
+    A process pool works on a pickled copy of the part, so the parsed_note
+    of every returned note is replaced by the index of the parsed note in
+    the part, in document order. attach_part_notes links them back.
+
+    Returns:
+      A PartNotes.
+    """
+    part_notes = extract_part_notes(xml_part, pipeline, record_stats,
+                                    measure_index)
+    indices = {}
     for measure in xml_part.measures:
         for note in measure.notes:
-            note.measure_number = measure_number
-            notes.append(note)
-        measure_number += 1
-
-    notes, rests = classify_notes(notes, melody_only=melody_only)
-    mark_preceded_by_grace_note_to_chord_notes(notes)
-    if melody_only:
-        notes = delete_chord_notes_for_melody(notes)
-    notes = apply_tied_notes(notes)
-    notes.sort(key=lambda x: (x.note_duration.xml_position,
-                x.note_duration.grace_order, -x.pitch[1]))
-    notes = check_overlapped_notes(notes)
-    notes = apply_rest_to_note(notes, rests)
-    notes = omit_trill_notes(notes)
-    notes = extract_and_apply_slurs(notes)
-    # notes = self.rearrange_chord_index(notes)
-    return notes, rests
+            indices[id(note)] = len(indices)
+    for note in _part_notes_of(part_notes):
+        if not isinstance(note.parsed_note, int):
+            note.parsed_note = indices[id(note.parsed_note)]
+    return part_notes
+
+
+def attach_part_notes(part_notes, xml_part):
+    """Link the notes returned by detach_part_notes to the parsed notes.
+
+    The attributes Note.derive() shares with the parsed note, which a
+    process pool returns as copies or released elements, are shared again.
+
+    Args:
+      part_notes: The PartNotes returned by detach_part_notes for xml_part.
+      xml_part: The Part in this process.
+
+    Returns:
+      part_notes.
+    """
+    parsed_notes = [note for measure in xml_part.measures
+                    for note in measure.notes]
+    for note in _part_notes_of(part_notes):
+        if isinstance(note.parsed_note, int):
+            parsed_note = parsed_notes[note.parsed_note]
+            note.parsed_note = parsed_note
+            note.xml_note = parsed_note.xml_note
+            note.state = parsed_note.state
+            note.state_fixed = parsed_note.state_fixed
+            note.note_notations.xml_notations = (
+                parsed_note.note_notations.xml_notations)
+            note._dynamic = parsed_note._dynamic
+            note._tempo = parsed_note._tempo
+            note._pedal = parsed_note._pedal
+    return part_notes
+
+
+def _part_notes_of(part_notes):
+    """Iterate over the notes, rests and diagnostic notes of a PartNotes."""
+    for note in part_notes.notes:
+        yield note
+    for rest in part_notes.rests:
+        yield rest
+    for diagnostic in part_notes.diagnostics:
+        yield diagnostic.note
 
 
 def classify_notes(notes, melody_only=False):
@@ -66,165 +359,231 @@ def classify_notes(notes, melody_only=False):
     return notes_tmp, rests
 
 
-def mark_preceded_by_grace_note_to_chord_notes(notes):
+def mark_preceded_by_grace_note_to_chord_notes(notes, onset_index):
     for note in notes:
         if note.note_duration.preceded_by_grace_note:
-            onset = note.note_duration.xml_position
-            voice = note.voice
-            chords = [note for note in notes if
-                      note.note_duration.xml_position == onset and
-                      note.voice == voice and
-                      not note.note_duration.is_grace_note]
+            chords = onset_index.at(note.note_duration.xml_position, note.voice)
             for chd in chords:
-                chd.note_duration.preceded_by_grace_note = True
+                if not chd.note_duration.is_grace_note:
+                    chd.note_duration.preceded_by_grace_note = True
 
 
-def delete_chord_notes_for_melody(melody_notes):
-    note_onset_positions = list(
-        set(note.note_duration.xml_position for note in melody_notes))
-    note_onset_positions.sort()
+def delete_chord_notes_for_melody(melody_notes, onset_index):
     unique_melody = []
-    for onset in note_onset_positions:
-        notes = [
-            note for note in melody_notes if note.note_duration.xml_position == onset]
-        if len(notes) == 1:
-            unique_melody.append(notes[0])
-        else:
-            notes.sort(key=lambda x: x.pitch[1])
-            unique_melody.append(notes[-1])
+    for onset in onset_index.onsets():
+        # the highest note, the last one of the melody_notes among equals
+        notes = onset_index.at(onset)
+        unique_melody.append(max(notes, key=lambda x: (x.pitch[1], onset_index.rank(x))))
 
+    onset_index.retain(unique_melody)
     return unique_melody
 
 
-def apply_tied_notes(notes):
+def apply_tied_notes(notes, diagnostics=None):
+    """Merge every tied note into the note its tie chain starts from.
+
+    Open ties are kept per (voice, staff, pitch), so a tied_stop note finds
+    its start in constant time, and a note that both stops and starts a tie
+    carries the chain on to the next one.
+
+    Args:
+      notes: Notes of one part, in document order.
+      diagnostics: Optional list. A TieDiagnostic is appended for every tie
+        start that is never stopped and every tie stop without a start.
+
+    Returns:
+      The notes that are not tied_stop, with the durations, seconds, MIDI
+      ticks and slurs of their tie chains added. A tie stop without a start
+      is dropped, as is the rest of the chain it starts.
+    """
     tie_clean_list = []
-    for i in range(len(notes)):
-        if notes[i].note_notations.tied_stop == False:
-            tie_clean_list.append(notes[i])
+    open_ties = {}
+    for note in notes:
+        key = (note.voice, note.staff, note.pitch[1])
+        if not note.note_notations.tied_stop:
+            tie_clean_list.append(note)
+            head = note
         else:
-            for j in reversed(range(len(tie_clean_list))):
-                if tie_clean_list[j].note_notations.tied_start and tie_clean_list[j].pitch[1] == notes[i].pitch[1]:
-                    tie_clean_list[j].note_duration.seconds += notes[i].note_duration.seconds
-                    tie_clean_list[j].note_duration.duration += notes[i].note_duration.duration
-                    tie_clean_list[j].note_duration.midi_ticks += notes[i].note_duration.midi_ticks
-                    if notes[i].note_notations.slurs:
-                        for slur in notes[i].note_notations.slurs:
-                            tie_clean_list[j].note_notations.slurs.append(slur)
-                    break
+            head = open_ties.pop(key, None)
+            if head is None:
+                if diagnostics is not None:
+                    diagnostics.append(TieDiagnostic('unmatched_stop', note))
+            else:
+                head.note_duration.seconds += note.note_duration.seconds
+                head.note_duration.duration += note.note_duration.duration
+                head.note_duration.midi_ticks += note.note_duration.midi_ticks
+                if note.note_notations.has_slurs:
+                    for slur in note.note_notations.slurs:
+                        head.note_notations.add_slur(slur)
+        if note.note_notations.tied_start and head is not None:
+            if key in open_ties and diagnostics is not None:
+                diagnostics.append(TieDiagnostic('unterminated', open_ties[key]))
+            open_ties[key] = head
+
+    if diagnostics is not None:
+        for head in open_ties.values():
+            diagnostics.append(TieDiagnostic('unterminated', head))
     return tie_clean_list
 
 
-def check_overlapped_notes(notes):
-    previous_onset = -1
-    notes_on_onset = []
-    pitches = []
-    for note in notes:
-        if note.note_duration.is_grace_note:
-            continue  # does not count grace note, because it can have same pitch on same xml_position
-        if note.note_duration.xml_position > previous_onset:
-            previous_onset = note.note_duration.xml_position
-            pitches = []
-            pitches.append(note.pitch[1])
-            notes_on_onset = []
-            notes_on_onset.append(note)
-        else:  # note has same xml_position
-            if note.pitch[1] in pitches:  # same pitch with same
-                index_of_same_pitch_note = pitches.index(note.pitch[1])
-                previous_note = notes_on_onset[index_of_same_pitch_note]
+def check_overlapped_notes(notes, onset_index):
+    for onset in onset_index.onsets():
+        notes_on_onset = {}
+        for note in onset_index.at(onset):
+            if note.note_duration.is_grace_note:
+                continue  # does not count grace note, because it can have same pitch on same xml_position
+            if note.pitch[1] in notes_on_onset:  # same pitch with same
+                previous_note = notes_on_onset[note.pitch[1]]
                 if previous_note.note_duration.duration > note.note_duration.duration:
                     note.is_overlapped = True
                 else:
                     previous_note.is_overlapped = True
             else:
-                pitches.append(note.pitch[1])
-                notes_on_onset.append(note)
+                notes_on_onset[note.pitch[1]] = note
 
     return notes
 
 
 def apply_rest_to_note(notes, rests):
-    xml_positions = [note.note_duration.xml_position for note in notes]
-    # concat continuous rests
-    new_rests = []
-    num_rests = len(rests)
-    for i in range(num_rests):
-        rest = rests[i]
-        j = 1
-        current_end = rest.note_duration.xml_position + rest.note_duration.duration
-        current_voice = rest.voice
-        while i + j < num_rests - 1:
-            next_rest = rests[i + j]
-            if next_rest.note_duration.duration == 0:
-              break
-            if next_rest.note_duration.xml_position == current_end and next_rest.voice == current_voice:
-                rest.note_duration.duration += next_rest.note_duration.duration
-                next_rest.note_duration.duration = 0
-                current_end = rest.note_duration.xml_position + rest.note_duration.duration
-                if next_rest.note_notations.is_fermata:
-                    rest.note_notations.is_fermata = True
-            elif next_rest.note_duration.xml_position > current_end:
-                break
-            j += 1
+    """Merge contiguous rests and attach them to the notes they follow.
+
+    Args:
+      notes: Notes of one part, sorted by xml_position.
+      rests: Rests of the same part, in document order.
 
-        if not rest.note_duration.duration == 0:
-            new_rests.append(rest)
+    Returns:
+      notes, with following_rest_duration and followed_by_fermata_rest set.
+    """
+    rests = merge_rests(rests)
+    if not notes:
+        return notes
 
-    rests = new_rests
+    # notes and their xml_positions by voice, in the order of notes
+    voice_notes = {}
+    voice_positions = {}
+    for note in notes:
+        voice_notes.setdefault(note.voice, []).append(note)
+        voice_positions.setdefault(note.voice, []).append(note.note_duration.xml_position)
+    first_position = notes[0].note_duration.xml_position
 
     for rest in rests:
+        if rest.voice not in voice_notes:
+            continue
         rest_position = rest.note_duration.xml_position
-        closest_note_index = binary_index(xml_positions, rest_position)
-        rest_is_fermata = rest.note_notations.is_fermata
-
-        search_index = 0
-        while closest_note_index - search_index >= 0:
-            prev_note = notes[closest_note_index - search_index]
-            if prev_note.voice == rest.voice:
-                prev_note_end = prev_note.note_duration.xml_position + prev_note.note_duration.duration
-                prev_note_with_rest = prev_note_end + prev_note.following_rest_duration
-                if prev_note_end == rest_position:
-                    prev_note.following_rest_duration = rest.note_duration.duration
-                    if rest_is_fermata:
-                        prev_note.followed_by_fermata_rest = True
-                elif prev_note_end < rest_position:
-                    break
-            # elif prev_note_with_rest == rest_position and prev_note.voice == rest.voice:
-            #     prev_note.following_rest_duration += rest.note_duration.duration
-            search_index += 1
+        same_voice_notes = voice_notes[rest.voice]
+        if rest_position < first_position:
+            # only the first note of the part is looked at
+            index = 0 if notes[0].voice == rest.voice else -1
+        else:
+            index = bisect.bisect_right(voice_positions[rest.voice], rest_position) - 1
+
+        # walk back over the notes still sounding at the rest
+        while index >= 0:
+            prev_note = same_voice_notes[index]
+            prev_note_end = prev_note.note_duration.xml_position + prev_note.note_duration.duration
+            if prev_note_end == rest_position:
+                prev_note.following_rest_duration = rest.note_duration.duration
+                if rest.note_notations.is_fermata:
+                    prev_note.followed_by_fermata_rest = True
+            elif prev_note_end < rest_position:
+                break
+            index -= 1
 
     return notes
 
 
+def merge_rests(rests):
+    """Merge every rest into the rest of the same voice it continues.
+
+    Each rest scans the rests after it in document order: it absorbs a rest
+    of its voice starting at its end, and stops at a rest that starts after
+    its end or was already absorbed. The last rest is never absorbed.
+
+    The scans run side by side in one sweep over the rests. Open scans are
+    indexed by (voice, end) to find the one absorbing a rest, and by end to
+    stop those a rest starts after.
 
-def omit_trill_notes(notes):
+    Args:
+      rests: Rests of one part, in document order. Absorbed rests get a
+        duration of 0.
+
+    Returns:
+      The rests whose duration is not 0, in document order.
+    """
+    num_rests = len(rests)
+    ends = [0] * num_rests
+    is_open = [False] * num_rests
+    open_scans = []  # ascending, including closed ones
+    by_end = []  # heap of (end, index)
+    by_voice_end = {}  # (voice, end) -> heap of indices
+
+    def close(index):
+        is_open[index] = False
+
+    def start(index):
+        rest = rests[index]
+        ends[index] = rest.note_duration.xml_position + rest.note_duration.duration
+        is_open[index] = True
+        heapq.heappush(by_end, (ends[index], index))
+        heapq.heappush(by_voice_end.setdefault((rest.voice, ends[index]), []), index)
+
+    for j in range(num_rests - 1):
+        next_rest = rests[j]
+        position = next_rest.note_duration.xml_position
+        if next_rest.note_duration.duration == 0:
+            for index in open_scans:
+                close(index)
+            open_scans = []
+            by_end = []
+            by_voice_end = {}
+        else:
+            candidates = by_voice_end.get((next_rest.voice, position))
+            while candidates and not (is_open[candidates[0]] and ends[candidates[0]] == position):
+                heapq.heappop(candidates)
+            if candidates:
+                index = candidates[0]
+                rest = rests[index]
+                rest.note_duration.duration += next_rest.note_duration.duration
+                next_rest.note_duration.duration = 0
+                if next_rest.note_notations.is_fermata:
+                    rest.note_notations.is_fermata = True
+                # later scans stop at the absorbed rest
+                while open_scans and open_scans[-1] > index:
+                    close(open_scans.pop())
+                start(index)
+            while by_end and by_end[0][0] < position:
+                end, index = heapq.heappop(by_end)
+                if is_open[index] and ends[index] == end:
+                    close(index)
+        open_scans.append(j)
+        start(j)
+
+    return [rest for rest in rests if rest.note_duration.duration != 0]
+
+
+def omit_trill_notes(notes, onset_index):
     def _combine_wavy_lines(wavy_lines):
-        num_wavy = len(wavy_lines)
-        for i in reversed(range(num_wavy)):
-            wavy = wavy_lines[i]
-            if wavy.type == 'stop':
-                deleted = False
-                for j in range(1, i + 1):
-                    prev_wavy = wavy_lines[i - j]
-                    if prev_wavy.type == 'start' and prev_wavy.number == wavy.number:
-                        prev_wavy.end_xml_position = wavy.xml_position
-                        wavy_lines.remove(wavy)
-                        deleted = True
-                        break
-                if not deleted:
-                    wavy_lines.remove(wavy)
-        num_wavy = len(wavy_lines)
-        for i in reversed(range(num_wavy)):
-            wavy = wavy_lines[i]
-            if wavy.end_xml_position == 0:
-                wavy_lines.remove(wavy)
-        return wavy_lines
+        # a stop ends the closest start with its number before it; when
+        # several stops end the same start, the first of them wins
+        open_starts = {}
+        ended = set()
+        for wavy in wavy_lines:
+            if wavy.type == 'start':
+                open_starts[wavy.number] = wavy
+            elif wavy.type == 'stop':
+                prev_wavy = open_starts.get(wavy.number)
+                if prev_wavy is not None and id(prev_wavy) not in ended:
+                    prev_wavy.end_xml_position = wavy.xml_position
+                    ended.add(id(prev_wavy))
+        return [wavy for wavy in wavy_lines
+                if wavy.type != 'stop' and wavy.end_xml_position != 0]
 
     def _apply_wavy_lines(notes, wavy_lines):
         xml_positions = [x.note_duration.xml_position for x in notes]
         num_notes = len(notes)
-        omit_indices = []
+        keep = [True] * num_notes
         for wavy in wavy_lines:
-            index = binary_index(xml_positions, wavy.xml_position)
+            index = max(bisect.bisect_right(xml_positions, wavy.xml_position) - 1, 0)
             while abs(notes[index].pitch[1] - wavy.pitch[1]) > 3 and index > 0 \
                     and notes[index - 1].note_duration.xml_position == notes[index].note_duration.xml_position:
                     index -= 1
@@ -235,24 +594,15 @@ def omit_trill_notes(notes):
             next_idx = index + 1
             while next_idx < num_notes and notes[next_idx].note_duration.xml_position < wavy.end_xml_position:
                 if notes[next_idx].pitch[1] == trill_pitch:
-                    omit_indices.append(next_idx)
+                    keep[next_idx] = False
                 next_idx += 1
 
-        omit_indices.sort()
-        if len(omit_indices) > 0:
-            for idx in reversed(omit_indices):
-                del notes[idx]
+        return [note for note, kept in zip(notes, keep) if kept]
 
-        return notes
-
-    num_notes = len(notes)
-    omit_index = []
     trill_sign = []
     wavy_lines = []
-    for i in range(num_notes):
-      note = notes[i]
+    for note in notes:
       if not note.is_print_object:
-        omit_index.append(i)
         if note.accidental:
           # TODO: handle accidentals in non-print notes
           if note.accidental == 'natural':
@@ -272,37 +622,20 @@ def omit_trill_notes(notes):
 
       # move trill mark to the highest notes of the onset
       if note.note_notations.is_trill:
-        notes_in_trill_onset = []
-        current_position = note.note_duration.xml_position
-
-        search_index = i
-        while search_index + 1 < num_notes and notes[
-          search_index + 1].note_duration.xml_position == current_position:
-          search_index += 1
-          notes_in_trill_onset.append(notes[search_index])
-        search_index = i
-
-        while search_index - 1 >= 0 and notes[search_index - 1].note_duration.xml_position == current_position:
-          search_index -= 1
-          notes_in_trill_onset.append(notes[search_index])
-
-        for other_note in notes_in_trill_onset:
-          highest_note = note
-          if other_note.voice == note.voice and other_note.pitch[1] > highest_note.pitch[
-            1] and not other_note.note_duration.is_grace_note:
-            highest_note.note_notations.is_trill = False
+        for other_note in onset_index.at(note.note_duration.xml_position, note.voice):
+          if other_note.pitch[1] > note.pitch[1] and not other_note.note_duration.is_grace_note:
+            note.note_notations.is_trill = False
             other_note.note_notations.is_trill = True
 
     wavy_lines = _combine_wavy_lines(wavy_lines)
 
-    for index in reversed(omit_index):
-      note = notes[index]
-      notes.remove(note)
+    # non-print notes only carry trill signs for the printed ones
+    notes = [note for note in notes if note.is_print_object]
 
     if len(trill_sign) > 0:
       for trill in trill_sign:
-        for note in notes:
-          if note.note_duration.xml_position == trill['xml_pos'] and abs(note.pitch[1] - trill['pitch']) < 4 \
+        for note in onset_index.at(trill['xml_pos']):
+          if note.is_print_object and abs(note.pitch[1] - trill['pitch']) < 4 \
                   and not note.note_duration.is_grace_note:
             note.note_notations.is_trill = True
             break
@@ -313,46 +646,115 @@ def omit_trill_notes(notes):
 
 
 def extract_and_apply_slurs(notes):
+    """Resolve the slurs of notes in xml_position order and mark the notes.
+
+    Notes without a slur of their own get every resolved slur of their voice
+    that spans them, and are marked as its start, stop or continuation.
+
+    Args:
+      notes: Notes of one part, sorted by xml_position.
+
+    Returns:
+      A (notes, SlurIndex of the resolved slurs) tuple.
+    """
     resolved_slurs = []
-    unresolved_slurs = []
+    # unresolved slurs by (number, voice), oldest first
+    unresolved_slurs = {}
     slur_index = 0
     for note in notes:
-        slurs = note.note_notations.slurs
-        if slurs:
-            for slur in reversed(slurs):
+        if note.note_notations.has_slurs:
+            for slur in reversed(note.note_notations.slurs):
                 slur.xml_position = note.note_duration.xml_position
                 slur.voice = note.voice
                 if slur.type == 'start':
                     slur.index = slur_index
-                    unresolved_slurs.append(slur)
+                    unresolved_slurs.setdefault((slur.number, slur.voice), collections.deque()).append(slur)
                     slur_index += 1
                     note.note_notations.is_slur_start = True
                 elif slur.type == 'stop':
                     note.note_notations.is_slur_stop = True
-                    for prev_slur in unresolved_slurs:
-                        if prev_slur.number == slur.number and prev_slur.voice == slur.voice:
-                            prev_slur.end_xml_position = slur.xml_position
-                            resolved_slurs.append(prev_slur)
-                            unresolved_slurs.remove(prev_slur)
-                            note.note_notations.slurs.remove(slur)
-                            note.note_notations.slurs.append(prev_slur)
-                            break
-
-    for note in notes:
-        slurs = note.note_notations.slurs
+                    open_slurs = unresolved_slurs.get((slur.number, slur.voice))
+                    if open_slurs:
+                        prev_slur = open_slurs.popleft()
+                        prev_slur.end_xml_position = slur.xml_position
+                        resolved_slurs.append(prev_slur)
+                        note.note_notations.slurs.remove(slur)
+                        note.note_notations.add_slur(prev_slur)
+
+    slur_spans = SlurIndex(resolved_slurs)
+    for note, spanning_slurs in slur_spans.sweep(notes):
+        if note.note_notations.has_slurs:
+            continue
         note_position = note.note_duration.xml_position
-        if not slurs:
-            for prev_slur in resolved_slurs:
-                if prev_slur.voice == note.voice and prev_slur.xml_position <= note_position <= prev_slur.end_xml_position:
-                    note.note_notations.slurs.append(prev_slur)
-                    if prev_slur.xml_position == note_position:
-                        note.note_notations.is_slur_start = True
-                    elif prev_slur.end_xml_position == note_position:
-                        note.note_notations.is_slur_stop = True
-                    else:
-                        note.note_notations.is_slur_continue = True
+        for prev_slur in spanning_slurs:
+            note.note_notations.add_slur(prev_slur)
+            if prev_slur.xml_position == note_position:
+                note.note_notations.is_slur_start = True
+            elif prev_slur.end_xml_position == note_position:
+                note.note_notations.is_slur_stop = True
+            else:
+                note.note_notations.is_slur_continue = True
 
-    return notes
+    return notes, slur_spans
+
+
+class SlurIndex(object):
+    """Resolved slurs of a part, indexed by voice.
+
+    The slurs of each voice are sorted by their start, so the slurs spanning
+    each of a list of notes sorted by xml_position are found in one sweep.
+    """
+
+    def __init__(self, slurs):
+        """Index slurs, given in the order they were resolved."""
+        # (xml_position, resolution order, slur) by voice
+        self._voices = {}
+        for order, slur in enumerate(slurs):
+            self._voices.setdefault(slur.voice, []).append(
+                (slur.xml_position, order, slur))
+        for entries in self._voices.values():
+            entries.sort(key=lambda x: x[:2])
+
+    def spans(self, voice=None):
+        """Return the slurs of voice, or of all voices, sorted by start.
+
+        Each Slur spans xml_position to end_xml_position, both included.
+        """
+        if voice is not None:
+            entries = self._voices.get(voice, [])
+        else:
+            entries = sorted((entry for entries in self._voices.values()
+                              for entry in entries), key=lambda x: x[:2])
+        return [slur for _, _, slur in entries]
+
+    def sweep(self, notes):
+        """Yield every note with the slurs of its voice that span it.
+
+        Args:
+          notes: Notes sorted by xml_position.
+
+        Yields:
+          (note, slurs) pairs, the slurs in the order they were resolved.
+        """
+        next_entries = {}
+        active = {}
+        for note in notes:
+            entries = self._voices.get(note.voice)
+            if not entries:
+                yield note, []
+                continue
+            position = note.note_duration.xml_position
+            i = next_entries.get(note.voice, 0)
+            voice_active = [entry for entry in active.get(note.voice, [])
+                            if entry[2].end_xml_position >= position]
+            while i < len(entries) and entries[i][0] <= position:
+                if entries[i][2].end_xml_position >= position:
+                    voice_active.append(entries[i])
+                i += 1
+            next_entries[note.voice] = i
+            active[note.voice] = voice_active
+            yield note, [slur for _, _, slur in
+                         sorted(voice_active, key=lambda x: x[1])]
 
 
 def binary_index(alist, item):
@@ -0,0 +1,174 @@
+"""Measure-at-a-time access to a MusicXML score read with iterparse."""
+from .lean import release_measure
+from .part import Part
+
+
+class MeasureStream(object):
+  """Lazily pulls the <measure> elements of one <part> from iterparse events.
+
+  Measures are read from the events iterator only when they are indexed.
+  When the next measure is requested, the previous one is detached from its
+  <part> and cleared, so the element tree never holds more than one measure.
+
+  Nothing is kept of released measures. Repeats, endings and da capo jumps
+  mostly reuse the measures parsed the first time; when one of them needs
+  a released measure again, the part is replayed from the file, one measure
+  at a time, up to that measure.
+  """
+
+  def __init__(self, events, xml_part, replay):
+    """Create the stream.
+
+    Args:
+      events: The iterparse iterator, positioned just after the 'start'
+        event of xml_part. It must report both 'start' and 'end' events.
+      xml_part: The <part> element whose measures are streamed.
+      replay: Function returning a new (source, events, xml_part) for the
+        same part, as replay_part does. source is closed by the stream.
+    """
+    self._part = _PartEvents(events, xml_part)
+    self._replay = replay
+    # _PartEvents of the replayed part, or None
+    self._replayed = None
+    self._replayed_source = None
+    self._current = None
+
+  def __getitem__(self, index):
+    self._release_current()
+    if index >= self._part.num_measures:
+      part = self._part
+    else:
+      part = self._replayed_part(index)
+    measure = part.measure(index)
+    if measure is None:
+      raise IndexError('measure index out of range')
+    self._current = (part, measure)
+    return measure
+
+  def close(self):
+    """Release the last measure and skip the rest of the part."""
+    self._release_current()
+    self._part.skip_to_end()
+    self._close_replay()
+
+  def _replayed_part(self, index):
+    """Return the _PartEvents of a replay that has not read index yet."""
+    if self._replayed is None or index < self._replayed.num_measures:
+      self._close_replay()
+      self._replayed_source, events, xml_part = self._replay()
+      self._replayed = _PartEvents(events, xml_part)
+    return self._replayed
+
+  def _close_replay(self):
+    if self._replayed_source is not None:
+      self._replayed_source.close()
+    self._replayed = None
+    self._replayed_source = None
+
+  def _release_current(self):
+    """Detach and clear the measure handed out by the last lookup."""
+    if self._current is not None:
+      part, measure = self._current
+      part.release(measure)
+      self._current = None
+
+
+class _PartEvents(object):
+  """The <measure> elements of a <part>, pulled in order from its events."""
+
+  def __init__(self, events, xml_part):
+    self._events = events
+    self._xml_part = xml_part
+    self.num_measures = 0
+    self._finished = False
+
+  def measure(self, index):
+    """Return the measure at index, releasing the ones before it.
+
+    index must not be smaller than num_measures. Returns None past the last
+    measure.
+    """
+    while not self._finished:
+      measure = self._pull_measure()
+      if measure is None:
+        break
+      if self.num_measures == index + 1:
+        return measure
+      self.release(measure)
+    return None
+
+  def skip_to_end(self):
+    """Release the remaining measures of the part."""
+    while not self._finished:
+      measure = self._pull_measure()
+      if measure is not None:
+        self.release(measure)
+
+  def release(self, measure):
+    """Detach a measure pulled from the part and clear it."""
+    self._xml_part.remove(measure)
+    measure.clear()
+
+  def _pull_measure(self):
+    """Read events until the next <measure> of the part is complete."""
+    while not self._finished:
+      event, element = next(self._events)
+      if event != 'end':
+        continue
+      if element is self._xml_part:
+        self._finished = True
+      elif element.tag == 'measure':
+        self.num_measures += 1
+        return element
+    return None
+
+
+def replay_part(backend, source, part_index):
+  """Read a score again up to the start of one of its parts.
+
+  Measures and parts before it are cleared as they are read.
+
+  Args:
+    backend: The xml_backend to read the score with.
+    source: A binary file object of the score.
+    part_index: Index of the <part> element among the parts of the score.
+
+  Returns:
+    (source, events, xml_part), the events positioned just after the
+    'start' event of the part.
+
+  Raises:
+    IndexError: if the score has fewer parts.
+  """
+  events = backend.iterparse(source, events=('start', 'end'))
+  root = None
+  num_parts = 0
+  for event, element in events:
+    if root is None:
+      root = element
+    elif element.tag == 'part':
+      if event == 'start':
+        if num_parts == part_index:
+          return source, events, element
+        num_parts += 1
+      else:
+        root.remove(element)
+        element.clear()
+    elif event == 'end' and element.tag == 'measure':
+      element.clear()
+  source.close()
+  raise IndexError('part index out of range')
+
+
+class StreamPart(Part):
+  """Part read from a MeasureStream.
+
+  The stream clears every measure element once the next one is requested,
+  so parsed measures release the elements they were built from, as with
+  lean=True, instead of pointing at cleared elements.
+  """
+
+  def _parse_measure(self, xml_measure):
+    measure = Part._parse_measure(self, xml_measure)
+    release_measure(measure)
+    return measure
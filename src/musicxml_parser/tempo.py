@@ -1,5 +1,4 @@
 from . import constants
-import copy
 
 
 class Tempo(object):
@@ -10,21 +9,24 @@ class Tempo(object):
     self.qpm = -1
     self.time_position = -1
     self.xml_position = -1
-    self.state = copy.copy(state)
+    self.state = state.snapshot()
     if xml_sound is not None:
-      self._parse()
+      self._parse(state)
 
-  def _parse(self):
+  def _parse(self, state):
     """Parse the MusicXML <sound> element and retrieve the tempo.
 
     If no tempo is specified, default to DEFAULT_QUARTERS_PER_MINUTE
+
+    Args:
+      state: The MusicXMLParserState giving the position of the tempo.
     """
     self.qpm = float(self.xml_sound.get('tempo'))
     if self.qpm == 0:
       # If tempo is 0, set it to default
       self.qpm = constants.DEFAULT_QUARTERS_PER_MINUTE
-    self.time_position = self.state.time_position
-    self.xml_position = self.state.xml_position
+    self.time_position = state.time_position
+    self.xml_position = state.xml_position
 
   def __str__(self):
     tempo_str = 'Tempo: ' + str(self.qpm)
@@ -0,0 +1,94 @@
+"""Conversion between MusicXML positions and seconds through tempo changes."""
+from bisect import bisect_right
+
+import numpy as np
+
+
+class TempoMap(object):
+  """Piecewise linear map from xml_position to seconds.
+
+  Each tempo starts a segment at its xml_position. The seconds at the start
+  of every segment are accumulated once, so a lookup is a bisect over the
+  segment starts instead of a scan of every tempo.
+
+  Positions before the first tempo use the last tempo, as the linear scan
+  it replaces did.
+  """
+
+  def __init__(self, tempos):
+    """Build the map.
+
+    Args:
+      tempos: Tempo objects. They are sorted by xml_position, keeping the
+        given order of tempos at the same position.
+    """
+    tempos = sorted(tempos, key=lambda x: x.xml_position)
+    self.xml_positions = [tempo.xml_position for tempo in tempos]
+    # Divisions per second of every segment.
+    self.rates = [tempo.qpm / 60 * tempo.state.divisions for tempo in tempos]
+    # Seconds at the start of every segment.
+    self.time_positions = []
+    time_position = 0
+    for i, tempo in enumerate(tempos):
+      self.time_positions.append(time_position)
+      if i + 1 < len(tempos):
+        time_position += ((self.xml_positions[i + 1] - self.xml_positions[i])
+                          / tempo.qpm * 60 / tempo.state.divisions)
+
+  def __len__(self):
+    return len(self.xml_positions)
+
+  def index(self, xml_position):
+    """Return the index of the segment containing xml_position."""
+    i = bisect_right(self.xml_positions, xml_position) - 1
+    if i < 0:
+      i = len(self.xml_positions) - 1
+    return i
+
+  def seconds(self, xml_position):
+    """Convert an xml_position to seconds."""
+    i = self.index(xml_position)
+    return (self.time_positions[i]
+            + (xml_position - self.xml_positions[i]) / self.rates[i])
+
+  def duration_seconds(self, xml_position, duration):
+    """Convert a duration in divisions starting at xml_position to seconds."""
+    return duration / self.rates[self.index(xml_position)]
+
+  def xml_position(self, seconds):
+    """Convert seconds to an xml_position, the inverse of seconds()."""
+    i = bisect_right(self.time_positions, seconds) - 1
+    if i < 0:
+      i = 0
+    return (self.xml_positions[i]
+            + (seconds - self.time_positions[i]) * self.rates[i])
+
+  def _indices(self, xml_positions):
+    indices = np.searchsorted(np.asarray(self.xml_positions), xml_positions,
+                              side='right') - 1
+    # np.where, unlike item assignment, also takes the scalar given for a
+    # single position
+    return np.where(indices < 0, len(self.xml_positions) - 1, indices)
+
+  def seconds_array(self, xml_positions):
+    """Vectorised seconds() over an xml_position or an array of them."""
+    xml_positions = np.asarray(xml_positions)
+    indices = self._indices(xml_positions)
+    return (np.asarray(self.time_positions, dtype=np.float64)[indices]
+            + (xml_positions - np.asarray(self.xml_positions)[indices])
+            / np.asarray(self.rates)[indices])
+
+  def duration_seconds_array(self, xml_positions, durations):
+    """Vectorised duration_seconds() over arrays of positions and durations."""
+    indices = self._indices(np.asarray(xml_positions))
+    return np.asarray(durations) / np.asarray(self.rates)[indices]
+
+  def xml_position_array(self, seconds):
+    """Vectorised xml_position() over seconds or an array of them."""
+    seconds = np.asarray(seconds, dtype=np.float64)
+    time_positions = np.asarray(self.time_positions, dtype=np.float64)
+    indices = np.maximum(
+        np.searchsorted(time_positions, seconds, side='right') - 1, 0)
+    return (np.asarray(self.xml_positions)[indices]
+            + (seconds - time_positions[indices])
+            * np.asarray(self.rates)[indices])
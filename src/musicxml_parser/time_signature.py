@@ -1,5 +1,6 @@
+from fractions import Fraction
+
 from .exception import AlternatingTimeSignatureException, TimeSignatureParseException
-import copy
 
 
 class TimeSignature(object):
@@ -17,12 +18,17 @@ class TimeSignature(object):
     self.denominator = -1
     self.time_position = 0
     self.xml_position = 0
-    self.state = copy.copy(state)
+    self.state = state.snapshot()
     if xml_time is not None:
-      self._parse()
+      self._parse(state)
+
+  def _parse(self, state):
+    """Parse the MusicXML <time> element.
 
-  def _parse(self):
-    """Parse the MusicXML <time> element."""
+    Args:
+      state: The MusicXMLParserState giving the position of the time
+        signature.
+    """
     if (len(self.xml_time.findall('beats')) > 1 or
         len(self.xml_time.findall('beat-type')) > 1):
       # If more than 1 beats or beat-type found, this time signature is
@@ -48,8 +54,17 @@ class TimeSignature(object):
       except ValueError:
         raise TimeSignatureParseException(
           'Could not parse time signature: {}/{}'.format(beats, beat_type))
-    self.time_position = self.state.time_position
-    self.xml_position = self.state.xml_position
+    self.time_position = state.time_position
+    self.xml_position = state.xml_position
+
+  def canonical_key(self):
+    """Return a hashable key, equal for the same signature at the same time.
+
+    The position is the exact number of quarter notes from the start, so
+    parts with different divisions give the same key.
+    """
+    return (Fraction(self.xml_position, self.state.divisions),
+            self.numerator, self.denominator)
 
   def __str__(self):
     time_sig_str = str(self.numerator) + '/' + str(self.denominator)
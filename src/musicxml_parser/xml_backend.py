@@ -0,0 +1,132 @@
+"""Element tree libraries used to read MusicXML files.
+
+lxml.etree is used by default when it is installed, as it builds element
+trees considerably faster than xml.etree.ElementTree and can read scores
+past the libxml2 size limits with huge_tree. Without lxml the standard
+library is used. Comments and processing instructions are dropped by the
+lxml parser, so both libraries hand the parser elements that behave alike
+for everything it uses (find, findall, iteration, text and attrib).
+"""
+import xml.etree.ElementTree as ET
+
+try:
+  from lxml import etree as lxml_etree
+except ImportError:
+  lxml_etree = None
+
+
+class ElementTreeBackend(object):
+  """Reads MusicXML with xml.etree.ElementTree."""
+
+  name = 'etree'
+  ParseError = ET.ParseError
+
+  def parse(self, source):
+    """Parse a binary file object and return its root element."""
+    return ET.parse(source).getroot()
+
+  def iterparse(self, source, events):
+    """Return an iterator of (event, element) pairs for a file object."""
+    return ET.iterparse(source, events=events)
+
+  def fromstring(self, text):
+    """Parse an XML string and return its root element."""
+    return ET.fromstring(text)
+
+  def tostring(self, element):
+    """Serialise an element to bytes."""
+    return ET.tostring(element)
+
+  def __reduce__(self):
+    return (get_backend, (self.name,))
+
+
+class LxmlBackend(object):
+  """Reads MusicXML with lxml.etree."""
+
+  name = 'lxml'
+
+  def __init__(self):
+    self.ParseError = lxml_etree.ParseError
+    self._parser = lxml_etree.XMLParser(
+        huge_tree=True, remove_comments=True, remove_pis=True)
+
+  def parse(self, source):
+    """Parse a binary file object and return its root element."""
+    return lxml_etree.parse(source, self._parser).getroot()
+
+  def iterparse(self, source, events):
+    """Return an iterator of (event, element) pairs for a file object."""
+    return lxml_etree.iterparse(source, events=events, huge_tree=True,
+                                remove_comments=True, remove_pis=True)
+
+  def fromstring(self, text):
+    """Parse an XML string and return its root element."""
+    return lxml_etree.fromstring(text, self._parser)
+
+  def tostring(self, element):
+    """Serialise an element to bytes."""
+    return lxml_etree.tostring(element)
+
+  def __reduce__(self):
+    return (get_backend, (self.name,))
+
+
+BACKENDS = {'etree': ElementTreeBackend()}
+if lxml_etree is not None:
+  BACKENDS['lxml'] = LxmlBackend()
+
+DEFAULT_BACKEND = 'lxml' if 'lxml' in BACKENDS else 'etree'
+
+
+def is_element(obj):
+  """Return whether obj is an element of either library."""
+  if isinstance(obj, ET.Element):
+    return True
+  return lxml_etree is not None and isinstance(obj, lxml_etree._Element)
+
+
+def element_tostring(element):
+  """Serialise an element of either library to bytes, without its tail."""
+  if isinstance(element, ET.Element):
+    tail = element.tail
+    element.tail = None
+    try:
+      return ET.tostring(element)
+    finally:
+      element.tail = tail
+  return lxml_etree.tostring(element, with_tail=False)
+
+
+def detach(element):
+  """Return a standalone xml.etree.ElementTree copy of an lxml element.
+
+  An lxml element keeps its whole document alive, while a standard library
+  element only keeps its own subtree. Standard library elements are
+  returned as they are.
+  """
+  if isinstance(element, ET.Element):
+    return element
+  return ET.fromstring(element_tostring(element))
+
+
+def get_backend(name=None):
+  """Return the backend with the given name.
+
+  Args:
+    name: 'lxml' or 'etree'. Defaults to lxml when it is installed.
+
+  Returns:
+    The backend object.
+
+  Raises:
+    ImportError: if name is 'lxml' but lxml is not installed.
+    ValueError: if name is not a known backend.
+  """
+  if name is None:
+    name = DEFAULT_BACKEND
+  if name == 'lxml' and lxml_etree is None:
+    raise ImportError('The lxml backend requires lxml to be installed')
+  if name not in BACKENDS:
+    raise ValueError('Unknown XML backend: %s' % name)
+  return BACKENDS[name]
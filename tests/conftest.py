@@ -0,0 +1,84 @@
+"""Shared helpers of the tests."""
+import os
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def fixture_path(name):
+  """Return the path of a score in tests/fixtures."""
+  return os.path.join(FIXTURES, name)
+
+
+def fixture_names():
+  """Return the names of all the scores in tests/fixtures."""
+  return sorted(name for name in os.listdir(FIXTURES)
+                if name.endswith('.xml'))
+
+
+def plain(value):
+  """Replace the elements in value, as found in Direction.type, by text."""
+  if hasattr(value, 'tag'):
+    return (value.tag, value.text)
+  if isinstance(value, dict):
+    return {key: plain(item) for key, item in value.items()}
+  if isinstance(value, (list, tuple)):
+    return [plain(item) for item in value]
+  return value
+
+
+def describe_note(note):
+  """Return the parsed fields of a Note as plain values, for comparison."""
+  duration = note.note_duration
+  notations = note.note_notations
+  return {
+      'pitch': note.pitch,
+      'voice': note.voice,
+      'staff': note.staff,
+      'is_rest': note.is_rest,
+      'is_grace_note': duration.is_grace_note,
+      'chord_index': note.chord_index,
+      'measure_number': note.measure_number,
+      'following_rest_duration': note.following_rest_duration,
+      'followed_by_fermata_rest': note.followed_by_fermata_rest,
+      'xml_position': duration.xml_position,
+      'duration': duration.duration,
+      'time_position': duration.time_position,
+      'seconds': duration.seconds,
+      'midi_ticks': duration.midi_ticks,
+      'tuplet_ratio': duration.tuplet_ratio,
+      'is_fermata': notations.is_fermata,
+      'is_staccato': notations.is_staccato,
+      'is_accent': notations.is_accent,
+      'is_trill': notations.is_trill,
+      'is_arpeggiate': notations.is_arpeggiate,
+      'tied_start': notations.tied_start,
+      'tied_stop': notations.tied_stop,
+      'slurs': [(slur.type, slur.xml_position, slur.end_xml_position)
+                for slur in notations.slurs],
+      'velocity': note.velocity,
+  }
+
+
+def describe_document(document):
+  """Return what a MusicXMLDocument yields as plain values, for comparison."""
+  notes, rests = document.get_notes()
+  return {
+      'notes': [describe_note(note) for note in notes],
+      'rests': [describe_note(note) for note in rests],
+      'measures': [[(measure.start_xml_position, measure.start_time_position,
+                     measure.duration) for measure in part.measures]
+                   for part in document.parts],
+      'directions': [(plain(direction.type), direction.xml_position,
+                      direction.time_position, direction.staff)
+                     for direction in document.get_directions()],
+      'tempos': [(tempo.qpm, tempo.xml_position, tempo.time_position)
+                 for tempo in document.get_tempos()],
+      'time_signatures': [(ts.numerator, ts.denominator, ts.xml_position)
+                          for ts in document.get_time_signatures()],
+      'key_signatures': [(ks.key, ks.mode, ks.xml_position)
+                         for ks in document.get_key_signatures()],
+      'chord_symbols': [(symbol.get_figure_string(), symbol.xml_position)
+                        for symbol in document.get_chord_symbols()],
+      'beats': document.get_beat_positions(),
+      'total': (document.total_time_secs, document.total_time_duration),
+  }
@@ -0,0 +1,56 @@
+"""Beat and interval grids of BeatGrid."""
+import numpy as np
+import pytest
+
+from conftest import fixture_path
+from musicxml_parser import MusicXMLDocument
+
+# beats.xml, in divisions of an eighth: a quarter pickup in 4/4, two full
+# 4/4 measures, an implicit half measure, two 6/8 measures and one of 3/4.
+MEASURE_STARTS = [0, 2, 10, 18, 22, 28, 34]
+BEATS = [0, 2, 4, 6, 8, 10, 12, 14, 16, 18, 20, 22, 25, 28, 31, 34, 36, 38]
+
+
+def beat_grid():
+  return MusicXMLDocument(fixture_path('beats.xml')).get_beat_grid()
+
+
+def test_measures():
+  document = MusicXMLDocument(fixture_path('beats.xml'))
+  grid = document.get_beat_grid()
+  assert grid.measure_starts.tolist() == MEASURE_STARTS
+  assert grid.implicit.tolist() == [True, False, False, True, False, False,
+                                    False]
+  assert grid.pickup
+  assert [measure.implicit for measure in document.parts[0].measures] == (
+      grid.implicit.tolist())
+
+
+def test_beats():
+  grid = beat_grid()
+  # the pickup beat is counted back from the next measure, the implicit
+  # measure holds the two beats starting in it and 6/8 has two beats
+  assert grid.beats().tolist() == BEATS
+  # a pickup counts back a whole measure at the measure level
+  assert grid.beats(in_measure_level=True).tolist() == [-6] + (
+      MEASURE_STARTS[1:])
+  assert grid.beats() is grid.beats()
+
+
+def test_intervals():
+  grid = beat_grid()
+  assert grid.intervals(4).tolist() == list(range(0, 40, 2))
+  assert grid.intervals(2).tolist() == list(range(0, 40))
+  # a 6/8 measure is shorter than a whole note
+  with pytest.raises(ValueError):
+    grid.intervals(16)
+
+
+def test_beat_index_of():
+  grid = beat_grid()
+  assert grid.beat_index_of(5) == 2
+  assert grid.beat_index_of(22) == BEATS.index(22)
+  assert grid.beat_index_of(np.array([-1, 0, 1, 21, 24, 40])).tolist() == [
+      -1, 0, 0, 10, 11, 17]
+  assert grid.beat_index_of([3, 30], in_measure_level=True).tolist() == [
+      1, 5]
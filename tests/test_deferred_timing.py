@@ -0,0 +1,30 @@
+"""deferred_timing=True must parse the same documents as the default mode."""
+import pytest
+
+from conftest import describe_document, fixture_names, fixture_path
+from musicxml_parser import MusicXMLDocument
+
+
+def describe_timing(document):
+  """Return describe_document with the time positions it leaves out."""
+  description = describe_document(document)
+  description['signatures'] = [
+      (signature.xml_position, signature.time_position)
+      for signature in (document.get_time_signatures()
+                        + document.get_key_signatures())]
+  description['chord_symbol_times'] = [
+      symbol.time_position for symbol in document.get_chord_symbols()]
+  description['measure_times'] = [
+      [(measure.start_xml_position, measure.start_time_position)
+       for measure in part.measures] for part in document.parts]
+  return description
+
+
+@pytest.mark.parametrize('name', fixture_names())
+@pytest.mark.parametrize('engine', ['etree', 'expat'])
+def test_deferred_timing_matches_default(name, engine):
+  path = fixture_path(name)
+  expected = describe_timing(MusicXMLDocument(path, engine=engine))
+  document = MusicXMLDocument(path, engine=engine, deferred_timing=True)
+  assert describe_timing(document) == expected
+
@@ -0,0 +1,38 @@
+"""The parsing engines must yield the same documents."""
+import pytest
+
+from conftest import describe_document, fixture_names, fixture_path
+from musicxml_parser import MusicXMLDocument
+from musicxml_parser import xml_backend
+
+ENGINES = ['etree', 'expat']
+if xml_backend.lxml_etree is not None:
+  ENGINES.append('lxml')
+
+
+@pytest.mark.parametrize('name', fixture_names())
+@pytest.mark.parametrize('engine', ENGINES[1:])
+def test_engine_matches_etree(name, engine):
+  path = fixture_path(name)
+  expected = describe_document(MusicXMLDocument(path, engine='etree'))
+  assert describe_document(MusicXMLDocument(path, engine=engine)) == expected
+
+
+@pytest.mark.parametrize('name', fixture_names())
+def test_streaming_matches_tree(name):
+  path = fixture_path(name)
+  expected = describe_document(MusicXMLDocument(path, engine='etree'))
+  document = MusicXMLDocument(path, engine='etree', streaming=True)
+  assert describe_document(document) == expected
+
+
+def test_basic_fixture():
+  notes, rests = MusicXMLDocument(fixture_path('basic.xml')).get_notes()
+  assert len(notes) == 26
+  assert len(rests) == 3
+  grace_notes = [note for note in notes if note.note_duration.is_grace_note]
+  assert [note.pitch[0] for note in grace_notes] == ['A5']
+  # the tied D5 is played once, with the length of both notes
+  tied = [note for note in notes
+          if note.pitch[0] == 'D5' and note.note_duration.xml_position == 12]
+  assert [note.note_duration.duration for note in tied] == [6]
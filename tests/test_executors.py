@@ -0,0 +1,41 @@
+"""Parts run in a thread or process pool must give the serial notes."""
+import pytest
+
+from conftest import describe_note, fixture_names, fixture_path
+from musicxml_parser import MusicXMLDocument
+from musicxml_parser import xml_backend
+from musicxml_parser.lean import RELEASED
+
+ENGINES = ['etree', 'expat']
+if xml_backend.lxml_etree is not None:
+  ENGINES.append('lxml')
+
+
+def describe_notes(document, **kwargs):
+  diagnostics = []
+  notes, rests = document.get_notes(diagnostics=diagnostics, **kwargs)
+  return ([describe_note(note) for note in notes],
+          [describe_note(note) for note in rests],
+          [(diagnostic.kind, describe_note(diagnostic.note))
+           for diagnostic in diagnostics])
+
+
+@pytest.mark.parametrize('name', fixture_names())
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_executor_matches_serial(name, engine, executor):
+  path = fixture_path(name)
+  expected = describe_notes(MusicXMLDocument(path, engine=engine))
+  document = MusicXMLDocument(path, engine=engine)
+  assert describe_notes(document, executor=executor, workers=2) == expected
+
+
+def test_process_notes_link_to_the_parsed_notes():
+  document = MusicXMLDocument(fixture_path('basic.xml'))
+  notes, _ = document.get_notes(executor='process', workers=2)
+  parsed_notes = [note for part in document.parts
+                  for measure in part.measures for note in measure.notes]
+  for note in notes:
+    assert any(note.parsed_note is parsed for parsed in parsed_notes)
+    assert note.xml_note is note.parsed_note.xml_note
+    assert note.xml_note is not RELEASED
@@ -0,0 +1,50 @@
+"""get_notes must leave the parsed notes alone and give the same notes."""
+import pytest
+
+from conftest import describe_note, fixture_names, fixture_path
+from musicxml_parser import MusicXMLDocument
+
+
+def parsed_notes(document):
+  return [note for part in document.parts for measure in part.measures
+          for note in measure.notes]
+
+
+def describe(notes):
+  return [describe_note(note) for note in notes]
+
+
+@pytest.mark.parametrize('name', fixture_names())
+def test_get_notes_is_idempotent(name):
+  document = MusicXMLDocument(fixture_path(name))
+  parsed = parsed_notes(document)
+  expected_parsed = describe(parsed)
+  notes, rests = document.get_notes()
+  again_notes, again_rests = document.get_notes()
+  assert describe(again_notes) == describe(notes)
+  assert describe(again_rests) == describe(rests)
+  assert describe(document.get_notes()[0]) == describe(notes)
+  assert parsed_notes(document) == parsed
+  assert describe(parsed) == expected_parsed
+  assert all(note.parsed_note in parsed for note in notes)
+  assert not any(note in parsed for note in notes)
+
+
+def test_returned_lists_are_new_and_notes_shared():
+  document = MusicXMLDocument(fixture_path('basic.xml'))
+  notes, _ = document.get_notes()
+  notes.pop()
+  again, _ = document.get_notes(melody_only=True, grace_note=False)
+  assert len(again) == len(notes) + 1
+  assert all(a is b for a, b in zip(notes, again))
+
+
+def test_invalidate_makes_new_notes():
+  document = MusicXMLDocument(fixture_path('basic.xml'))
+  notes, _ = document.get_notes()
+  expected = describe(notes)
+  notes[0].voice = 9
+  document.invalidate()
+  again, _ = document.get_notes()
+  assert again[0] is not notes[0]
+  assert describe(again) == expected
@@ -0,0 +1,38 @@
+"""Documents that release their XML elements."""
+import copy
+import pickle
+
+import pytest
+
+from conftest import describe_document, fixture_path
+from musicxml_parser import MusicXMLDocument
+from musicxml_parser.exception import XMLReleasedException
+from musicxml_parser.lean import RELEASED
+
+
+@pytest.mark.parametrize('options', [{'lean': True}, {'streaming': True}])
+def test_released_elements_fail_clearly(options):
+  document = MusicXMLDocument(fixture_path('basic.xml'), **options)
+  note = document.parts[0].measures[0].notes[0]
+  assert note.xml_note is RELEASED
+  assert document.parts[0].measures[0].xml_measure is RELEASED
+  with pytest.raises(XMLReleasedException):
+    note.xml_note.find('pitch')
+  # hasattr and getattr with a default must not hide the access
+  with pytest.raises(XMLReleasedException):
+    hasattr(note.xml_note, 'attrib')
+  with pytest.raises(XMLReleasedException):
+    getattr(note.xml_note, 'tag', None)
+  with pytest.raises(XMLReleasedException):
+    list(note.xml_note)
+
+
+def test_released_placeholder_copies_and_pickles():
+  assert copy.copy(RELEASED) is RELEASED
+  assert pickle.loads(pickle.dumps(RELEASED)) is RELEASED
+
+
+def test_lean_document_matches():
+  path = fixture_path('basic.xml')
+  expected = describe_document(MusicXMLDocument(path))
+  assert describe_document(MusicXMLDocument(path, lean=True)) == expected
@@ -0,0 +1,50 @@
+"""MeasureIndex lookups and the measure_number of playable notes."""
+from conftest import fixture_path
+from musicxml_parser import MusicXMLDocument
+from musicxml_parser import measure_index
+
+
+def test_lookups():
+  document = MusicXMLDocument(fixture_path('repeats.xml'))
+  index = document.get_measure_index()
+  assert index.index_of(0) == 0
+  assert index.index_of([1, 2, 35, 100]).tolist() == [0, 1, 17, 17]
+  # the second pass of the repeat, at 7 seconds, runs at half the tempo
+  assert index.index_of([7.5, 9.5], in_seconds=True).tolist() == [7, 8]
+  assert index.source_index_of([6, 8, 16]).tolist() == [0, 1, 4]
+  assert index.number_of([6, 8, 16]).tolist() == ['1', '2', '5']
+  assert index.repeat_pass_of([0, 6, 24, 16]).tolist() == [0, 1, 2, 1]
+
+
+def test_measure_numbers_count_unfolded_measures_from_one(monkeypatch):
+  document = MusicXMLDocument(fixture_path('repeats.xml'))
+  index = document.get_measure_index()
+  built = []
+  monkeypatch.setattr(measure_index.MeasureIndex, '__init__',
+                      lambda self, measures: built.append(measures))
+  notes, rests = document.get_notes()
+  # the pipeline reuses the index of the document
+  assert not built
+  assert [note.measure_number for note in notes[:6]] == [1, 2, 2, 2, 2, 3]
+  assert notes[-1].measure_number == len(index)
+  assert [note.measure_number for note in notes] == (
+      index.index_of([note.note_duration.xml_position for note in notes])
+      + 1).tolist()
+
+
+def test_parsed_notes_have_the_playable_measure_numbers():
+  document = MusicXMLDocument(fixture_path('repeats.xml'))
+  notes, rests = document.get_notes()
+  for note in notes + rests:
+    assert note.parsed_note.measure_number == note.measure_number
+  index = document.get_measure_index()
+  parsed = [note for measure in document.parts[0].measures
+            for note in measure.notes]
+  assert [note.measure_number for note in parsed] == (
+      index.index_of([note.note_duration.xml_position for note in parsed])
+      + 1).tolist()
+  # every pass of a repeated source measure gets its own number
+  passes = [measure for measure in document.parts[0].measures
+            if measure.source_index == 1]
+  assert [measure.notes[0].measure_number for measure in passes] == [
+      2, 5, 14]
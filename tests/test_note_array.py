@@ -0,0 +1,37 @@
+"""The NumPy export of playable notes."""
+import pytest
+
+from conftest import fixture_names, fixture_path
+from musicxml_parser import MusicXMLDocument
+from musicxml_parser.note_array import (DURATION_FIELDS, NOTATION_FIELDS,
+                                        NOTE_DTYPE, NOTE_FIELDS,
+                                        build_note_array)
+
+
+@pytest.mark.parametrize('name', fixture_names())
+def test_rows_match_notes(name):
+  document = MusicXMLDocument(fixture_path(name))
+  notes, _ = document.get_notes()
+  table = document.get_note_array()
+  assert len(table) == len(notes)
+  for row, note in zip(table, notes):
+    duration = note.note_duration
+    assert row['onset_div'] == duration.xml_position
+    assert row['offset_div'] == duration.xml_position + duration.duration
+    assert row['onset_sec'] == duration.time_position
+    assert row['offset_sec'] == duration.time_position + duration.seconds
+    assert row['pitch'] == note.pitch[1]
+    for field in NOTE_FIELDS:
+      assert row[field] == getattr(note, field)
+    for field in DURATION_FIELDS:
+      assert row[field] == getattr(duration, field)
+    for field in NOTATION_FIELDS:
+      assert row[field] == getattr(note.note_notations, field)
+  # ids number the parsed notes, so the notes of a tie chain share none
+  assert len(set(table['id'].tolist())) == len(notes)
+
+
+def test_no_notes():
+  table = build_note_array([], {})
+  assert table.dtype == NOTE_DTYPE
+  assert len(table) == 0
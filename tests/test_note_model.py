@@ -0,0 +1,86 @@
+"""Lazily allocated parts of the slotted note model."""
+import pickle
+
+import pytest
+
+from conftest import fixture_path
+from musicxml_parser import MusicXMLDocument
+from musicxml_parser.notations import Notations, Slur
+from musicxml_parser.note_dynamic import NoteDynamic, NotePedal, NoteTempo
+
+
+def first_note():
+  document = MusicXMLDocument(fixture_path('basic.xml'), lean=True)
+  return document.parts[0].measures[0].notes[0]
+
+
+def test_slurs_are_kept_once_modified():
+  notations = Notations()
+  assert list(notations.slurs) == []
+  assert not notations.has_slurs
+  slur = Slur('start', 1)
+  notations.slurs.append(slur)
+  assert notations.has_slurs
+  assert list(notations.slurs) == [slur]
+  notations.slurs.append(Slur('stop', 1))
+  assert len(notations.slurs) == 2
+
+
+def test_slurs_extend_and_iadd():
+  notations = Notations()
+  notations.slurs.extend([Slur('start', 1)])
+  assert len(notations.slurs) == 1
+  other = Notations()
+  other.slurs += [Slur('start', 1)]
+  assert len(other.slurs) == 1
+  assert len(other.copy().slurs) == 1
+
+
+@pytest.mark.parametrize('name, base', [('dynamic', NoteDynamic),
+                                        ('tempo', NoteTempo),
+                                        ('pedal', NotePedal)])
+def test_reading_does_not_allocate(name, base):
+  note = first_note()
+  part = getattr(note, name)
+  assert isinstance(part, base)
+  for attribute in base.__slots__:
+    assert getattr(part, attribute) == getattr(base(), attribute)
+  assert getattr(note, '_' + name) is None
+
+
+def test_writes_are_kept():
+  note = first_note()
+  other = first_note()
+  note.dynamic.absolute = 'p'
+  note.pedal.at_start = 1
+  note.tempo.relative.append('rit.')
+  assert note.dynamic.absolute == 'p'
+  assert note.pedal.at_start == 1
+  assert note.tempo.relative == ['rit.']
+  part = note.dynamic
+  part.relative.append('cresc.')
+  part.cresciuto = 2
+  assert note.dynamic is part
+  assert note.dynamic.relative == ['cresc.']
+  assert other.dynamic.absolute is None
+  assert other._dynamic is None
+
+
+def test_list_writes_are_kept():
+  note = first_note()
+  note.dynamic.relative.extend(['cresc.'])
+  note.dynamic.relative += ['dim.']
+  assert note.dynamic.relative == ['cresc.', 'dim.']
+  assert note.dynamic.absolute is None
+
+
+def test_pickled_notes_keep_their_parts():
+  note = first_note()
+  note.note_notations.slurs.append(Slur('start', 1))
+  note.pedal.at_end = 1
+  copied = pickle.loads(pickle.dumps(note))
+  assert copied._dynamic is None
+  assert copied.dynamic.absolute is None
+  assert type(copied.pedal) is NotePedal
+  assert copied.pedal.at_end == 1
+  assert len(copied.note_notations.slurs) == 1
@@ -0,0 +1,158 @@
+"""The stage registry of Pipeline and the totals of PipelineStats."""
+import pytest
+
+from conftest import describe_note, fixture_path
+from musicxml_parser import MusicXMLDocument
+from musicxml_parser import playable_notes
+from musicxml_parser.pipeline import Pipeline, PipelineStats, StageStats
+
+
+def appender(name):
+  def stage(context):
+    context.append(name)
+  return stage
+
+
+def make_pipeline(*names):
+  return Pipeline([(name, appender(name)) for name in names])
+
+
+def test_register():
+  pipeline = make_pipeline('a', 'c')
+  pipeline.register('b', appender('b'), before='c')
+  pipeline.register('d', appender('d'))
+  pipeline.register('a2', appender('a2'), after='a')
+  assert pipeline.names() == ['a', 'a2', 'b', 'c', 'd']
+  assert pipeline.run([]) == ['a', 'a2', 'b', 'c', 'd']
+  with pytest.raises(ValueError):
+    pipeline.register('a', appender('a'))
+  with pytest.raises(ValueError):
+    pipeline.register('e', appender('e'), before='a', after='b')
+  with pytest.raises(KeyError):
+    pipeline.register('e', appender('e'), after='z')
+  assert 'e' not in pipeline.names()
+
+
+def test_unregister():
+  pipeline = make_pipeline('a', 'b', 'c')
+  pipeline.disable('b')
+  pipeline.unregister('b')
+  assert pipeline.names() == ['a', 'c']
+  pipeline.register('b', appender('b'))
+  assert pipeline.is_enabled('b')
+  with pytest.raises(KeyError):
+    pipeline.unregister('z')
+
+
+def test_enable_and_disable():
+  pipeline = make_pipeline('a', 'b', 'c')
+  pipeline.disable('b')
+  assert not pipeline.is_enabled('b')
+  assert pipeline.names(enabled_only=True) == ['a', 'c']
+  assert pipeline.run([]) == ['a', 'c']
+  pipeline.enable('b')
+  assert pipeline.run([]) == ['a', 'b', 'c']
+  for method in (pipeline.enable, pipeline.disable, pipeline.is_enabled):
+    with pytest.raises(KeyError):
+      method('z')
+
+
+def test_reorder():
+  pipeline = make_pipeline('a', 'b', 'c', 'd')
+  pipeline.reorder(['c', 'a'])
+  assert pipeline.names() == ['c', 'a', 'b', 'd']
+  with pytest.raises(KeyError):
+    pipeline.reorder(['z'])
+  assert pipeline.names() == ['c', 'a', 'b', 'd']
+
+
+def test_copy_is_independent():
+  pipeline = make_pipeline('a', 'b')
+  pipeline.disable('a')
+  copied = pipeline.copy()
+  copied.enable('a')
+  copied.register('c', appender('c'))
+  assert pipeline.names() == ['a', 'b']
+  assert not pipeline.is_enabled('a')
+  assert copied.run([]) == ['a', 'b', 'c']
+
+
+def test_frozen_pipeline():
+  pipeline = make_pipeline('a', 'b').freeze()
+  assert pipeline.frozen
+  for change in (lambda: pipeline.register('c', appender('c')),
+                 lambda: pipeline.unregister('a'),
+                 lambda: pipeline.enable('a'),
+                 lambda: pipeline.disable('a'),
+                 lambda: pipeline.reorder(['b'])):
+    with pytest.raises(TypeError):
+      change()
+  assert pipeline.run([]) == ['a', 'b']
+  copied = pipeline.copy()
+  assert not copied.frozen
+  copied.disable('a')
+  assert pipeline.is_enabled('a')
+
+
+def test_default_pipeline_is_shared_read_only():
+  assert playable_notes.DEFAULT_PIPELINE.frozen
+  with pytest.raises(TypeError):
+    playable_notes.DEFAULT_PIPELINE.disable('ties')
+  pipeline = playable_notes.default_pipeline()
+  assert not pipeline.frozen
+  assert pipeline.names() == playable_notes.DEFAULT_PIPELINE.names()
+  pipeline.disable('ties')
+  assert playable_notes.DEFAULT_PIPELINE.is_enabled('ties')
+
+
+def test_custom_pipeline_leaves_the_memoized_notes_alone():
+  document = MusicXMLDocument(fixture_path('basic.xml'))
+  expected = [describe_note(note) for note in document.get_notes()[0]]
+  pipeline = playable_notes.default_pipeline()
+  pipeline.disable('ties')
+  untied, _ = document.get_notes(pipeline=pipeline)
+  assert len(untied) > len(expected)
+  assert [describe_note(note) for note in document.get_notes()[0]] == (
+      expected)
+
+
+def test_stats_record_stages():
+  pipeline = Pipeline([('double', lambda items: items.extend(items)),
+                       ('drop', lambda items: items.pop())])
+  stats = PipelineStats()
+  pipeline.run([1, 2], stats)
+  pipeline.run([1], stats)
+  assert [stage.name for stage in stats] == ['double', 'drop']
+  assert len(stats) == 2
+  assert 'drop' in stats
+  assert 'other' not in stats
+  assert stats['double'].calls == 2
+  assert (stats['double'].items_in, stats['double'].items_out) == (3, 6)
+  assert (stats['drop'].items_in, stats['drop'].items_out) == (6, 4)
+  assert stats.seconds == pytest.approx(
+      stats['double'].seconds + stats['drop'].seconds)
+  assert str(stats).splitlines()[0].split() == [
+      'stage', 'calls', 'seconds', 'items', 'in', 'items', 'out']
+
+
+def test_stats_update_merges_totals():
+  stats = PipelineStats()
+  stats.record('a', 1.0, 4, 3)
+  other = PipelineStats()
+  other.record('b', 0.5, 3, 3)
+  other.record('a', 2.0, 2, 1)
+  stats.update(other)
+  assert list(stats) == [StageStats('a', 2, 3.0, 6, 4),
+                         StageStats('b', 1, 0.5, 3, 3)]
+  assert list(other) == [StageStats('b', 1, 0.5, 3, 3),
+                         StageStats('a', 1, 2.0, 2, 1)]
+
+
+def test_document_stats_cover_every_part():
+  document = MusicXMLDocument(fixture_path('basic.xml'))
+  stats = PipelineStats()
+  notes, _ = document.get_notes(stats=stats)
+  assert [stage.name for stage in stats] == (
+      playable_notes.DEFAULT_PIPELINE.names())
+  assert all(stage.calls == len(document.parts) for stage in stats)
+  assert stats['slurs'].items_out == len(notes)
@@ -0,0 +1,153 @@
+"""Rests merged and attached to the notes they follow."""
+import copy
+import random
+import types
+
+import pytest
+
+from conftest import fixture_path
+from musicxml_parser import MusicXMLDocument
+from musicxml_parser.playable_notes import (apply_rest_to_note,
+                                            binary_index, merge_rests)
+
+
+def reference_apply_rest_to_note(notes, rests):
+  """apply_rest_to_note as it was before merge_rests, kept as the oracle."""
+  xml_positions = [note.note_duration.xml_position for note in notes]
+  new_rests = []
+  num_rests = len(rests)
+  for i in range(num_rests):
+    rest = rests[i]
+    j = 1
+    current_end = rest.note_duration.xml_position + rest.note_duration.duration
+    current_voice = rest.voice
+    while i + j < num_rests - 1:
+      next_rest = rests[i + j]
+      if next_rest.note_duration.duration == 0:
+        break
+      if (next_rest.note_duration.xml_position == current_end
+          and next_rest.voice == current_voice):
+        rest.note_duration.duration += next_rest.note_duration.duration
+        next_rest.note_duration.duration = 0
+        current_end = (rest.note_duration.xml_position
+                       + rest.note_duration.duration)
+        if next_rest.note_notations.is_fermata:
+          rest.note_notations.is_fermata = True
+      elif next_rest.note_duration.xml_position > current_end:
+        break
+      j += 1
+    if not rest.note_duration.duration == 0:
+      new_rests.append(rest)
+
+  for rest in new_rests:
+    rest_position = rest.note_duration.xml_position
+    closest_note_index = binary_index(xml_positions, rest_position)
+    search_index = 0
+    while closest_note_index - search_index >= 0:
+      prev_note = notes[closest_note_index - search_index]
+      if prev_note.voice == rest.voice:
+        prev_note_end = (prev_note.note_duration.xml_position
+                         + prev_note.note_duration.duration)
+        if prev_note_end == rest_position:
+          prev_note.following_rest_duration = rest.note_duration.duration
+          if rest.note_notations.is_fermata:
+            prev_note.followed_by_fermata_rest = True
+        elif prev_note_end < rest_position:
+          break
+      search_index += 1
+  return notes
+
+
+def make_note(voice, xml_position, duration, is_fermata=False):
+  return types.SimpleNamespace(
+      voice=voice,
+      note_duration=types.SimpleNamespace(xml_position=xml_position,
+                                          duration=duration),
+      note_notations=types.SimpleNamespace(is_fermata=is_fermata),
+      following_rest_duration=0,
+      followed_by_fermata_rest=False)
+
+
+def random_part(rng, num_measures=6, measure_length=8):
+  """Return (notes, rests) of a random part, as the pipeline hands them."""
+  notes = []
+  rests = []
+  for measure in range(num_measures):
+    start = measure * measure_length
+    for voice in (1, 2):
+      position = start
+      while position < start + measure_length:
+        duration = min(rng.choice([1, 2, 2, 4]), start + measure_length
+                       - position)
+        if rng.random() < 0.5:
+          rest_duration = 0 if rng.random() < 0.05 else duration
+          rests.append(make_note(voice, position, rest_duration,
+                                 rng.random() < 0.2))
+        else:
+          notes.append(make_note(voice, position, duration))
+          if rng.random() < 0.2:
+            notes.append(make_note(voice, position, rng.choice([1, 2])))
+        position += duration
+  notes.sort(key=lambda note: note.note_duration.xml_position)
+  return notes, rests
+
+
+def describe(notes, rests):
+  return ([(note.following_rest_duration, note.followed_by_fermata_rest)
+           for note in notes],
+          [(rest.note_duration.duration, rest.note_notations.is_fermata)
+           for rest in rests])
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_matches_reference(seed):
+  notes, rests = random_part(random.Random(seed))
+  expected_notes, expected_rests = copy.deepcopy((notes, rests))
+  reference_apply_rest_to_note(expected_notes, expected_rests)
+  apply_rest_to_note(notes, rests)
+  assert describe(notes, rests) == describe(expected_notes, expected_rests)
+
+
+def test_last_rest_is_never_absorbed():
+  rests = [make_note(1, 0, 2), make_note(1, 2, 2), make_note(1, 4, 2, True)]
+  assert [id(rest) for rest in merge_rests(rests)] == [id(rests[0]),
+                                                       id(rests[2])]
+  assert [rest.note_duration.duration for rest in rests] == [4, 0, 2]
+  assert not rests[0].note_notations.is_fermata
+
+
+def test_zero_duration_rest_stops_merging():
+  rests = [make_note(1, 0, 2), make_note(1, 2, 0), make_note(1, 2, 2),
+           make_note(1, 4, 2)]
+  merged = merge_rests(rests)
+  # the rests before it stop, while it absorbs the rest at its end itself
+  assert [id(rest) for rest in merged] == [id(rests[0]), id(rests[1]),
+                                           id(rests[3])]
+  assert [rest.note_duration.duration for rest in rests] == [2, 2, 0, 2]
+
+
+def test_rests_fixture():
+  notes, rests = MusicXMLDocument(fixture_path('rests.xml')).get_notes()
+  assert [(note.pitch[0], note.note_duration.xml_position,
+           note.following_rest_duration, note.followed_by_fermata_rest)
+          for note in notes] == [
+              ('C5', 0, 8, False),
+              ('G4', 0, 8, True),
+              ('E4', 0, 8, True),
+              ('D5', 12, 0, False),
+              ('E5', 16, 4, True),
+              # the last rest of the part, with the fermata, is not merged
+              ('F5', 24, 2, False),
+          ]
+  assert [(rest.voice, rest.note_duration.xml_position,
+           rest.note_duration.duration, rest.note_notations.is_fermata)
+          for rest in rests] == [
+              (1, 4, 8, False),
+              (1, 8, 0, False),
+              (1, 10, 0, False),
+              (2, 8, 8, True),
+              (2, 12, 0, True),
+              (1, 20, 4, True),
+              (1, 28, 2, False),
+              (1, 30, 2, True),
+          ]
@@ -0,0 +1,45 @@
+"""Conversions of TempoMap between xml_positions and seconds."""
+import types
+
+import numpy as np
+import pytest
+
+from musicxml_parser.tempo_map import TempoMap
+
+
+def make_tempo(xml_position, qpm, divisions=1):
+  return types.SimpleNamespace(xml_position=xml_position, qpm=qpm,
+                               state=types.SimpleNamespace(divisions=divisions))
+
+
+@pytest.fixture
+def tempo_map():
+  # 120 qpm for 4 quarters, then 60 qpm
+  return TempoMap([make_tempo(4, 60), make_tempo(0, 120)])
+
+
+def test_scalars(tempo_map):
+  assert tempo_map.seconds(2) == 1
+  assert tempo_map.seconds(6) == 4
+  assert tempo_map.xml_position(4) == 6
+  assert tempo_map.duration_seconds(5, 2) == 2
+
+
+@pytest.mark.parametrize('position', [0, 2, 4, 5, 7.5])
+def test_arrays_match_scalars(tempo_map, position):
+  seconds = tempo_map.seconds(position)
+  assert tempo_map.seconds_array(position) == seconds
+  assert np.ndim(tempo_map.seconds_array(position)) == 0
+  assert tempo_map.duration_seconds_array(position, 1) == (
+      tempo_map.duration_seconds(position, 1))
+  assert tempo_map.xml_position_array(seconds) == position
+  assert tempo_map.seconds_array([position, position]).tolist() == [
+      seconds, seconds]
+
+
+def test_positions_before_the_first_tempo_use_the_last():
+  tempo_map = TempoMap([make_tempo(2, 60), make_tempo(4, 120)])
+  assert tempo_map.seconds_array(0) == tempo_map.seconds(0)
+  assert tempo_map.seconds_array([0, 3]).tolist() == [
+      tempo_map.seconds(0), tempo_map.seconds(3)]
+  assert tempo_map.xml_position_array(-1) == tempo_map.xml_position(-1)
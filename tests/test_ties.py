@@ -0,0 +1,36 @@
+"""Tie chains resolved by playable_notes.apply_tied_notes."""
+from conftest import fixture_path
+from musicxml_parser import MusicXMLDocument
+from musicxml_parser import constants
+
+
+def tied_notes():
+  diagnostics = []
+  notes, _ = MusicXMLDocument(fixture_path('ties.xml')).get_notes(
+      diagnostics=diagnostics)
+  return notes, diagnostics
+
+
+def test_tie_chains():
+  notes, _ = tied_notes()
+  assert [(note.pitch[0], note.voice, note.note_duration.xml_position,
+           note.note_duration.duration, note.note_duration.seconds)
+          for note in notes] == [
+              # the chain over measures 1 to 3, once per pass of the repeat
+              ('G4', 1, 0, 10, 10), ('A4', 1, 10, 2, 2),
+              ('G4', 1, 12, 10, 10), ('A4', 1, 22, 2, 2),
+              # the same pitch tied in two voices at once
+              ('C5', 1, 24, 4, 4), ('C5', 2, 24, 6, 6), ('C5', 1, 28, 4, 4),
+              # the unterminated start keeps its own duration, and the stray
+              # stop at 36 is dropped
+              ('D5', 1, 32, 4, 4), ('E4', 1, 40, 4, 4)]
+  assert [note.note_duration.midi_ticks for note in notes[:2]] == [
+      10 * constants.STANDARD_PPQ, 2 * constants.STANDARD_PPQ]
+
+
+def test_tie_diagnostics():
+  _, diagnostics = tied_notes()
+  assert [(diagnostic.kind, diagnostic.note.pitch[0],
+           diagnostic.note.note_duration.xml_position)
+          for diagnostic in diagnostics] == [('unmatched_stop', 'F4', 36),
+                                             ('unterminated', 'D5', 32)]
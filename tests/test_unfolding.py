@@ -0,0 +1,59 @@
+"""Repeats, endings and da capo jumps unfolded by Part."""
+import pytest
+
+from conftest import describe_document, fixture_names, fixture_path
+from musicxml_parser import MusicXMLDocument
+from musicxml_parser.measure import MeasureTemplate
+from musicxml_parser.part import Part
+
+# Source measures of repeats.xml in playing order: the repeat with first
+# and second endings, a repeat whose second pass is slower, then da capo
+# al fine, skipping the first ending and the repeats already played.
+PLAYING_ORDER = [0, 1, 2, 0, 1, 3, 4, 5, 4, 5, 6, 7, 0, 1, 3, 4, 5, 6]
+
+
+def test_playing_order():
+  document = MusicXMLDocument(fixture_path('repeats.xml'))
+  measures = document.parts[0].measures
+  assert [measure.source_index for measure in measures] == PLAYING_ORDER
+  assert [measure.start_xml_position for measure in measures] == list(
+      range(0, 2 * len(PLAYING_ORDER), 2))
+  # one second per measure, two once the tempo drops to 60
+  assert [measure.start_time_position for measure in measures] == [
+      0, 1, 2, 3, 4, 5, 6, 7, 9, 11, 13, 15, 17, 18, 19, 20, 21, 23]
+  assert document.total_time_secs == 25
+  assert document.total_time_duration == 36
+
+
+def test_playable_notes():
+  notes, _ = MusicXMLDocument(fixture_path('repeats.xml')).get_notes()
+  assert [(note.pitch[0], note.note_duration.xml_position,
+           note.note_duration.time_position) for note in notes] == [
+               ('C4', 0, 0), ('E4', 2, 1), ('F4', 2, 1), ('D4', 2, 1),
+               ('E4', 3, 1.5), ('E4', 4, 2), ('C4', 6, 3), ('E4', 8, 4),
+               ('F4', 8, 4), ('D4', 8, 4), ('E4', 9, 4.5), ('F4', 10, 5),
+               ('G4', 12, 6), ('A4', 14, 7), ('G4', 16, 9), ('A4', 18, 11),
+               ('B4', 20, 13), ('C5', 22, 15), ('C4', 24, 17), ('E4', 26, 18),
+               ('F4', 26, 18), ('D4', 26, 18), ('E4', 27, 18.5),
+               ('F4', 28, 19), ('G4', 30, 20), ('A4', 32, 21), ('B4', 34, 23)]
+
+
+def test_played_first_ending_is_not_parsed_again(monkeypatch):
+  parsed = []
+  parse_measure = Part._parse_measure
+
+  def recording_parse_measure(self, xml_measure):
+    parsed.append(xml_measure.get('number'))
+    return parse_measure(self, xml_measure)
+
+  monkeypatch.setattr(Part, '_parse_measure', recording_parse_measure)
+  MusicXMLDocument(fixture_path('repeats.xml'), engine='etree')
+  assert parsed.count('3') == 1
+
+
+@pytest.mark.parametrize('name', fixture_names())
+def test_templates_match_parsing_again(name, monkeypatch):
+  path = fixture_path(name)
+  expected = describe_document(MusicXMLDocument(path))
+  monkeypatch.setattr(MeasureTemplate, 'matches', lambda self, state: False)
+  assert describe_document(MusicXMLDocument(path)) == expected